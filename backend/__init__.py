@@ -1,7 +1,7 @@
 """
 后端模块
 """
-from .app import app, socketio, game, game_lock, group_sockets
-
-__all__ = ['app', 'socketio', 'game', 'game_lock', 'group_sockets']
+from .app import app, socketio, rooms, game, game_lock, group_sockets
+from .config import ADMIN_TOKEN
 
+__all__ = ['app', 'socketio', 'rooms', 'game', 'game_lock', 'group_sockets', 'ADMIN_TOKEN']
@@ -4,17 +4,18 @@
 from flask import Flask
 from flask_cors import CORS
 from flask_socketio import SocketIO
-from game_logic import GameLogic
-import threading
-from typing import Dict
+from game_logic import GameStatus
 
 # 导入配置
-from backend.config import WORD_PAIRS
+from backend.config import WORD_PAIRS, SNAPSHOT_INTERVAL
 from backend.utils import init_utils, get_local_ip
-from backend.services import init_broadcast, init_timer
+from backend.services import init_broadcast, init_timer, start_timer_broadcast
+from backend.services.rooms import RoomRegistry
+from backend.services.fanout import FanoutManager
+from backend.services.snapshot import start_snapshotter
 from backend.routes.game import init_game_routes
 from backend.routes.player import init_player_routes
-from backend.routes.public import init_public_routes
+from backend.routes.rooms import init_room_routes
 from backend.websocket.handlers import init_websocket_handlers
 from backend.routes import register_all_routes
 from backend.websocket import register_websocket_handlers
@@ -22,30 +23,39 @@ from backend.websocket import register_websocket_handlers
 # Flask应用初始化
 app = Flask(__name__)
 CORS(app)  # 允许跨域请求
-socketio = SocketIO(app, cors_allowed_origins="*")  # WebSocket支持
+# WebSocket支持：每个连接一条有界发送队列，慢连接不会拖住广播或无限占用内存
+socketio = SocketIO(app, cors_allowed_origins="*", client_manager=FanoutManager())
 
-# 全局游戏逻辑实例
-game = GameLogic()
+# 房间注册表：每个房间拥有独立的游戏逻辑实例、锁和WebSocket连接追踪
+rooms = RoomRegistry()
 
-# 线程锁，保证线程安全
-game_lock = threading.Lock()
-
-# WebSocket连接追踪：group_name -> set of session_ids
-group_sockets: Dict[str, set] = {}  # 每个组对应的WebSocket连接ID集合
+# 默认房间（兼容不带房间前缀的旧接口 /api/...）
+game = rooms.default.game
+game_lock = rooms.default.lock
+group_sockets = rooms.default.group_sockets
 
 # 初始化所有模块
-init_utils(game, game_lock, group_sockets, socketio)
-init_broadcast(game, game_lock, socketio)
-init_timer(game, game_lock, socketio)
-init_game_routes(game, game_lock, socketio)
-init_player_routes(game, game_lock, socketio)
-init_public_routes(game, game_lock)
-init_websocket_handlers(game, game_lock, group_sockets, socketio)
+init_utils(rooms, socketio)
+init_broadcast(socketio)
+init_timer(socketio)
+init_game_routes(socketio)
+init_player_routes(socketio)
+init_room_routes(rooms, socketio)
+init_websocket_handlers(rooms, socketio)
 
 # 注册路由和WebSocket处理器
 register_all_routes(app)
 register_websocket_handlers(socketio)
 
+# 从快照和事件日志恢复的房间如果正处于描述或投票阶段，继续它们的倒计时
+for restored_room in rooms.all():
+    if restored_room.game.game_status in (GameStatus.DESCRIBING, GameStatus.VOTING):
+        with restored_room.lock:
+            start_timer_broadcast(restored_room)
+
+# 配置了快照目录时定期写入房间快照
+start_snapshotter(rooms, SNAPSHOT_INTERVAL)
+
 if __name__ == '__main__':
     local_ip = get_local_ip()
     print(f"=" * 50)
@@ -61,5 +71,7 @@ if __name__ == '__main__':
     print(f"=" * 50)
 
     # 使用 socketio.run 替代 app.run
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True, allow_unsafe_werkzeug=True)
+    # 不启用自动重载：重载器的父进程也会导入本模块，重放事件日志并运行自己的快照线程，
+    # 与真正提供服务的子进程争用同一批日志和快照文件
+    socketio.run(app, host='0.0.0.0', port=5000, debug=True, use_reloader=False, allow_unsafe_werkzeug=True)
 
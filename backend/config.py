@@ -6,6 +6,55 @@ import os
 # 管理员令牌（主持方专用）
 ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "host-secret")
 
+# 主持方连接凭证（host_ticket）的有效期（秒）：由主持方令牌换取，只能用于 WebSocket 连接时加入
+# 该房间的主持方子频道，页面中不需要出现主持方令牌本身
+HOST_TICKET_TTL = int(os.environ.get("HOST_TICKET_TTL", "300"))
+
+# 多房间配置
+DEFAULT_ROOM_ID = "default"  # 默认房间（兼容不带房间前缀的旧接口）
+MAX_ROOMS = int(os.environ.get("MAX_ROOMS", "5000"))  # 单个进程最多托管的房间数
+
+# 广播合并周期（秒）：同一周期内对同一房间同一主题的多次广播请求只推送一次
+BROADCAST_TICK = float(os.environ.get("BROADCAST_TICK", "0.05"))
+
+# 推送扇出：固定的补发工作线程数、每个落后连接最多排队的消息数、
+# 传输层积压多少个数据包算作落后、连续落后多少秒后断开连接
+FANOUT_WORKERS = int(os.environ.get("FANOUT_WORKERS", "4"))
+FANOUT_QUEUE_SIZE = int(os.environ.get("FANOUT_QUEUE_SIZE", "256"))
+FANOUT_TRANSPORT_BACKLOG = int(os.environ.get("FANOUT_TRANSPORT_BACKLOG", "64"))
+FANOUT_STALL_TIMEOUT = float(os.environ.get("FANOUT_STALL_TIMEOUT", "15"))
+
+# 断线重连宽限期（秒）：组的最后一个连接断开后等这么久仍未重连才按退出游戏处理，0 表示立即处理
+RECONNECT_GRACE = float(os.environ.get("RECONNECT_GRACE", "20"))
+# 每个房间保留的最近广播事件条数，重连时据此补发错过的事件
+EVENT_BUFFER_SIZE = int(os.environ.get("EVENT_BUFFER_SIZE", "256"))
+
+# 长轮询（GET /api/status?since=&wait=）单次最长等待时间（秒）
+LONG_POLL_MAX_WAIT = float(os.environ.get("LONG_POLL_MAX_WAIT", "30"))
+
+# 事件日志目录：每个房间的状态变更追加写入 <目录>/<房间ID>.log，启动时重放恢复；为空时不记录
+JOURNAL_DIR = os.environ.get("JOURNAL_DIR", "")
+# 事件日志批量刷盘（fsync）周期（秒）：进程崩溃时最多丢失这段时间内的事件
+JOURNAL_FSYNC_INTERVAL = float(os.environ.get("JOURNAL_FSYNC_INTERVAL", "0.05"))
+
+# 快照目录：后台线程每 SNAPSHOT_INTERVAL 秒把状态有变化的房间写入 <目录>/<房间ID>.snap；为空时不写快照
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "")
+SNAPSHOT_INTERVAL = float(os.environ.get("SNAPSHOT_INTERVAL", "30"))
+
+# 对局归档数据库（SQLite）：已结束的回合和游戏写入这里，内存中只保留进行中的一局；为空时不归档
+ARCHIVE_DB = os.environ.get("ARCHIVE_DB", "")
+# 归档批量写入周期（秒）
+ARCHIVE_FLUSH_INTERVAL = float(os.environ.get("ARCHIVE_FLUSH_INTERVAL", "0.5"))
+
+# 投票阶段是否向主持方实时推送计票（vote_tally_update，只发往主持方子频道）
+LIVE_VOTE_TALLY = os.environ.get("LIVE_VOTE_TALLY", "0") == "1"
+
+# 提前结束投票：领先者的优势已无法被剩余的票追平时，剩余未投票的组按弃权处理并立即结算
+EARLY_VOTE_CLOSE = os.environ.get("EARLY_VOTE_CLOSE", "0") == "1"
+
+# 每个房间内存中保留的异常报告条数，更早的报告转存到对局归档（未开启归档时直接丢弃）
+REPORT_RETENTION = int(os.environ.get("REPORT_RETENTION", "200"))
+
 
 def load_word_pairs():
     """从words.txt加载词语对"""
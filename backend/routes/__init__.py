@@ -3,7 +3,8 @@
 """
 from .game import register_game_routes, init_game_routes
 from .player import register_player_routes, init_player_routes
-from .public import register_public_routes, init_public_routes
+from .public import register_public_routes
+from .rooms import register_room_routes, init_room_routes
 
 
 def register_all_routes(app):
@@ -11,4 +12,4 @@ def register_all_routes(app):
     register_game_routes(app)
     register_player_routes(app)
     register_public_routes(app)
-
+    register_room_routes(app)
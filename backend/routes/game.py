@@ -2,31 +2,28 @@
 游戏控制路由模块（主持方专用）
 """
 from flask import request
-from backend.utils import require_admin, admin_forbidden_response, make_response, get_websocket_status
-from backend.services import broadcast_status, broadcast_game_state, broadcast_descriptions, broadcast_groups, broadcast_scores, start_timer_broadcast, stop_timer_broadcast
-from backend.config import WORD_PAIRS
+from backend.utils import room_route, require_admin, admin_forbidden_response, make_response, get_websocket_status, issue_host_ticket
+from backend.services import mark_dirty, start_timer_broadcast, stop_timer_broadcast, emit_after_commit, room_transaction
+from backend.config import WORD_PAIRS, HOST_TICKET_TTL
 import random
 
 # 这些变量需要在运行时注入
-game = None
-game_lock = None
 socketio = None
 
 
-def init_game_routes(game_instance, lock, socketio_instance):
+def init_game_routes(socketio_instance):
     """初始化游戏路由"""
-    global game, game_lock, socketio
-    game = game_instance
-    game_lock = lock
+    global socketio
     socketio = socketio_instance
 
 
 def register_game_routes(app):
     """注册游戏控制路由"""
     
-    @app.route('/api/game/start', methods=['POST'])
-    def start_game():
+    @room_route(app, '/api/game/start', methods=['POST'])
+    def start_game(room):
         """开始游戏接口（主持方调用）"""
+        game = room.game
         if not require_admin():
             return admin_forbidden_response()
         data = request.json
@@ -40,16 +37,14 @@ def register_game_routes(app):
         elif not undercover_word or not civilian_word:
             return make_response({}, 400, '词语不能为空，且词库未加载')
 
-        with game_lock:
-            websocket_status = get_websocket_status()
+        with room.lock:
+            # 先解析出每个组的在线状态再传入，事件日志重放时不依赖当时的连接和活跃时间
+            websocket_status = game.get_online_status(get_websocket_status(room))
             success = game.start_game(undercover_word, civilian_word, websocket_status)
             if success:
                 # 游戏开始后不启动倒计时，等待玩家准备后再开始回合
-                # 广播状态变化
-                socketio.start_background_task(broadcast_status)
-                socketio.start_background_task(broadcast_game_state)
-                # 广播组列表更新（因为可能有离线玩家被标记为淘汰）
-                socketio.start_background_task(broadcast_groups)
+                # 广播状态变化和组列表更新（因为可能有离线玩家被标记为淘汰），向各组推送分配到的词语
+                mark_dirty(room, 'status', 'game_state', 'groups', 'private')
                 
                 # 只返回在线玩家的角色信息
                 online_status = game.get_online_status(websocket_status)
@@ -67,21 +62,39 @@ def register_game_routes(app):
             else:
                 return make_response({}, 400, '无法开始游戏：游戏状态不正确或没有在线的组')
 
-    @app.route('/api/game/round/start', methods=['POST'])
-    def start_round():
+    @room_route(app, '/api/game/lobby_mode', methods=['POST'])
+    def set_lobby_mode(room):
+        """开启/关闭大厅模式接口（主持方调用，游戏开始前或结束后）"""
+        game = room.game
+        if not require_admin():
+            return admin_forbidden_response()
+        data = request.json or {}
+        enabled = data.get('enabled')
+        if not isinstance(enabled, bool):
+            return make_response({}, 400, 'enabled 必须是布尔值')
+        with room.lock:
+            success, message = game.set_lobby_mode(enabled)
+            if not success:
+                return make_response({}, 400, message)
+            mark_dirty(room, 'status', 'game_state')
+            return make_response({
+                'lobby_mode': game.lobby_mode,
+                'max_groups': game.max_groups()
+            }, 200, message)
+
+    @room_route(app, '/api/game/round/start', methods=['POST'])
+    def start_round(room):
         """开始新回合接口（主持方调用）"""
+        game = room.game
         if not require_admin():
             return admin_forbidden_response()
-        with game_lock:
+        with room.lock:
             order = game.start_round()
             if order:
                 # 启动倒计时广播
-                start_timer_broadcast()
-                # 广播状态变化
-                socketio.start_background_task(broadcast_status)
-                socketio.start_background_task(broadcast_game_state)
-                # 广播描述列表更新（新回合开始时描述列表被清空）
-                socketio.start_background_task(broadcast_descriptions)
+                start_timer_broadcast(room)
+                # 广播状态变化和描述列表（新回合开始时描述列表被清空）
+                mark_dirty(room, 'status', 'game_state', 'descriptions')
                 return make_response({
                     'round': game.current_round,
                     'order': order
@@ -89,83 +102,149 @@ def register_game_routes(app):
             else:
                 return make_response({}, 400, '无法开始回合：游戏状态不正确或活跃组数不足')
 
-    @app.route('/api/game/voting/process', methods=['POST'])
-    def process_voting():
+    @room_route(app, '/api/game/voting/process', methods=['POST'])
+    def process_voting(room):
         """处理投票结果接口（主持方调用）"""
+        game = room.game
         if not require_admin():
             return admin_forbidden_response()
-        with game_lock:
+        with room_transaction(room):
             # 处理投票前，先检测未提交的组并自动记录异常
             result = game.process_voting_result()
             if 'error' in result:
                 return make_response(result, 400, result.get('error', '投票处理失败'))
             # 停止倒计时广播
-            stop_timer_broadcast()
+            stop_timer_broadcast(room)
             # 广播状态变化
-            socketio.start_background_task(broadcast_status)
-            socketio.start_background_task(broadcast_game_state)
-            # 广播投票结果
-            socketio.emit('vote_result', result)
-            # 广播分数更新（因为分数可能变化）
-            socketio.start_background_task(broadcast_scores)
+            mark_dirty(room, 'status', 'game_state')
+            # 广播投票结果（释放写锁之后发出）
+            emit_after_commit(room, 'vote_result', result)
+            # 广播分数更新（因为分数可能变化），向各组推送自己的投票明细
+            mark_dirty(room, 'scores', 'private')
             
             # 如果游戏未结束且处于 ROUND_END 状态，自动开始下一回合
             if not result.get('game_ended') and game.game_status.value == 'round_end':
                 order = game.start_round()
                 if order:
                     # 启动倒计时广播
-                    start_timer_broadcast()
-                    # 广播状态变化
-                    socketio.start_background_task(broadcast_status)
-                    socketio.start_background_task(broadcast_game_state)
-                    # 广播描述列表更新（新回合开始时描述列表被清空）
-                    socketio.start_background_task(broadcast_descriptions)
+                    start_timer_broadcast(room)
+                    # 广播状态变化和描述列表（新回合开始时描述列表被清空）
+                    mark_dirty(room, 'status', 'game_state', 'descriptions')
             
             return make_response(result, 200, '投票结果已生成')
 
-    @app.route('/api/game/state', methods=['GET'])
-    def get_game_state():
+    @room_route(app, '/api/game/state', methods=['GET'])
+    def get_game_state(room):
         """获取游戏状态接口"""
+        game = room.game
         if not require_admin():
             return admin_forbidden_response()
-        with game_lock:
-            websocket_status = get_websocket_status()
+        with room.lock.read():
+            websocket_status = get_websocket_status(room)
             state = game.get_game_state()
             # 更新在线状态（使用WebSocket连接状态）
             state['online_status'] = game.get_online_status(websocket_status)
             return make_response(state)
 
-    @app.route('/api/game/reset', methods=['POST'])
-    def reset_game():
+    @room_route(app, '/api/game/archive', methods=['GET'])
+    def get_archived_games(room):
+        """查询已归档的游戏列表（主持方调用），支持 limit / offset 分页"""
+        if not require_admin():
+            return admin_forbidden_response()
+        archive = room.game.archive
+        if archive is None:
+            return make_response({}, 404, '未开启对局归档')
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        games = archive.list_games(limit, offset)
+        return make_response({'games': games, 'limit': limit, 'offset': offset})
+
+    @room_route(app, '/api/game/archive/rounds', methods=['GET'])
+    def get_archived_rounds(room):
+        """查询某局已归档的回合（主持方调用），参数 game_id 必填，round / group 可选"""
+        if not require_admin():
+            return admin_forbidden_response()
+        archive = room.game.archive
+        if archive is None:
+            return make_response({}, 404, '未开启对局归档')
+        game_id = request.args.get('game_id', '').strip()
+        if not game_id:
+            return make_response({}, 400, 'game_id不能为空')
+        rounds = archive.get_rounds(game_id, request.args.get('round', type=int),
+                                    request.args.get('group', '').strip() or None)
+        return make_response({'game_id': game_id, 'rounds': rounds, 'total': len(rounds)})
+
+    @room_route(app, '/api/game/reports', methods=['GET'])
+    def get_reports(room):
+        """
+        分页查询异常报告（主持方调用，最新的在前）
+        可选参数 group / type / round 过滤，limit / offset 分页；
+        内存中保留的报告之后接着是转存到对局归档的更早报告
+        """
+        if not require_admin():
+            return admin_forbidden_response()
+        game = room.game
+        group = request.args.get('group', '').strip() or None
+        report_type = request.args.get('type', '').strip() or None
+        round_num = request.args.get('round', type=int)
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+
+        with room.lock.read():
+            total, reports = game.reports.query(group, report_type, round_num, offset, limit)
+            archive = game.archive
+        if archive is not None:
+            # 内存中的匹配条数不够一页时，从归档中接着取
+            archived_total, archived = archive.list_reports(
+                group, report_type, round_num, max(offset - total, 0), limit - len(reports))
+            if len(reports) < limit:
+                reports = reports + archived
+            total += archived_total
+        return make_response({
+            'reports': reports,
+            'total': total,
+            'limit': limit,
+            'offset': offset
+        })
+
+    @room_route(app, '/api/host/ticket', methods=['POST'])
+    def host_ticket(room):
+        """
+        签发主持方连接凭证（主持方调用）
+        看板页面用它代替主持方令牌连接 WebSocket，只能加入本房间的主持方子频道
+        """
+        if not require_admin():
+            return admin_forbidden_response()
+        return make_response({
+            'ticket': issue_host_ticket(room.room_id),
+            'expires_in': HOST_TICKET_TTL
+        }, 200, '获取成功')
+
+    @room_route(app, '/api/game/reset', methods=['POST'])
+    def reset_game(room):
         """重置游戏接口（主持方调用）"""
+        game = room.game
         if not require_admin():
             return admin_forbidden_response()
-        with game_lock:
+        with room.lock:
             game.reset_game()
             # 停止倒计时广播
-            stop_timer_broadcast()
-            # 广播状态变化
-            socketio.start_background_task(broadcast_status)
-            socketio.start_background_task(broadcast_game_state)
-            # 广播组列表和分数更新（重置后数据变化）
-            socketio.start_background_task(broadcast_groups)
-            socketio.start_background_task(broadcast_scores)
+            stop_timer_broadcast(room)
+            # 广播状态变化、组列表、分数和各组的私有状态（数据已清空）
+            mark_dirty(room, 'status', 'game_state', 'groups', 'scores', 'private')
             return make_response({}, 200, '游戏已重置')
 
-    @app.route('/api/game/clear_all', methods=['POST'])
-    def clear_all():
+    @room_route(app, '/api/game/clear_all', methods=['POST'])
+    def clear_all(room):
         """完全清空所有组和缓存接口（主持方调用）"""
+        game = room.game
         if not require_admin():
             return admin_forbidden_response()
-        with game_lock:
+        with room.lock:
             game.clear_all()
             # 停止倒计时广播
-            stop_timer_broadcast()
-            # 广播状态变化
-            socketio.start_background_task(broadcast_status)
-            socketio.start_background_task(broadcast_game_state)
-            # 广播组列表和分数更新（清空后数据变化）
-            socketio.start_background_task(broadcast_groups)
-            socketio.start_background_task(broadcast_scores)
+            stop_timer_broadcast(room)
+            # 广播状态变化、组列表、分数和各组的私有状态（数据已清空）
+            mark_dirty(room, 'status', 'game_state', 'groups', 'scores', 'private')
             return make_response({}, 200, '已清空所有组和缓存')
 
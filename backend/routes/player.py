@@ -2,29 +2,26 @@
 玩家相关路由模块（游戏方调用）
 """
 from flask import request
-from backend.utils import make_response, get_websocket_status
-from backend.services import broadcast_status, broadcast_game_state, broadcast_descriptions, broadcast_groups, start_timer_broadcast, stop_timer_broadcast, broadcast_scores
+from backend.utils import room_route, make_response, get_websocket_status
+from backend.services import mark_dirty, start_timer_broadcast, stop_timer_broadcast, restart_deadline, emit_after_commit, room_transaction
 
 # 这些变量需要在运行时注入
-game = None
-game_lock = None
 socketio = None
 
 
-def init_player_routes(game_instance, lock, socketio_instance):
+def init_player_routes(socketio_instance):
     """初始化玩家路由"""
-    global game, game_lock, socketio
-    game = game_instance
-    game_lock = lock
+    global socketio
     socketio = socketio_instance
 
 
 def register_player_routes(app):
     """注册玩家相关路由"""
     
-    @app.route('/api/register', methods=['POST'])
-    def register():
+    @room_route(app, '/api/register', methods=['POST'])
+    def register(room):
         """游戏方注册接口"""
+        game = room.game
         data = request.json
         group_name = data.get('group_name') or data.get('group_id', '')
         group_name = group_name.strip() if isinstance(group_name, str) else ''
@@ -32,48 +29,50 @@ def register_player_routes(app):
         if not group_name:
             return make_response({}, 400, '组名不能为空')
 
-        with game_lock:
+        with room.lock:
             success = game.register_group(group_name)
             if success:
-                # 广播状态变化
-                socketio.start_background_task(broadcast_status)
-                socketio.start_background_task(broadcast_game_state)
-                # 广播组列表更新
-                socketio.start_background_task(broadcast_groups)
+                # 广播状态变化和组列表更新
+                mark_dirty(room, 'status', 'game_state', 'groups')
                 return make_response({
                     'group_name': group_name,
                     'total_groups': len(game.groups)
                 }, 200, '注册成功')
             else:
-                return make_response({}, 400, '注册失败：组名已存在或已达到最大组数(5组)')
+                return make_response({}, 400, f'注册失败：组名已存在或已达到最大组数({game.max_groups()}组)')
 
-    @app.route('/api/describe', methods=['POST'])
-    def submit_description():
+    @room_route(app, '/api/describe', methods=['POST'])
+    def submit_description(room):
         """提交描述接口（游戏方调用）"""
+        game = room.game
         data = request.json
         group_name = data.get('group_name', '').strip()
         description = data.get('description', '').strip()
+        # 还没轮到时提前排队，轮到该组时立即公开
+        queue = data.get('queue') is True
 
         if not group_name or not description:
             return make_response({}, 400, '组名和描述不能为空')
 
-        with game_lock:
-            success, message = game.submit_description(group_name, description)
+        with room.lock:
+            previous_status = game.game_status
+            success, message = game.submit_description(group_name, description, queue=queue)
             if success:
-                # 广播状态变化
-                socketio.start_background_task(broadcast_status)
-                socketio.start_background_task(broadcast_game_state)
-                # 广播描述列表更新
-                socketio.start_background_task(broadcast_descriptions)
+                # 广播状态变化和描述列表更新（连续公开的多条描述合并为一次推送）
+                mark_dirty(room, 'status', 'game_state', 'descriptions')
+                if game.game_status != previous_status:
+                    # 所有组已提交描述，提前进入投票阶段：按投票阶段的截止时间重新登记
+                    restart_deadline(room)
                 # 获取当前描述列表
                 current_descriptions = game.descriptions.get(game.current_round, [])
                 return make_response({
                     'round': game.current_round,
-                    'total_descriptions': len(current_descriptions)
+                    'total_descriptions': len(current_descriptions),
+                    'queued': group_name in game.pending_descriptions
                 }, 200, message)
             else:
                 # 返回当前状态
-                websocket_status = get_websocket_status()
+                websocket_status = get_websocket_status(room)
                 status = game.get_public_status()
                 # 更新在线状态（使用WebSocket连接状态）
                 status['online_status'] = game.get_online_status(websocket_status)
@@ -83,9 +82,10 @@ def register_player_routes(app):
                     'is_eliminated': group_name in game.eliminated_groups
                 }, 200, message)
 
-    @app.route('/api/vote', methods=['POST'])
-    def submit_vote():
+    @room_route(app, '/api/vote', methods=['POST'])
+    def submit_vote(room):
         """提交投票接口（游戏方调用）"""
+        game = room.game
         data = request.json
         voter_group = data.get('voter_group', '').strip()
         target_group = data.get('target_group', '').strip()
@@ -93,38 +93,34 @@ def register_player_routes(app):
         if not voter_group or not target_group:
             return make_response({}, 400, '投票者和被投票者不能为空')
 
-        with game_lock:
+        with room_transaction(room):
             success, message, all_voted = game.submit_vote(voter_group, target_group)
             
             if success:
-                # 广播状态变化
-                socketio.start_background_task(broadcast_status)
+                # 广播状态变化和实时计票
+                mark_dirty(room, 'status', 'vote_tally')
                 
                 # 如果所有人都投票了，自动处理投票结果
                 if all_voted:
                     vote_result = game.process_voting_result()
                     if 'error' not in vote_result:
                         # 停止倒计时广播
-                        stop_timer_broadcast()
+                        stop_timer_broadcast(room)
                         # 广播状态变化
-                        socketio.start_background_task(broadcast_status)
-                        socketio.start_background_task(broadcast_game_state)
-                        # 广播投票结果
-                        socketio.emit('vote_result', vote_result)
-                        # 广播分数更新（因为分数可能变化）
-                        socketio.start_background_task(broadcast_scores)
+                        mark_dirty(room, 'status', 'game_state')
+                        # 广播投票结果（释放写锁之后发出）
+                        emit_after_commit(room, 'vote_result', vote_result)
+                        # 广播分数更新（因为分数可能变化），向各组推送自己的投票明细
+                        mark_dirty(room, 'scores', 'private')
                         
                         # 如果游戏未结束且处于 ROUND_END 状态，自动开始下一回合
                         if not vote_result.get('game_ended') and game.game_status.value == 'round_end':
                             order = game.start_round()
                             if order:
                                 # 启动倒计时广播
-                                start_timer_broadcast()
-                                # 广播状态变化
-                                socketio.start_background_task(broadcast_status)
-                                socketio.start_background_task(broadcast_game_state)
-                                # 广播描述列表更新（新回合开始时描述列表被清空）
-                                socketio.start_background_task(broadcast_descriptions)
+                                start_timer_broadcast(room)
+                                # 广播状态变化和描述列表（新回合开始时描述列表被清空）
+                                mark_dirty(room, 'status', 'game_state', 'descriptions')
                         
                         return make_response({
                             'auto_processed': True,
@@ -139,34 +135,31 @@ def register_player_routes(app):
                     'is_eliminated': is_eliminated
                 }, 400, message or '投票提交失败')
 
-    @app.route('/api/ready', methods=['POST'])
-    def submit_ready():
+    @room_route(app, '/api/ready', methods=['POST'])
+    def submit_ready(room):
         """提交准备就绪接口（游戏方调用）"""
+        game = room.game
         data = request.json
         group_name = data.get('group_name', '').strip()
 
         if not group_name:
             return make_response({}, 400, '组名不能为空')
 
-        with game_lock:
+        with room.lock:
             success, message, all_ready = game.submit_ready(group_name)
             
             if success:
                 # 广播状态变化
-                socketio.start_background_task(broadcast_status)
-                socketio.start_background_task(broadcast_game_state)
+                mark_dirty(room, 'status', 'game_state')
                 
                 # 如果所有人都准备好了，自动开始回合
                 if all_ready:
                     order = game.start_round()
                     if order:
                         # 启动倒计时广播
-                        start_timer_broadcast()
-                        # 广播状态变化
-                        socketio.start_background_task(broadcast_status)
-                        socketio.start_background_task(broadcast_game_state)
-                        # 广播描述列表更新（新回合开始时描述列表被清空）
-                        socketio.start_background_task(broadcast_descriptions)
+                        start_timer_broadcast(room)
+                        # 广播状态变化和描述列表（新回合开始时描述列表被清空）
+                        mark_dirty(room, 'status', 'game_state', 'descriptions')
                         return make_response({
                             'auto_started': True,
                             'round': game.current_round,
@@ -1,61 +1,87 @@
 """
 公开API路由模块（游戏方查询接口）
 """
+import zlib
 from flask import request
-from backend.utils import make_response, get_websocket_status
+from backend.utils import room_route, make_response, make_cached_response, encode_json, get_websocket_status
+from backend.utils import state_etag, etag_matches, not_modified_response
+from backend.config import LONG_POLL_MAX_WAIT
 
-# 这些变量需要在运行时注入
-game = None
-game_lock = None
 
-
-def init_public_routes(game_instance, lock):
-    """初始化公开路由"""
-    global game, game_lock
-    game = game_instance
-    game_lock = lock
+def public_status_json(room) -> str:
+    """
+    公开状态中与时间无关部分的JSON（需持有读锁），按状态版本号缓存
+    同一版本的并发读者可能重复序列化一次，结果相同，直接覆盖即可
+    """
+    game = room.game
+    cached = room.status_json
+    if cached is not None and cached[0] == game.version:
+        return cached[1]
+    encoded = encode_json(game.get_public_status_static())
+    room.status_json = (game.version, encoded)
+    return encoded
 
 
 def register_public_routes(app):
     """注册公开API路由"""
     
-    @app.route('/api/status', methods=['GET'])
-    def public_status():
-        """游戏方公共状态接口"""
+    @room_route(app, '/api/status', methods=['GET'])
+    def public_status(room):
+        """
+        游戏方公共状态接口
+        长轮询：传入 since=<上次收到的version> 和 wait=<秒数> 时，在状态版本号前进或超时前不返回，
+        等待期间不持有房间锁
+        """
+        game = room.game
         # 可选的组名参数，用于更新活跃时间
         group_name = request.args.get('group_name', '').strip()
+        since = request.args.get('since', type=int)
+        wait = min(request.args.get('wait', 0, type=float), LONG_POLL_MAX_WAIT)
+        if since is not None and wait > 0:
+            room.wait_for_change(since, wait)
 
-        with game_lock:
-            # 如果提供了组名，更新活跃时间
+        with room.lock.read():
+            # 如果提供了组名，更新活跃时间（只是覆盖已有组的时间戳，在读锁下并发写入是安全的）
             if group_name:
                 game.update_activity(group_name)
-            websocket_status = get_websocket_status()
-            status = game.get_public_status()
+            # 与时间无关的部分直接使用缓存的JSON，只重新计算倒计时和在线状态
+            status_json = public_status_json(room)
+            extra = game.get_countdown()
+            websocket_status = get_websocket_status(room)
             # 更新在线状态（使用WebSocket连接状态）
-            status['online_status'] = game.get_online_status(websocket_status)
+            extra['online_status'] = game.get_online_status(websocket_status)
             # 添加是否为淘汰组的信息
             if group_name:
-                status['is_eliminated'] = group_name in game.eliminated_groups
-            return make_response(status)
-
-    @app.route('/api/result', methods=['GET'])
-    def public_result():
+                extra['is_eliminated'] = group_name in game.eliminated_groups
+            # 剩余秒数、在线状态等也计入 ETag（描述/投票阶段每秒变化，其余阶段轮询基本都是 304）；
+            # server_time_ms 每次都不同，不计入，客户端只应在收到 200 时用它校准时钟
+            etag_fields = {k: v for k, v in extra.items() if k != 'server_time_ms'}
+            etag = f"{state_etag(room)}-{zlib.crc32(encode_json(etag_fields).encode('utf-8')):08x}"
+        return make_cached_response(status_json, extra, etag=etag)
+
+    @room_route(app, '/api/result', methods=['GET'])
+    def public_result(room):
         """最近一次投票结果"""
-        with game_lock:
+        game = room.game
+        with room.lock.read():
+            etag = state_etag(room)
+            if etag_matches(etag):
+                return not_modified_response(etag)
             result = game.get_last_result()
             if not result:
                 return make_response({}, 404, '当前暂无投票结果')
-            return make_response(result)
+            return make_response(result, etag=etag)
 
-    @app.route('/api/word', methods=['GET'])
-    def get_word():
+    @room_route(app, '/api/word', methods=['GET'])
+    def get_word(room):
         """获取词语接口（游戏方调用，仅返回自己的词语）"""
+        game = room.game
         group_name = request.args.get('group_name', '').strip()
 
         if not group_name:
             return make_response({}, 400, '组名不能为空')
 
-        with game_lock:
+        with room.lock.read():
             # 检查是否被淘汰（淘汰组也可以看到自己的词语）
             word = game.get_group_word(group_name)
             if word:
@@ -63,12 +89,17 @@ def register_public_routes(app):
             else:
                 return make_response({}, 404, '未找到该组的词语或游戏未开始')
 
-    @app.route('/api/descriptions', methods=['GET'])
-    def get_descriptions():
+    @room_route(app, '/api/descriptions', methods=['GET'])
+    def get_descriptions(room):
         """获取当前回合的描述列表（游戏方调用）"""
+        game = room.game
         round_num = request.args.get('round', type=int)
 
-        with game_lock:
+        with room.lock.read():
+            # ETag 按URL区分，不同 round 参数各自缓存
+            etag = state_etag(room)
+            if etag_matches(etag):
+                return not_modified_response(etag)
             if round_num is None:
                 round_num = game.current_round
 
@@ -84,12 +115,16 @@ def register_public_routes(app):
                 'round': round_num,
                 'descriptions': result,
                 'total': len(result)
-            })
+            }, etag=etag)
 
-    @app.route('/api/groups', methods=['GET'])
-    def get_groups():
+    @room_route(app, '/api/groups', methods=['GET'])
+    def get_groups(room):
         """获取所有注册的组接口"""
-        with game_lock:
+        game = room.game
+        with room.lock.read():
+            etag = state_etag(room)
+            if etag_matches(etag):
+                return not_modified_response(etag)
             groups_info = []
             for name, info in game.groups.items():
                 groups_info.append({
@@ -100,24 +135,29 @@ def register_public_routes(app):
             return make_response({
                 'groups': groups_info,
                 'total': len(groups_info)
-            })
+            }, etag=etag)
 
-    @app.route('/api/vote/details', methods=['GET'])
-    def get_vote_details():
+    @room_route(app, '/api/vote/details', methods=['GET'])
+    def get_vote_details(room):
         """获取详细的投票信息（游戏方调用）"""
+        game = room.game
         group_name = request.args.get('group_name', '').strip()
 
         if not group_name:
             return make_response({}, 400, '组名不能为空')
 
-        with game_lock:
+        with room.lock.read():
             result = game.get_vote_details_for_group(group_name)
             return make_response(result)
 
-    @app.route('/api/scores', methods=['GET'])
-    def get_scores():
+    @room_route(app, '/api/scores', methods=['GET'])
+    def get_scores(room):
         """获取所有组的总分接口（游戏方调用）"""
-        with game_lock:
+        game = room.game
+        with room.lock.read():
+            etag = state_etag(room)
+            if etag_matches(etag):
+                return not_modified_response(etag)
             # 按分数排序（从高到低）
             sorted_scores = sorted(
                 game.scores.items(),
@@ -137,5 +177,5 @@ def register_public_routes(app):
             return make_response({
                 'scores': scores_list,
                 'total_groups': len(scores_list)
-            })
+            }, etag=etag)
 
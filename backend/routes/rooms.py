@@ -0,0 +1,70 @@
+"""
+房间管理路由模块（主持方专用）
+"""
+import re
+from flask import request
+from backend.utils import require_admin, admin_forbidden_response, make_response
+from backend.services import stop_timer_broadcast
+from backend.websocket.handlers import close_room_channels
+
+# 这些变量需要在运行时注入
+rooms = None
+socketio = None
+
+# 房间ID只允许字母、数字、下划线和短横线
+ROOM_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,32}$')
+
+
+def init_room_routes(room_registry, socketio_instance):
+    """初始化房间路由"""
+    global rooms, socketio
+    rooms = room_registry
+    socketio = socketio_instance
+
+
+def register_room_routes(app):
+    """注册房间管理路由"""
+
+    @app.route('/api/rooms', methods=['GET'])
+    def list_rooms():
+        """获取所有房间概要接口（主持方调用）"""
+        if not require_admin():
+            return admin_forbidden_response()
+        summaries = [room.summary() for room in rooms.all()]
+        return make_response({
+            'rooms': summaries,
+            'total': len(summaries),
+            'max_rooms': rooms.max_rooms
+        })
+
+    @app.route('/api/rooms', methods=['POST'])
+    def create_room():
+        """创建房间接口（主持方调用），room_id为空时自动生成"""
+        if not require_admin():
+            return admin_forbidden_response()
+        data = request.get_json(silent=True) or {}
+        room_id = data.get('room_id', '')
+        room_id = room_id.strip() if isinstance(room_id, str) else ''
+
+        if room_id and not ROOM_ID_PATTERN.match(room_id):
+            return make_response({}, 400, '房间ID只能包含字母、数字、下划线和短横线（最长32位）')
+
+        room = rooms.create(room_id or None)
+        if room is None:
+            return make_response({}, 400, '创建房间失败：房间已存在或已达到最大房间数')
+        return make_response(room.summary(), 200, '房间已创建')
+
+    @app.route('/api/rooms/<room_id>', methods=['DELETE'])
+    def delete_room(room_id):
+        """删除房间接口（主持方调用），默认房间不可删除"""
+        if not require_admin():
+            return admin_forbidden_response()
+        room = rooms.remove(room_id)
+        if room is None:
+            return make_response({}, 404, '房间不存在或不可删除')
+        with room.lock:
+            stop_timer_broadcast(room)
+        # 通知房间内的客户端，解散频道及所有子频道
+        socketio.emit('room_closed', {'room_id': room_id}, to=room.channel)
+        close_room_channels(room)
+        return make_response({'room_id': room_id}, 200, '房间已删除')
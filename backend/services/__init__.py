@@ -1,8 +1,8 @@
 """
 后端服务模块
 """
-from .broadcast import init_broadcast, broadcast_status, broadcast_game_state, broadcast_descriptions, broadcast_groups, broadcast_scores
-from .timer import init_timer, start_timer_broadcast, stop_timer_broadcast
+from .broadcast import init_broadcast, broadcast_status, broadcast_game_state, broadcast_descriptions, broadcast_groups, broadcast_scores, build_status, build_game_state, get_published_state, mark_dirty, emit_after_commit, room_transaction
+from .timer import init_timer, start_timer_broadcast, stop_timer_broadcast, restart_deadline
 
 __all__ = [
     'init_broadcast',
@@ -12,7 +12,14 @@ __all__ = [
     'broadcast_descriptions',
     'broadcast_groups',
     'broadcast_scores',
+    'build_status',
+    'build_game_state',
+    'get_published_state',
+    'mark_dirty',
+    'emit_after_commit',
+    'room_transaction',
     'start_timer_broadcast',
-    'stop_timer_broadcast'
+    'stop_timer_broadcast',
+    'restart_deadline'
 ]
 
@@ -0,0 +1,260 @@
+"""
+对局归档模块
+已结束的回合（描述、投票、投票结果）和已结束的游戏写入本地 SQLite 数据库（ARCHIVE_DB），
+内存中的 GameLogic.descriptions / votes 只保留进行中的这一局；
+超出内存保留条数的异常报告（ReportStore 挤出的最旧报告）也转存到这里
+
+- GameLogic 在回合或游戏结束时调用 RoomArchive.archive_round / archive_game，
+  这里只把行数据放进内存队列（在房间写锁内，不做磁盘IO）
+- 唯一的写入线程每个周期（ARCHIVE_FLUSH_INTERVAL）把队列中的行在一个事务里批量插入
+- 数据库使用 WAL 模式，查询接口各自打开只读连接，不会被批量写入阻塞
+- 所有插入都是 INSERT OR REPLACE（主键为 对局ID + 回合 等），从事件日志重放时重复归档不会产生重复行
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from backend.config import ARCHIVE_FLUSH_INTERVAL
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id TEXT PRIMARY KEY,
+    room_id TEXT NOT NULL,
+    started_at TEXT,
+    ended_at TEXT,
+    undercover_group TEXT,
+    undercover_word TEXT,
+    civilian_word TEXT,
+    winner TEXT,
+    rounds INTEGER,
+    roles TEXT,
+    scores TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_games_room ON games (room_id, ended_at);
+
+CREATE TABLE IF NOT EXISTS rounds (
+    game_id TEXT NOT NULL,
+    round INTEGER NOT NULL,
+    room_id TEXT NOT NULL,
+    ended_at TEXT,
+    eliminated TEXT,
+    result TEXT,
+    PRIMARY KEY (game_id, round)
+);
+
+CREATE TABLE IF NOT EXISTS descriptions (
+    game_id TEXT NOT NULL,
+    round INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    group_name TEXT NOT NULL,
+    description TEXT,
+    time TEXT,
+    PRIMARY KEY (game_id, round, seq)
+);
+CREATE INDEX IF NOT EXISTS idx_descriptions_group ON descriptions (group_name);
+
+CREATE TABLE IF NOT EXISTS votes (
+    game_id TEXT NOT NULL,
+    round INTEGER NOT NULL,
+    voter TEXT NOT NULL,
+    target TEXT,
+    PRIMARY KEY (game_id, round, voter)
+);
+CREATE INDEX IF NOT EXISTS idx_votes_voter ON votes (voter);
+CREATE INDEX IF NOT EXISTS idx_votes_target ON votes (target);
+
+CREATE TABLE IF NOT EXISTS reports (
+    room_id TEXT NOT NULL,
+    ticket TEXT NOT NULL,
+    group_name TEXT,
+    type TEXT,
+    detail TEXT,
+    round INTEGER,
+    time TEXT,
+    PRIMARY KEY (room_id, ticket)
+);
+CREATE INDEX IF NOT EXISTS idx_reports_room_time ON reports (room_id, time);
+"""
+
+# 表名 -> 插入语句，批量写入时同一张表的行用一次 executemany
+INSERTS = {
+    'games': 'INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+    'rounds': 'INSERT OR REPLACE INTO rounds VALUES (?, ?, ?, ?, ?, ?)',
+    'descriptions': 'INSERT OR REPLACE INTO descriptions VALUES (?, ?, ?, ?, ?, ?)',
+    'votes': 'INSERT OR REPLACE INTO votes VALUES (?, ?, ?, ?)',
+    'reports': 'INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?, ?, ?, ?)',
+}
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+class GameArchive:
+    """整个进程共用的归档数据库"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+        conn.close()
+        # 待写入的行：[(表名, 行)]
+        self._queue: List[tuple] = []
+        self._cond = threading.Condition()
+        # 保证批量写入串行进行（写入线程和手动 flush）
+        self._write_lock = threading.Lock()
+        self._writer = None
+        self._write_conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def room(self, room_id: str) -> 'RoomArchive':
+        """绑定了房间ID的归档接口（赋给 GameLogic.archive）"""
+        return RoomArchive(self, room_id)
+
+    def enqueue(self, rows: List[tuple]):
+        """加入待写入的行，必要时启动写入线程"""
+        with self._cond:
+            self._queue.extend(rows)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+                self._writer.start()
+            self._cond.notify()
+
+    def flush(self) -> int:
+        """立即把队列中的行写入数据库，返回写入的行数"""
+        with self._write_lock:
+            with self._cond:
+                rows, self._queue = self._queue, []
+            if not rows:
+                return 0
+            by_table: Dict[str, List[tuple]] = {}
+            for table, row in rows:
+                by_table.setdefault(table, []).append(row)
+            if self._write_conn is None:
+                self._write_conn = self._connect()
+                self._write_conn.execute('PRAGMA synchronous=NORMAL')
+            with self._write_conn:
+                for table, table_rows in by_table.items():
+                    self._write_conn.executemany(INSERTS[table], table_rows)
+            return len(rows)
+
+    def _writer_loop(self):
+        """写入线程：等到有行入队后，再等一个周期收集后续的行，然后在一个事务中批量插入"""
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+            time.sleep(ARCHIVE_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"归档写入错误: {e}")
+
+    def query(self, sql: str, params=()) -> List[Dict]:
+        """执行只读查询（每次使用独立连接，WAL 模式下不与写入互相阻塞）"""
+        conn = self._connect()
+        try:
+            return [dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+
+class RoomArchive:
+    """单个房间的归档接口"""
+
+    __slots__ = ('store', 'room_id')
+
+    def __init__(self, store: GameArchive, room_id: str):
+        self.store = store
+        self.room_id = room_id
+
+    def archive_round(self, game_id: str, round_num: int, descriptions: List[Dict],
+                      votes: Dict[str, str], result: Optional[Dict], ended_at: str):
+        """归档一个已结束的回合"""
+        eliminated = result.get('eliminated', []) if result else []
+        rows = [('rounds', (game_id, round_num, self.room_id, ended_at, _dumps(eliminated),
+                            _dumps(result) if result else None))]
+        for seq, desc in enumerate(descriptions):
+            rows.append(('descriptions', (game_id, round_num, seq, desc['group'],
+                                          desc['description'], desc.get('time', ''))))
+        for voter, target in votes.items():
+            rows.append(('votes', (game_id, round_num, voter, target)))
+        self.store.enqueue(rows)
+
+    def archive_game(self, game_id: str, info: Dict):
+        """归档一局已结束的游戏"""
+        self.store.enqueue([('games', (
+            game_id, self.room_id, info.get('started_at'), info.get('ended_at'),
+            info.get('undercover_group'), info.get('undercover_word'), info.get('civilian_word'),
+            info.get('winner'), info.get('rounds'), _dumps(info.get('roles', {})),
+            _dumps(info.get('scores', {}))
+        ))])
+
+    def archive_report(self, entry: Dict):
+        """转存一条被挤出内存的异常报告"""
+        self.store.enqueue([('reports', (
+            self.room_id, entry['ticket'], entry['group'], entry['type'], entry['detail'],
+            entry.get('round'), entry['time']
+        ))])
+
+    def list_reports(self, group: Optional[str] = None, report_type: Optional[str] = None,
+                     round_num: Optional[int] = None, offset: int = 0, limit: int = 50) -> Tuple[int, List[Dict]]:
+        """按条件分页查询转存的异常报告（最新的在前），返回 (总数, 当前页)"""
+        where, params = 'room_id = ?', [self.room_id]
+        for column, value in (('group_name', group), ('type', report_type), ('round', round_num)):
+            if value is not None:
+                where += f' AND {column} = ?'
+                params.append(value)
+        total = self.store.query(f'SELECT COUNT(*) AS n FROM reports WHERE {where}', params)[0]['n']
+        rows = self.store.query(
+            f'SELECT ticket, group_name AS "group", type, detail, round, time FROM reports '
+            f'WHERE {where} ORDER BY time DESC, ticket DESC LIMIT ? OFFSET ?', params + [limit, offset])
+        return total, rows
+
+    def list_games(self, limit: int = 20, offset: int = 0) -> List[Dict]:
+        """房间已归档的游戏（最近结束的在前）"""
+        games = self.store.query(
+            'SELECT * FROM games WHERE room_id = ? ORDER BY ended_at DESC LIMIT ? OFFSET ?',
+            (self.room_id, limit, offset))
+        for game in games:
+            game['roles'] = json.loads(game['roles'] or '{}')
+            game['scores'] = json.loads(game['scores'] or '{}')
+        return games
+
+    def get_rounds(self, game_id: str, round_num: Optional[int] = None,
+                   group: Optional[str] = None) -> List[Dict]:
+        """
+        某局游戏的回合记录（描述、投票、投票结果）
+        :param round_num: 只返回指定回合
+        :param group: 只返回该组的描述以及该组投出/收到的票
+        """
+        where, params = 'game_id = ? AND room_id = ?', [game_id, self.room_id]
+        if round_num is not None:
+            where += ' AND round = ?'
+            params.append(round_num)
+        rounds = self.store.query(f'SELECT * FROM rounds WHERE {where} ORDER BY round', params)
+        for info in rounds:
+            key = (game_id, info['round'])
+            desc_sql = 'SELECT group_name, description, time FROM descriptions WHERE game_id = ? AND round = ?'
+            vote_sql = 'SELECT voter, target FROM votes WHERE game_id = ? AND round = ?'
+            desc_params, vote_params = list(key), list(key)
+            if group:
+                desc_sql += ' AND group_name = ?'
+                desc_params.append(group)
+                vote_sql += ' AND (voter = ? OR target = ?)'
+                vote_params += [group, group]
+            info['descriptions'] = self.store.query(desc_sql + ' ORDER BY seq', desc_params)
+            info['votes'] = self.store.query(vote_sql, vote_params)
+            info['eliminated'] = json.loads(info['eliminated'] or '[]')
+            info['result'] = json.loads(info['result']) if info['result'] else None
+        return rounds
@@ -1,65 +1,209 @@
 """
 广播服务模块
+所有广播都只发送到对应房间的 Socket.IO 频道
+
+status / game_state 两类状态支持增量推送：
+- 全量模式的连接（房间子频道 full）每次收到完整的 status_update / game_state_update
+- 增量模式的连接（房间子频道 patch，连接时携带查询参数 patch=1）只收到相对上次发布的
+  status_patch / game_state_patch，发现版本不连续时通过 request_status / request_game_state 重新同步
+game_state 含所有组的词语和投票，只发往主持方子频道（host:full / host:patch）
+大厅模式的描述按批公开：descriptions_reveal 只携带上次推送之后新公开的描述
+每个组自己的词语、是否淘汰和投票明细（private_update）只发往该组的私有频道 group:<组名>，
+在开局、投票结算、淘汰和重置时推送，游戏方不必轮询 /api/word、/api/vote/details
+开启 LIVE_VOTE_TALLY 时，投票阶段的实时计票（vote_tally_update）同样只发往主持方子频道
+
+路由、倒计时和WebSocket处理器不直接广播，而是调用 mark_dirty() 标记哪些主题发生了变化；
+唯一的合并线程每个周期（BROADCAST_TICK）把标记过的主题各推送一次，
+一次投票触发的多轮状态变化只会带来一次状态构建和一次推送
+
+持有房间锁时不发送任何消息：广播函数在读锁内构建负载、释放锁之后再发送；
+状态变更中产生的一次性事件（如 vote_result）由 emit_after_commit() 登记到房间发件箱，
+room_transaction() 释放写锁之后统一发出，慢连接的写入不会拖长锁的持有时间
+
+所有房间广播都经过 publish_event()：字典数据附带房间内递增的序号 seq，并登记到房间的事件缓冲，
+断线重连的客户端凭最后收到的 seq 只补发错过的事件（timer_update 等即时推送和每组一条的 private_update 不登记）
 """
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Set, Tuple
+from backend.config import BROADCAST_TICK, LIVE_VOTE_TALLY
 from backend.utils import get_websocket_status
+from backend.services.state_diff import normalize, make_patch
 
 # 这些变量需要在运行时注入
-game = None
-game_lock = None
 socketio = None
 
+# 待推送的主题：room_id -> (房间, 主题集合)
+_dirty: Dict[str, Tuple[object, Set[str]]] = {}
+_dirty_cond = threading.Condition()
+_flusher_started = False
+
+# 支持增量推送的状态：topic -> (全量事件名, 补丁事件名, 受众子频道前缀)
+STATE_TOPICS = {
+    'status': ('status_update', 'status_patch', ()),
+    'game_state': ('game_state_update', 'game_state_patch', ('host',)),
+}
+
 
-def init_broadcast(game_instance, lock, socketio_instance):
+def init_broadcast(socketio_instance):
     """初始化广播服务"""
-    global game, game_lock, socketio
-    game = game_instance
-    game_lock = lock
+    global socketio
     socketio = socketio_instance
 
 
-def broadcast_status():
+def publish_event(room, event: str, data, to: str):
+    """
+    发送一条房间广播并登记到房间的事件缓冲（断线重连时补发），字典数据附带房间内递增的序号 seq
+    登记和发送在事件缓冲的锁内完成，保证与重连补发不乱序（不得持有房间锁）
+    """
+    ring = room.events
+    with ring.lock:
+        socketio.emit(event, ring.record(event, data, to), to=to)
+
+
+def emit_after_commit(room, event: str, data, to: str = None):
+    """登记一条在释放房间写锁之后才发送的消息（需持有写锁），默认发往整个房间频道"""
+    room.outbox.append((event, data, to or room.channel))
+
+
+def flush_outbox(room):
+    """按登记顺序发出房间发件箱中的消息（不得持有房间锁）"""
+    outbox = room.outbox
+    while outbox:
+        try:
+            event, data, to = outbox.popleft()
+        except IndexError:
+            return
+        publish_event(room, event, data, to)
+
+
+@contextmanager
+def room_transaction(room):
+    """
+    取房间写锁执行状态变更，释放锁之后再发出期间登记到发件箱的消息
+    with 块内抛出异常时同样会发出已登记的消息（对应的状态变更已经生效）
+    """
+    try:
+        with room.lock:
+            yield room.game
+    finally:
+        flush_outbox(room)
+
+
+def build_status(room) -> dict:
+    """构建带在线状态的公开状态（需持有读锁）"""
+    game = room.game
+    websocket_status = get_websocket_status(room)
+    status = game.get_public_status()
+    # 更新在线状态（使用WebSocket连接状态）
+    status['online_status'] = game.get_online_status(websocket_status)
+    return status
+
+
+def build_game_state(room) -> dict:
+    """构建带在线状态的完整游戏状态（需持有读锁）"""
+    game = room.game
+    websocket_status = get_websocket_status(room)
+    state = game.get_game_state()
+    # 更新在线状态（使用WebSocket连接状态）
+    state['online_status'] = game.get_online_status(websocket_status)
+    return state
+
+
+def publish_state(room, topic: str):
+    """
+    发布状态：全量订阅者收到完整状态，增量订阅者收到相对上次发布的补丁
+    房间第一次发布该状态时，增量订阅者也收到完整状态
+    构建和发布都在 publish_lock 内进行，保证发布顺序与状态版本顺序一致
+    """
+    full_event, patch_event, audience = STATE_TOPICS[topic]
+    builder = build_status if topic == 'status' else build_game_state
+    full_channel = room.sub_channel(*audience, 'full')
+    patch_channel = room.sub_channel(*audience, 'patch')
+    with room.publish_lock:
+        with room.lock.read():
+            snapshot = normalize(builder(room))
+        previous = room.published.get(topic)
+        room.published[topic] = snapshot
+        publish_event(room, full_event, snapshot, full_channel)
+        if previous is None:
+            publish_event(room, full_event, snapshot, patch_channel)
+            return
+        patch = make_patch(previous, snapshot, previous.get('version'), snapshot.get('version'))
+        if patch is not None:
+            publish_event(room, patch_event, patch, patch_channel)
+
+
+def get_published_state(room, topic: str):
+    """获取最近一次发布的状态（增量订阅者重新同步时使用），尚未发布过时返回None"""
+    with room.publish_lock:
+        return room.published.get(topic)
+
+
+def broadcast_status(room):
     """广播游戏状态变化"""
-    with game_lock:
-        websocket_status = get_websocket_status()
-        status = game.get_public_status()
-        # 更新在线状态（使用WebSocket连接状态）
-        status['online_status'] = game.get_online_status(websocket_status)
-    socketio.emit('status_update', status)
-
-
-def broadcast_game_state():
-    """广播完整游戏状态（主持方用）"""
-    with game_lock:
-        websocket_status = get_websocket_status()
-        state = game.get_game_state()
-        # 更新在线状态（使用WebSocket连接状态）
-        state['online_status'] = game.get_online_status(websocket_status)
-    socketio.emit('game_state_update', state)
-
-
-def broadcast_descriptions():
-    """广播描述列表更新"""
-    with game_lock:
+    publish_state(room, 'status')
+
+
+def broadcast_game_state(room):
+    """广播完整游戏状态（只发给主持方连接）"""
+    publish_state(room, 'game_state')
+
+
+def _reveal_descriptions(room, round_num: int, descriptions):
+    """
+    大厅模式：构建上次推送之后新公开的一批描述（需持有读锁，只在合并线程上调用），没有新描述时返回None
+    换了回合时从头推送，新回合还没有描述时也推送一次空批次，客户端据此清空列表
+    """
+    sent_round, sent = room.descriptions_sent
+    start = sent if sent_round == round_num and sent <= len(descriptions) else 0
+    if sent_round == round_num and start == len(descriptions):
+        return None
+    room.descriptions_sent = (round_num, len(descriptions))
+    return {
+        'round': round_num,
+        'offset': start,
+        'descriptions': [{
+            'group': desc['group'],
+            'description': desc['description'],
+            'time': desc.get('time', '')
+        } for desc in descriptions[start:]],
+        'total': len(descriptions)
+    }
+
+
+def broadcast_descriptions(room):
+    """广播描述列表更新（大厅模式下只推送新公开的一批）"""
+    game = room.game
+    with room.lock.read():
         round_num = game.current_round
         descriptions = game.descriptions.get(round_num, [])
-        result = []
-        for desc in descriptions:
-            result.append({
+        lobby_mode = game.lobby_mode
+        if lobby_mode:
+            reveal = _reveal_descriptions(room, round_num, descriptions)
+        else:
+            result = [{
                 'group': desc['group'],
                 'description': desc['description'],
                 'time': desc.get('time', '')  # 包含时间字段
-            })
-        
-        socketio.emit('descriptions_update', {
-            'round': round_num,
-            'descriptions': result,
-            'total': len(result)
-        })
+            } for desc in descriptions]
+
+    if lobby_mode:
+        if reveal is not None:
+            publish_event(room, 'descriptions_reveal', reveal, room.channel)
+        return
+    publish_event(room, 'descriptions_update', {
+        'round': round_num,
+        'descriptions': result,
+        'total': len(result)
+    }, room.channel)
 
 
-def broadcast_groups():
+def broadcast_groups(room):
     """广播组列表更新"""
-    with game_lock:
+    game = room.game
+    with room.lock.read():
         groups_info = []
         for name, info in game.groups.items():
             groups_info.append({
@@ -67,34 +211,120 @@ def broadcast_groups():
                 'registered_time': info['registered_time'],
                 'eliminated': name in game.eliminated_groups
             })
-        
-        socketio.emit('groups_update', {
-            'groups': groups_info,
-            'total': len(groups_info)
-        })
+
+    publish_event(room, 'groups_update', {
+        'groups': groups_info,
+        'total': len(groups_info)
+    }, room.channel)
 
 
-def broadcast_scores():
+def broadcast_scores(room):
     """广播分数更新"""
-    with game_lock:
+    game = room.game
+    with room.lock.read():
         # 按分数排序（从高到低）
         sorted_scores = sorted(
             game.scores.items(),
             key=lambda x: x[1],
             reverse=True
         )
-        
-        # 构建返回数据
-        scores_list = [
-            {
-                'group_name': group_name,
-                'total_score': score
-            }
-            for group_name, score in sorted_scores
-        ]
-        
-        socketio.emit('scores_update', {
-            'scores': scores_list,
-            'total_groups': len(scores_list)
-        })
 
+    # 构建返回数据
+    scores_list = [
+        {
+            'group_name': group_name,
+            'total_score': score
+        }
+        for group_name, score in sorted_scores
+    ]
+
+    publish_event(room, 'scores_update', {
+        'scores': scores_list,
+        'total_groups': len(scores_list)
+    }, room.channel)
+
+
+def broadcast_private(room):
+    """
+    向每个有连接的组的私有频道（room:<id>:group:<组名>）推送该组的私有状态（private_update），
+    只推送与上次推送相比有变化的组（Room.private_sent，只在合并线程上读写）
+    每组一条，不登记到房间的事件缓冲：组数很多时一次开局就会挤掉缓冲里的所有公共事件；
+    重连恢复时直接下发该组当前的私有状态
+    """
+    game = room.game
+    with room.lock.read():
+        states = [(name, game.get_private_state(name)) for name in room.connections.by_group]
+    sent = room.private_sent
+    for name, state in states:
+        if sent.get(name) != state:
+            sent[name] = state
+            socketio.emit('private_update', state, to=room.sub_channel('group', name))
+
+
+def broadcast_vote_tally(room):
+    """广播本回合的实时计票（只发给主持方连接，未开启 LIVE_VOTE_TALLY 时不推送）"""
+    if not LIVE_VOTE_TALLY:
+        return
+    game = room.game
+    with room.lock.read():
+        tally = game.vote_tally.summary()
+        tally['round'] = game.current_round
+        tally['active_count'] = game.round_active_count
+        tally['version'] = game.version
+    for mode in ('full', 'patch'):
+        publish_event(room, 'vote_tally_update', tally, room.sub_channel('host', mode))
+
+
+# 主题 -> 广播函数，合并线程按此顺序推送
+TOPIC_BROADCASTS = {
+    'status': broadcast_status,
+    'game_state': broadcast_game_state,
+    'descriptions': broadcast_descriptions,
+    'groups': broadcast_groups,
+    'scores': broadcast_scores,
+    'vote_tally': broadcast_vote_tally,
+    'private': broadcast_private,
+}
+
+
+def mark_dirty(room, *topics: str):
+    """
+    标记房间的若干主题需要推送，可以在持有 room.lock 时调用（不会获取房间锁）
+    同时唤醒该房间等待状态变化的长轮询请求
+    :param topics: TOPIC_BROADCASTS 中的主题名
+    """
+    global _flusher_started
+    room.notify_changed()
+    with _dirty_cond:
+        entry = _dirty.get(room.room_id)
+        if entry is None or entry[0] is not room:
+            entry = _dirty[room.room_id] = (room, set())
+        entry[1].update(topics)
+        if not _flusher_started:
+            _flusher_started = True
+            socketio.start_background_task(_flush_loop)
+        _dirty_cond.notify()
+
+
+def flush_room(room, topics: Set[str]):
+    """立即推送房间的指定主题（每个主题一次）"""
+    for topic, broadcast in TOPIC_BROADCASTS.items():
+        if topic in topics:
+            broadcast(room)
+
+
+def _flush_loop():
+    """合并线程：等到有主题被标记后，再等一个周期收集后续标记，然后统一推送"""
+    while True:
+        with _dirty_cond:
+            while not _dirty:
+                _dirty_cond.wait()
+        time.sleep(BROADCAST_TICK)
+        with _dirty_cond:
+            batch = list(_dirty.values())
+            _dirty.clear()
+        for room, topics in batch:
+            try:
+                flush_room(room, topics)
+            except Exception as e:
+                print(f"房间 {room.room_id} 广播错误: {e}")
@@ -0,0 +1,79 @@
+"""
+连接追踪模块
+记录房间内每个组的WebSocket连接：组名 -> 连接集合，连接 -> 组名（反向索引），以及当前在线的组数；
+连接、断开和在线状态查询都不需要遍历所有组
+"""
+from typing import Dict, List, Set
+
+
+class Presence:
+    """
+    基于WebSocket连接的在线状态视图（供 GameLogic.get_online_status 使用）
+    有连接的组为在线，其余组（包括从未连接过的组）为离线；
+    视图随连接变化实时更新，需与连接的增删在同一把房间锁下使用
+    """
+
+    __slots__ = ('_online',)
+
+    def __init__(self, online: Dict[str, Set[str]]):
+        self._online = online
+
+    def __contains__(self, group_name: str) -> bool:
+        return True
+
+    def __getitem__(self, group_name: str) -> bool:
+        return group_name in self._online
+
+    def get(self, group_name: str, default=None) -> bool:
+        return group_name in self._online
+
+
+class ConnectionRegistry:
+    """房间内的WebSocket连接追踪（需在持有房间锁时调用）"""
+
+    __slots__ = ('by_group', 'by_sid', 'presence')
+
+    def __init__(self):
+        # 组名 -> 连接集合（只保留至少有一个连接的组，组数即在线组数）
+        self.by_group: Dict[str, Set[str]] = {}
+        # 连接 -> 组名集合（通常只有一个组）
+        self.by_sid: Dict[str, Set[str]] = {}
+        self.presence = Presence(self.by_group)
+
+    @property
+    def online_count(self) -> int:
+        """有WebSocket连接的组数"""
+        return len(self.by_group)
+
+    def attach(self, sid: str, group_name: str) -> bool:
+        """登记组的一个连接，返回该组是否因此上线"""
+        self.by_sid.setdefault(sid, set()).add(group_name)
+        sids = self.by_group.get(group_name)
+        if sids is None:
+            self.by_group[group_name] = {sid}
+            return True
+        sids.add(sid)
+        return False
+
+    def detach(self, sid: str) -> List[str]:
+        """移除一个连接，返回因此没有任何连接（下线）的组名列表"""
+        offline = []
+        for group_name in self.by_sid.pop(sid, ()):
+            sids = self.by_group[group_name]
+            sids.discard(sid)
+            if not sids:
+                del self.by_group[group_name]
+                offline.append(group_name)
+        return offline
+
+    def is_online(self, group_name: str) -> bool:
+        """组是否有WebSocket连接"""
+        return group_name in self.by_group
+
+    def sids(self, group_name: str) -> Set[str]:
+        """组的所有连接（没有连接时为空集合）"""
+        return self.by_group.get(group_name, set())
+
+    def __len__(self) -> int:
+        """连接数"""
+        return len(self.by_sid)
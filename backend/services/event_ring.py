@@ -0,0 +1,44 @@
+"""
+事件环形缓冲模块
+每个房间保留最近若干条广播事件（带房间内递增的序号 seq），
+断线重连的客户端凭最后收到的序号只补发错过的事件，不必重新拉取完整状态
+"""
+import threading
+from collections import deque
+from typing import List, Optional, Set, Tuple
+
+
+class EventRing:
+    """
+    最近广播事件的环形缓冲：(序号, 事件名, 数据, 频道)
+    lock 同时保证“登记 + 发送”与“计算补发 + 加入频道”互斥，补发的事件和之后的实时事件不会乱序
+    """
+
+    def __init__(self, capacity: int):
+        self.lock = threading.Lock()
+        self.seq = 0
+        self._events: deque = deque(maxlen=capacity)
+
+    def record(self, event: str, data, channel: str):
+        """登记一条广播事件（需持有 lock），返回带序号的数据（字典数据会复制一份再加上 seq）"""
+        self.seq += 1
+        payload = dict(data, seq=self.seq) if isinstance(data, dict) else data
+        self._events.append((self.seq, event, payload, channel))
+        return payload
+
+    def since(self, last_seq: int, channels: Set[str]) -> Optional[List[Tuple[str, object]]]:
+        """
+        序号 last_seq 之后发往 channels 中任一频道的事件（需持有 lock）
+        错过的事件已被挤出缓冲区，或者序号不属于这个房间时返回None，客户端需要重新同步完整状态
+        """
+        if last_seq > self.seq or last_seq < 0:
+            return None
+        if last_seq == self.seq:
+            return []
+        if not self._events or self._events[0][0] > last_seq + 1:
+            return None
+        return [(event, payload) for seq, event, payload, channel in self._events
+                if seq > last_seq and channel in channels]
+
+    def __len__(self) -> int:
+        return len(self._events)
@@ -0,0 +1,195 @@
+"""
+扇出模块：Socket.IO 的客户端管理器，给每个连接一条有界的发送队列
+python-socketio 默认把消息直接放进每个连接的传输层队列（engine.io），队列没有上限，
+一个网络很差的观众可以无限落后、占用越来越多的内存
+
+FanoutManager 替换默认的客户端管理器：
+- 连接的传输层积压不多（少于 transport_backlog 个数据包）且没有排队中的消息时，直接发送，与原来一样
+- 积压过多时，消息先进入该连接自己的有界队列，由固定数量的工作线程在积压消退后按顺序补发，
+  广播线程不会被慢连接拖住
+- 只有最新值有意义的完整状态类事件（status_update、timer_update 等）在队列中只保留最新的一条
+- 队列超过 queue_size 条，或者连续 stall_timeout 秒没能清空的连接被断开，客户端重连后重新拿完整状态
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Set
+from engineio import packet as eio_packet
+from socketio import Manager, packet
+from backend.config import FANOUT_WORKERS, FANOUT_QUEUE_SIZE, FANOUT_TRANSPORT_BACKLOG, FANOUT_STALL_TIMEOUT
+
+# 只有最新值有意义的事件：排队时新的一条替换旧的一条
+# 增量补丁（*_patch）、vote_result、descriptions_reveal 等不能丢弃，按顺序全部补发
+LATEST_ONLY_EVENTS = frozenset({
+    'status_update', 'game_state_update', 'timer_update', 'vote_tally_update',
+    'descriptions_update', 'groups_update', 'scores_update',
+})
+
+# 积压未消退的连接隔多久再检查一次（秒）
+RETRY_INTERVAL = 0.05
+
+
+class _ClientQueue:
+    """一个落后连接的待发送队列：(合并键, 数据包列表)，合并键为 None 的消息不合并"""
+
+    __slots__ = ('sid', 'eio_sid', 'namespace', 'items', 'since', 'overflowed')
+
+    def __init__(self, sid: str, eio_sid: str, namespace: str):
+        self.sid = sid
+        self.eio_sid = eio_sid
+        self.namespace = namespace
+        self.items: deque = deque()
+        # 开始落后的时间，队列清空后记录被删除
+        self.since = time.monotonic()
+        self.overflowed = False
+
+
+class FanoutManager(Manager):
+    """带每连接有界队列和固定工作线程池的客户端管理器"""
+
+    def __init__(self, workers: int = FANOUT_WORKERS, queue_size: int = FANOUT_QUEUE_SIZE,
+                 transport_backlog: int = FANOUT_TRANSPORT_BACKLOG, stall_timeout: float = FANOUT_STALL_TIMEOUT,
+                 latest_only: Set[str] = LATEST_ONLY_EVENTS):
+        super().__init__()
+        self.workers = workers
+        self.queue_size = queue_size
+        self.transport_backlog = transport_backlog
+        self.stall_timeout = stall_timeout
+        self.latest_only = latest_only
+        # 落后连接：eio_sid -> 队列；连接有记录时新消息一律排队，保证与补发中的消息顺序一致
+        self._queues: Dict[str, _ClientQueue] = {}
+        # 等待工作线程处理的连接，以及积压未消退、稍后重试的连接 (重试时间, 队列)
+        self._ready: deque = deque()
+        self._retry: deque = deque()
+        self._cond = threading.Condition()
+        self._workers_started = False
+        # 统计：合并掉的旧消息条数、因落后过多被断开的连接数
+        self.superseded = 0
+        self.dropped_clients = 0
+
+    def _backlog(self, eio_sid: str) -> int:
+        """连接在传输层（engine.io）还没写出的数据包数，连接不存在时为0"""
+        socket = self.server.eio.sockets.get(eio_sid)
+        return socket.queue.qsize() if socket is not None else 0
+
+    def emit(self, event, data, namespace, room=None, skip_sid=None, callback=None, to=None, **kwargs):
+        """编码一次，积压不多的连接直接发送，其余连接进入各自的队列"""
+        if callback:
+            # 带回调的消息每个连接的数据包都不同，保持原来的处理
+            return super().emit(event, data, namespace, room=room, skip_sid=skip_sid, callback=callback,
+                                to=to, **kwargs)
+        room = to or room
+        if namespace not in self.rooms:
+            return
+        if isinstance(data, tuple):
+            data = list(data)
+        elif data is not None:
+            data = [data]
+        else:
+            data = []
+        if not isinstance(skip_sid, list):
+            skip_sid = [skip_sid]
+        encoded_packet = self.server.packet_class(packet.EVENT, namespace=namespace, data=[event] + data).encode()
+        if not isinstance(encoded_packet, list):
+            encoded_packet = [encoded_packet]
+        eio_pkts = [eio_packet.Packet(eio_packet.MESSAGE, p) for p in encoded_packet]
+        key = event if event in self.latest_only else None
+
+        queues = self._queues
+        sockets = self.server.eio.sockets
+        backlog_limit = self.transport_backlog
+        direct = []
+        with self._cond:
+            for sid, eio_sid in self.get_participants(namespace, room):
+                if sid in skip_sid:
+                    continue
+                client = queues.get(eio_sid)
+                if client is None:
+                    socket = sockets.get(eio_sid)
+                    if socket is None or socket.queue.qsize() < backlog_limit:
+                        direct.append(eio_sid)
+                        continue
+                    client = queues[eio_sid] = _ClientQueue(sid, eio_sid, namespace)
+                    self._schedule(client)
+                self._enqueue(client, key, eio_pkts)
+        send = self.server._send_eio_packet
+        for eio_sid in direct:
+            for p in eio_pkts:
+                send(eio_sid, p)
+
+    def _enqueue(self, client: _ClientQueue, key: Optional[str], eio_pkts):
+        """消息放入落后连接的队列（需持有 _cond），同一合并键只保留最新的一条"""
+        if key is not None:
+            for i, (queued_key, _) in enumerate(client.items):
+                if queued_key == key:
+                    del client.items[i]
+                    self.superseded += 1
+                    break
+        client.items.append((key, eio_pkts))
+        if len(client.items) > self.queue_size:
+            client.overflowed = True
+            client.items.clear()
+
+    def _schedule(self, client: _ClientQueue):
+        """把连接交给工作线程（需持有 _cond）"""
+        self._ready.append(client)
+        self._cond.notify()
+        if not self._workers_started:
+            self._workers_started = True
+            for _ in range(self.workers):
+                self.server.start_background_task(self._worker)
+
+    def _next_client(self) -> _ClientQueue:
+        """工作线程取下一个待处理的连接，没有时等待（到期的重试连接重新变为待处理）"""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._retry and self._retry[0][0] <= now:
+                    self._ready.append(self._retry.popleft()[1])
+                if self._ready:
+                    return self._ready.popleft()
+                self._cond.wait(self._retry[0][0] - now if self._retry else None)
+
+    def _worker(self):
+        """工作线程：补发落后连接的队列，积压未消退时稍后重试，落后过多时断开连接"""
+        while True:
+            client = self._next_client()
+            try:
+                self._drain(client)
+            except Exception as e:
+                print(f"连接 {client.sid} 补发消息失败: {e}")
+
+    def _drain(self, client: _ClientQueue):
+        """在传输层积压允许的范围内按顺序补发一个连接的队列"""
+        while True:
+            with self._cond:
+                if self._queues.get(client.eio_sid) is not client:
+                    return  # 连接已断开
+                if client.overflowed or time.monotonic() - client.since > self.stall_timeout:
+                    del self._queues[client.eio_sid]
+                    self.dropped_clients += 1
+                    break
+                if not client.items:
+                    del self._queues[client.eio_sid]
+                    return
+                if self._backlog(client.eio_sid) >= self.transport_backlog:
+                    self._retry.append((time.monotonic() + RETRY_INTERVAL, client))
+                    return
+                _, eio_pkts = client.items.popleft()
+            for p in eio_pkts:
+                self.server._send_eio_packet(client.eio_sid, p)
+        # 落后过多：断开底层连接，断线处理照常进行，客户端重连后重新同步完整状态
+        print(f"连接 {client.sid} 落后过多，断开连接")
+        self.server.eio.disconnect(client.eio_sid)
+
+    def disconnect(self, sid, namespace, **kwargs):
+        """连接断开时丢弃它的队列"""
+        eio_sid = self.eio_sid_from_sid(sid, namespace)
+        with self._cond:
+            self._queues.pop(eio_sid, None)
+        return super().disconnect(sid, namespace, **kwargs)
+
+    def pending(self) -> int:
+        """所有落后连接排队中的消息总数"""
+        with self._cond:
+            return sum(len(client.items) for client in self._queues.values())
@@ -0,0 +1,184 @@
+"""
+事件日志模块
+每个房间一个只追加的日志文件，每行一条改变了游戏状态的调用：
+    [调用后的状态版本号, 时间戳(微秒), 随机数种子, 方法名, 位置参数(, 关键字参数)]
+GameLogic 的 journaled 方法执行时固定了随机数种子和当前时间，按顺序重放这些调用即可得到完全相同的状态；
+写入快照（见 snapshot.py）后，版本号不超过快照版本的记录由 compact() 从日志中删除
+
+写入只追加到内存缓冲区（在房间写锁内，不做磁盘IO）；
+所有房间共用一个刷盘线程，每个周期（JOURNAL_FSYNC_INTERVAL）把缓冲区批量写入并 fsync 一次
+"""
+import json
+import os
+import threading
+import time
+import weakref
+from datetime import datetime
+from typing import List, Optional
+from backend.config import JOURNAL_FSYNC_INTERVAL
+
+# 有待刷盘数据的日志
+_pending: "weakref.WeakSet[EventJournal]" = weakref.WeakSet()
+_pending_cond = threading.Condition()
+_writer_started = False
+
+
+class EventJournal:
+    """单个房间的事件日志文件"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._buffer: List[str] = []
+        # _lock 只保护缓冲区；_io_lock 保证同一文件的写入和 fsync 串行进行
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self.closed = False
+
+    def record(self, name: str, args, kwargs, seed: int, ts: datetime, version: int):
+        """记录一条事件（只写入内存缓冲区，由刷盘线程批量落盘）"""
+        # 时间戳用整数微秒，重放时得到完全相同的 datetime
+        ts_us = int(ts.timestamp()) * 1_000_000 + ts.microsecond
+        entry = [version, ts_us, seed, name, list(args)]
+        if kwargs:
+            entry.append(kwargs)
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            if self.closed:
+                return
+            self._buffer.append(line)
+        _schedule_flush(self)
+
+    def flush(self):
+        """把缓冲区写入文件并 fsync"""
+        with self._io_lock:
+            with self._lock:
+                lines, self._buffer = self._buffer, []
+            if not lines or self._file.closed:
+                return
+            self._file.write('\n'.join(lines) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def compact(self, up_to_version: int):
+        """
+        删除版本号不超过 up_to_version 的记录（这些状态已包含在快照中）
+        先写临时文件再原子替换，任何时刻崩溃磁盘上都是一份完整的日志
+        """
+        with self._io_lock:
+            if self._file.closed:
+                return
+            with self._lock:
+                lines, self._buffer = self._buffer, []
+            if lines:
+                self._file.write('\n'.join(lines) + '\n')
+            self._file.close()
+            kept = [entry for entry in read_journal(self.path) if entry[0] > up_to_version]
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for entry in kept:
+                    f.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self, delete: bool = False):
+        """刷盘并关闭日志文件，delete为True时同时删除文件（房间被删除）"""
+        if delete:
+            with self._lock:
+                self.closed = True
+                self._buffer = []
+        else:
+            self.flush()
+            with self._lock:
+                self.closed = True
+        with self._io_lock:
+            self._file.close()
+        if delete and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _schedule_flush(journal: EventJournal):
+    """把日志加入待刷盘集合，必要时启动刷盘线程"""
+    global _writer_started
+    with _pending_cond:
+        _pending.add(journal)
+        if not _writer_started:
+            _writer_started = True
+            threading.Thread(target=_writer_loop, daemon=True).start()
+        _pending_cond.notify()
+
+
+def flush_all():
+    """立即把所有待刷盘的日志写入磁盘"""
+    with _pending_cond:
+        batch = list(_pending)
+        _pending.clear()
+    for journal in batch:
+        try:
+            journal.flush()
+        except Exception as e:
+            print(f"事件日志 {journal.path} 写入错误: {e}")
+
+
+def _writer_loop():
+    """刷盘线程：等到有事件写入后，再等一个周期收集后续事件，然后统一写入并 fsync"""
+    while True:
+        with _pending_cond:
+            while not _pending:
+                _pending_cond.wait()
+        time.sleep(JOURNAL_FSYNC_INTERVAL)
+        flush_all()
+
+
+def read_journal(path: str) -> List[list]:
+    """
+    读取日志中的全部事件
+    崩溃时最后一行可能只写了一半：丢弃它并把文件截断到最后一条完整记录，后续追加才不会接在残行后面
+    """
+    events = []
+    valid_size = 0
+    with open(path, 'rb') as f:
+        for raw in f:
+            if not raw.endswith(b'\n'):
+                break
+            try:
+                events.append(json.loads(raw))
+            except ValueError:
+                break
+            valid_size += len(raw)
+    if valid_size != os.path.getsize(path):
+        print(f"事件日志 {path} 末尾有不完整的记录，已截断")
+        with open(path, 'r+b') as f:
+            f.truncate(valid_size)
+    return events
+
+
+def replay_journal(game, path: str, after_version: int = 0) -> int:
+    """
+    按顺序重放日志中的事件到 game，返回重放的事件数
+    :param after_version: 只重放调用后版本号大于它的事件（game 已从该版本的快照恢复）
+    """
+    if not os.path.exists(path):
+        return 0
+    count = 0
+    for entry in read_journal(path):
+        version, ts_us, seed, name, args = entry[:5]
+        if version <= after_version:
+            continue
+        kwargs = entry[5] if len(entry) > 5 else None
+        ts = datetime.fromtimestamp(ts_us // 1_000_000).replace(microsecond=ts_us % 1_000_000)
+        game.replay_event(name, args, kwargs, seed, ts)
+        count += 1
+    return count
+
+
+def journal_path(directory: str, room_id: str) -> Optional[str]:
+    """房间的日志文件路径（房间ID只能包含安全字符，否则不记录日志）"""
+    if not directory or not room_id or not all(c.isalnum() or c in '-_' for c in room_id):
+        return None
+    return os.path.join(directory, f"{room_id}.log")
@@ -0,0 +1,243 @@
+"""
+房间注册表模块
+一个后端进程可以同时托管多个相互独立的游戏房间，每个房间拥有自己的 GameLogic 实例和锁
+"""
+import os
+import secrets
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from game_logic import GameLogic
+from backend.config import (DEFAULT_ROOM_ID, MAX_ROOMS, JOURNAL_DIR, SNAPSHOT_DIR, ARCHIVE_DB, REPORT_RETENTION,
+                            EARLY_VOTE_CLOSE, EVENT_BUFFER_SIZE)
+from backend.services.archive import GameArchive
+from backend.services.rwlock import RWLock
+from backend.services.connections import ConnectionRegistry
+from backend.services.event_ring import EventRing
+from backend.services.journal import EventJournal, journal_path, replay_journal
+from backend.services.snapshot import snapshot_path, load_snapshot
+
+
+class Room:
+    """单个游戏房间：游戏逻辑 + 房间锁 + WebSocket连接追踪"""
+
+    # 房间数量可能达到数千个，使用 __slots__ 降低空闲房间的内存占用
+    __slots__ = ('room_id', 'instance_id', 'game', 'lock', 'connections', 'created_at',
+                 'timer_running', 'timer_generation', 'timer_sockets', 'tick_generation', 'published', 'publish_lock',
+                 'status_json', 'changed', 'snapshot_version', 'descriptions_sent', 'outbox',
+                 'events', 'resume_tokens', 'group_tokens', 'disconnect_pending', 'private_sent')
+
+    def __init__(self, room_id: str, game: Optional[GameLogic] = None, lock=None):
+        self.room_id = room_id
+        # 实例标识：同名房间被删除重建或进程重启后版本号从0开始，ETag 依靠它区分
+        self.instance_id = uuid.uuid4().hex[:8]
+        self.game = game if game is not None else GameLogic(REPORT_RETENTION, EARLY_VOTE_CLOSE)
+        # 读写锁：查询接口和广播只取读锁，游戏状态变更取写锁
+        self.lock = lock if lock is not None else RWLock()
+        # WebSocket连接追踪：组名 <-> session_id 的双向索引
+        self.connections = ConnectionRegistry()
+        self.created_at = time.time()
+        # 倒计时状态：每次启动/停止倒计时代数加一，调度器中旧代数的任务到期后直接丢弃
+        self.timer_running = False
+        self.timer_generation = 0
+        # 订阅每秒倒计时推送（兼容模式）的连接
+        self.timer_sockets: set = set()
+        # 正在每秒推送倒计时的代数（没有订阅者时不推送，为 None）
+        self.tick_generation: Optional[int] = None
+        # 最近一次发布的状态：topic -> 规范化后的状态字典（作为增量补丁的基准）
+        self.published: Dict[str, Dict] = {}
+        # 保证同一房间的状态发布串行进行，补丁的基准版本才能首尾相接
+        self.publish_lock = threading.Lock()
+        # 公开状态中与时间无关部分的JSON缓存：(版本号, JSON字符串)
+        self.status_json: Optional[Tuple[int, str]] = None
+        # 状态变化通知：长轮询请求在这里等待状态版本号前进，不占用房间锁
+        self.changed = threading.Condition(threading.Lock())
+        # 最近一次写入快照时的状态版本号（-1 表示还没有快照）
+        self.snapshot_version = -1
+        # 大厅模式下已推送的描述：(回合, 条数)，之后只推送新公开的一批
+        self.descriptions_sent: Tuple[int, int] = (-1, 0)
+        # 发件箱：持有写锁时产生的待发送消息 (事件名, 数据, 频道)，释放写锁之后才发出
+        self.outbox: deque = deque()
+        # 最近的广播事件，断线重连时补发
+        self.events = EventRing(EVENT_BUFFER_SIZE)
+        # 断线重连令牌：令牌 -> 组名，每个组一个令牌，该组的所有连接共用
+        self.resume_tokens: Dict[str, str] = {}
+        self.group_tokens: Dict[str, str] = {}
+        # 处于重连宽限期的组：组名 -> 本次断开的标记（重连或重新注册时删除，到期时标记不符则不处理）
+        self.disconnect_pending: Dict[str, object] = {}
+        # 最近一次推送给各组的私有状态，没有变化的组不重复推送
+        self.private_sent: Dict[str, Dict] = {}
+
+    @property
+    def group_sockets(self) -> Dict[str, set]:
+        """组名 -> 该组的 session_id 集合（只含有连接的组）"""
+        return self.connections.by_group
+
+    @property
+    def channel(self) -> str:
+        """该房间在 Socket.IO 中对应的广播频道名"""
+        return f"room:{self.room_id}"
+
+    def sub_channel(self, *parts: str) -> str:
+        """房间内的子频道，例如 sub_channel('patch') -> 'room:<id>:patch'"""
+        return ':'.join((self.channel,) + parts)
+
+    def resume_token(self, group_name: str) -> str:
+        """组的断线重连令牌（需持有写锁），第一次调用时生成"""
+        token = self.group_tokens.get(group_name)
+        if token is None:
+            token = self.group_tokens[group_name] = secrets.token_urlsafe(16)
+            self.resume_tokens[token] = group_name
+        return token
+
+    def notify_changed(self):
+        """唤醒等待状态变化的长轮询请求（状态变更后调用）"""
+        with self.changed:
+            self.changed.notify_all()
+
+    def wait_for_change(self, since: int, timeout: float) -> bool:
+        """
+        等待状态版本号与 since 不同，超时返回False
+        读取 game.version 不需要房间锁（整数读取是原子的），等待期间写操作可以正常进行；
+        since 比当前版本还大（客户端拿的是重建前房间的版本号）时也立即返回
+        """
+        game = self.game
+        with self.changed:
+            return self.changed.wait_for(lambda: game.version != since, timeout)
+
+    def summary(self) -> Dict:
+        """房间概要信息（用于房间列表接口）"""
+        return {
+            'room_id': self.room_id,
+            'status': self.game.game_status.value,
+            'total_groups': len(self.game.groups),
+            'current_round': self.game.current_round,
+            'online_groups': self.connections.online_count,
+            'created_at': self.created_at
+        }
+
+
+class RoomRegistry:
+    """
+    房间注册表：room_id -> Room
+    配置了事件日志目录（journal_dir）时，每个房间的状态变更都写入 <目录>/<房间ID>.log；
+    配置了快照目录（snapshot_dir）时，后台快照线程定期写入 <目录>/<房间ID>.snap；
+    配置了归档数据库（archive_path）时，所有房间已结束的回合和游戏写入同一个 SQLite 数据库。
+    启动时为两个目录中出现的每个房间读取快照，再重放快照之后的事件恢复游戏状态
+    """
+
+    def __init__(self, max_rooms: int = MAX_ROOMS, default_room: Optional[Room] = None,
+                 journal_dir: str = JOURNAL_DIR, snapshot_dir: str = SNAPSHOT_DIR,
+                 archive_path: str = ARCHIVE_DB):
+        self.max_rooms = max_rooms
+        self.journal_dir = journal_dir
+        self.snapshot_dir = snapshot_dir
+        self.archive = GameArchive(archive_path) if archive_path else None
+        self._rooms: Dict[str, Room] = {}
+        # 只保护注册表本身（增删房间），房间内部状态由各自的 room.lock 保护
+        self._lock = threading.Lock()
+        self.default = default_room if default_room is not None else Room(DEFAULT_ROOM_ID)
+        self._rooms[self.default.room_id] = self.default
+        if journal_dir or snapshot_dir:
+            self._restore_rooms()
+        elif self.archive is not None:
+            self.default.game.archive = self.archive.room(self.default.room_id)
+
+    def _restore_room(self, room: Room):
+        """从快照和事件日志恢复房间状态，然后开始记录新事件"""
+        game = room.game
+        # 先接上归档：重放过程中结束的回合也会（幂等地）写入归档，补上崩溃前没来得及写入的部分
+        if self.archive is not None:
+            game.archive = self.archive.room(room.room_id)
+        after_version = 0
+        path = snapshot_path(self.snapshot_dir, room.room_id)
+        snapshot = load_snapshot(path) if path else None
+        if snapshot is not None:
+            after_version, state = snapshot
+            game.restore_state(state)
+            room.snapshot_version = after_version
+        path = journal_path(self.journal_dir, room.room_id)
+        count = replay_journal(game, path, after_version) if path else 0
+        if snapshot is not None or count:
+            print(f"房间 {room.room_id} 已恢复（快照版本 {after_version}，重放 {count} 条事件）")
+        if path:
+            game.journal = EventJournal(path)
+
+    def _restore_rooms(self):
+        """启动时恢复事件日志目录和快照目录中的所有房间"""
+        room_ids = set()
+        for directory, suffix in ((self.journal_dir, '.log'), (self.snapshot_dir, '.snap')):
+            if not directory:
+                continue
+            os.makedirs(directory, exist_ok=True)
+            for filename in os.listdir(directory):
+                room_id, ext = os.path.splitext(filename)
+                if ext == suffix:
+                    room_ids.add(room_id)
+        self._restore_room(self.default)
+        for room_id in sorted(room_ids):
+            if room_id in self._rooms or len(self._rooms) >= self.max_rooms:
+                continue
+            room = Room(room_id)
+            try:
+                self._restore_room(room)
+            except Exception as e:
+                print(f"房间 {room_id} 恢复失败: {e}")
+                continue
+            self._rooms[room_id] = room
+
+    def get(self, room_id: Optional[str]) -> Optional[Room]:
+        """获取房间，room_id为空时返回默认房间"""
+        if not room_id:
+            return self.default
+        return self._rooms.get(room_id)
+
+    def create(self, room_id: Optional[str] = None) -> Optional[Room]:
+        """
+        创建新房间
+        :param room_id: 房间ID，为空时自动生成
+        :return: 新房间；房间已存在或已达到最大房间数时返回None
+        """
+        with self._lock:
+            if not room_id:
+                room_id = uuid.uuid4().hex[:8]
+                while room_id in self._rooms:
+                    room_id = uuid.uuid4().hex[:8]
+            if room_id in self._rooms:
+                return None
+            if len(self._rooms) >= self.max_rooms:
+                return None
+            room = Room(room_id)
+            if self.journal_dir or self.snapshot_dir or self.archive is not None:
+                self._restore_room(room)
+            self._rooms[room_id] = room
+            return room
+
+    def remove(self, room_id: str) -> Optional[Room]:
+        """删除房间（默认房间不可删除），返回被删除的房间"""
+        if room_id == self.default.room_id:
+            return None
+        with self._lock:
+            room = self._rooms.pop(room_id, None)
+        if room is None:
+            return None
+        if room.game.journal is not None:
+            room.game.journal.close(delete=True)
+            room.game.journal = None
+        path = snapshot_path(self.snapshot_dir, room_id)
+        if path and os.path.exists(path):
+            os.remove(path)
+        return room
+
+    def all(self) -> List[Room]:
+        """所有房间的快照列表"""
+        with self._lock:
+            return list(self._rooms.values())
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def __contains__(self, room_id: str) -> bool:
+        return room_id in self._rooms
@@ -0,0 +1,79 @@
+"""
+读写锁模块
+状态查询（读）可以并发进行，游戏状态变更（写）独占；
+有写者等待时不再放行新的读者（写优先），避免高频轮询把投票、描述等写操作饿死
+"""
+import threading
+from contextlib import contextmanager
+
+
+class RWLock:
+    """
+    写优先的读写锁
+    - `with lock.read():` 共享读
+    - `with lock.write():` 或直接 `with lock:` 独占写（与 threading.Lock 用法兼容）
+    不支持重入，也不支持读锁升级为写锁
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0  # 当前持有读锁的线程数
+        self._writer = False  # 是否有线程持有写锁
+        self._writers_waiting = 0  # 正在等待写锁的线程数
+
+    def acquire_read(self):
+        """获取读锁"""
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        """释放读锁"""
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        """获取写锁"""
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = True
+
+    def release_write(self):
+        """释放写锁"""
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        """读锁上下文"""
+        self.acquire_read()
+        try:
+            yield self
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        """写锁上下文"""
+        self.acquire_write()
+        try:
+            yield self
+        finally:
+            self.release_write()
+
+    # 直接 with lock: 视为写锁，兼容原来的 threading.Lock 用法
+    def __enter__(self):
+        self.acquire_write()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release_write()
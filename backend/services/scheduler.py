@@ -0,0 +1,62 @@
+"""
+截止时间调度器模块
+所有房间共用一个调度线程：按截止时间维护一个最小堆，线程只睡到最近的截止时间，
+到点后在调度线程上执行回调；没有任何截止时间时一直等待，不空转
+"""
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable
+
+
+class DeadlineScheduler:
+    """
+    基于最小堆的定时回调调度器
+    - schedule(when, callback, *args)：在时间戳 when（time.time()）到达后执行 callback(*args)
+    - 不支持撤销单个任务，调用方通过在回调中检查"代数"等标记让过期任务直接返回
+    - 回调在调度线程上串行执行，应尽快返回
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._cond = threading.Condition(threading.Lock())
+        # 同一时间戳的任务按加入顺序执行（也避免比较回调对象）
+        self._seq = itertools.count()
+        self._thread = None
+
+    def schedule(self, when: float, callback: Callable, *args):
+        """加入一个定时任务"""
+        with self._cond:
+            heapq.heappush(self._heap, (when, next(self._seq), callback, args))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            # 新任务可能比线程正在等待的截止时间更早，唤醒线程重新计算等待时长
+            self._cond.notify()
+
+    def pending(self) -> int:
+        """堆中尚未执行的任务数（包括调用方已视为过期的任务）"""
+        with self._cond:
+            return len(self._heap)
+
+    def _pop_due(self):
+        """等待并取出下一个到期的任务"""
+        with self._cond:
+            while True:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                delay = self._heap[0][0] - time.time()
+                if delay <= 0:
+                    return heapq.heappop(self._heap)
+                self._cond.wait(delay)
+
+    def _run(self):
+        """调度线程主循环"""
+        while True:
+            when, _, callback, args = self._pop_due()
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"定时任务执行错误: {e}")
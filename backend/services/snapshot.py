@@ -0,0 +1,100 @@
+"""
+快照模块
+后台快照线程每个周期（SNAPSHOT_INTERVAL）把状态有变化的房间写入 <SNAPSHOT_DIR>/<房间ID>.snap：
+- 持有房间读锁的时间只有 GameLogic.snapshot_state() 的浅复制，序列化和磁盘IO都在锁外
+- 先写临时文件、fsync，再原子替换（os.replace），崩溃时磁盘上始终是一份完整的快照
+- 快照写入后，事件日志中已包含在快照里的记录被删除（EventJournal.compact）
+启动时读取快照（一次读取）恢复状态，再重放事件日志中版本号更大的事件
+"""
+import os
+import pickle
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# 快照文件格式版本，GameLogic 的属性发生不兼容变化时递增
+SNAPSHOT_FORMAT = 1
+
+_snapshotter_started = False
+
+
+def snapshot_path(directory: str, room_id: str) -> Optional[str]:
+    """房间的快照文件路径（房间ID只能包含安全字符，否则不写快照）"""
+    if not directory or not room_id or not all(c.isalnum() or c in '-_' for c in room_id):
+        return None
+    return os.path.join(directory, f"{room_id}.snap")
+
+
+def write_snapshot(room, path: str) -> bool:
+    """
+    写入房间快照，状态自上次快照以来没有变化时跳过
+    :return: 是否写入了新快照
+    """
+    game = room.game
+    with room.lock.read():
+        version = game.version
+        if version == room.snapshot_version:
+            return False
+        state = game.snapshot_state()
+    data = pickle.dumps({'format': SNAPSHOT_FORMAT, 'version': version, 'state': state},
+                        protocol=pickle.HIGHEST_PROTOCOL)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    room.snapshot_version = version
+    # 快照已落盘，事件日志只需保留之后的事件
+    if game.journal is not None:
+        game.journal.compact(version)
+    return True
+
+
+def load_snapshot(path: str) -> Optional[Tuple[int, Dict]]:
+    """读取快照，返回 (版本号, 状态)；文件不存在或无法识别时返回None"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+    except Exception as e:
+        print(f"快照 {path} 读取失败: {e}")
+        return None
+    if not isinstance(data, dict) or data.get('format') != SNAPSHOT_FORMAT:
+        print(f"快照 {path} 格式不兼容，已忽略")
+        return None
+    return data['version'], data['state']
+
+
+def snapshot_all(registry):
+    """为注册表中所有状态有变化的房间写快照，返回写入的快照数"""
+    written = 0
+    for room in registry.all():
+        path = snapshot_path(registry.snapshot_dir, room.room_id)
+        if path is None:
+            continue
+        try:
+            if write_snapshot(room, path):
+                written += 1
+                # 写快照期间房间被删除了：删掉刚写入的快照，避免下次启动时复活
+                if registry.get(room.room_id) is not room and os.path.exists(path):
+                    os.remove(path)
+        except Exception as e:
+            print(f"房间 {room.room_id} 快照写入错误: {e}")
+    return written
+
+
+def start_snapshotter(registry, interval: float):
+    """启动后台快照线程（只启动一次）"""
+    global _snapshotter_started
+    if _snapshotter_started or not registry.snapshot_dir:
+        return
+    _snapshotter_started = True
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            snapshot_all(registry)
+
+    threading.Thread(target=loop, daemon=True).start()
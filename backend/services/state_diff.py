@@ -0,0 +1,78 @@
+"""
+状态增量（补丁）模块
+补丁格式：
+{
+    "base_version": 10,                   # 补丁基于的状态版本（客户端本地版本必须与之相同）
+    "version": 12,                        # 应用补丁后的状态版本
+    "set": [[["descriptions", "2"], [...]], [["round"], 2]],   # [路径, 新值]
+    "unset": [["online_status", "组3"]]   # 需要删除的路径
+}
+路径中的每一段都是字符串形式的字典键；列表整体替换，不做逐项比较
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def normalize(state: Dict) -> Dict:
+    """
+    转换成与客户端收到的JSON完全一致的结构（字典键变成字符串），
+    同时切断与游戏内部列表/字典的引用，可安全地作为下一次比较的基准
+    """
+    return json.loads(json.dumps(state))
+
+
+def diff_state(old: Any, new: Any, path: Tuple = ()) -> Tuple[List, List]:
+    """
+    比较两个已规范化的状态
+    :return: (set_ops, unset_ops)
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        set_ops, unset_ops = [], []
+        for key, value in new.items():
+            if key not in old:
+                set_ops.append([list(path + (key,)), value])
+            elif old[key] != value:
+                sub_set, sub_unset = diff_state(old[key], value, path + (key,))
+                set_ops.extend(sub_set)
+                unset_ops.extend(sub_unset)
+        for key in old:
+            if key not in new:
+                unset_ops.append(list(path + (key,)))
+        return set_ops, unset_ops
+
+    if old == new:
+        return [], []
+    return [[list(path), new]], []
+
+
+def make_patch(old: Dict, new: Dict, base_version: int, version: int) -> Optional[Dict]:
+    """生成补丁，没有变化时返回None"""
+    set_ops, unset_ops = diff_state(old, new)
+    if not set_ops and not unset_ops:
+        return None
+    return {
+        'base_version': base_version,
+        'version': version,
+        'set': set_ops,
+        'unset': unset_ops
+    }
+
+
+def apply_patch(state: Dict, patch: Dict) -> Dict:
+    """把补丁应用到本地状态（原地修改并返回）"""
+    for path in patch.get('unset', []):
+        target = state
+        for key in path[:-1]:
+            target = target.get(key, {})
+        target.pop(path[-1], None)
+    for path, value in patch.get('set', []):
+        if not path:
+            state.clear()
+            state.update(value)
+            continue
+        target = state
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        target[path[-1]] = value
+    state['version'] = patch.get('version')
+    return state
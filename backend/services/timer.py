@@ -1,185 +1,225 @@
 """
 倒计时服务模块
+不再为每个房间开一个每秒轮询的线程：发言/投票截止时间登记到共用的 DeadlineScheduler，
+到点才取写锁处理超时
+
+倒计时由客户端根据状态中的绝对截止时间（phase_deadline_ms / speaker_deadline_ms）在本地计算，
+每秒一次的 timer_update 只推送给连接时携带 timer=1 的兼容模式连接（房间子频道 timer），
+房间内没有这样的连接时不登记每秒的任务
 """
 import time
-from datetime import datetime
-from threading import Thread
-from backend.utils import get_websocket_status
-from backend.services import broadcast_status, broadcast_game_state, broadcast_descriptions, broadcast_groups, broadcast_scores
+from datetime import datetime, timedelta
+from typing import Optional
+from game_logic import GameStatus, VOTE_TIMEOUT
+from backend.services.broadcast import mark_dirty, build_status, emit_after_commit, room_transaction
+from backend.services.scheduler import DeadlineScheduler
+
+# 所有房间共用的调度器（一个线程）
+scheduler = DeadlineScheduler()
 
 # 这些变量需要在运行时注入
-game = None
-game_lock = None
 socketio = None
 
-# 倒计时推送线程
-timer_thread = None
-timer_running = False
-
 
-def init_timer(game_instance, lock, socketio_instance):
+def init_timer(socketio_instance):
     """初始化倒计时服务"""
-    global game, game_lock, socketio
-    game = game_instance
-    game_lock = lock
+    global socketio
     socketio = socketio_instance
 
 
-def timer_broadcast_loop():
-    """定期广播倒计时并检查超时"""
-    global timer_running
-    while timer_running:
-        try:
-            with game_lock:
-                websocket_status = get_websocket_status()
-                status = game.get_public_status()
-                # 更新在线状态（使用WebSocket连接状态）
-                status['online_status'] = game.get_online_status(websocket_status)
-                
-                now = datetime.now()
-                need_broadcast = False
-                
-                # 描述阶段：检查发言者是否超时
-                if status.get('status') == 'describing':
-                    if game.speaker_deadline and now > game.speaker_deadline:
-                        # 当前发言者超时，自动跳过
-                        if game.skip_current_speaker():
-                            print(f"发言者超时，已自动跳过")
-                            need_broadcast = True
-                            # 广播状态和描述列表更新
-                            socketio.start_background_task(broadcast_status)
-                            socketio.start_background_task(broadcast_game_state)
-                            socketio.start_background_task(broadcast_descriptions)
-                    
-                    # 添加精确的时间信息
-                    if game.phase_deadline:
-                        remaining = max(0, int((game.phase_deadline - now).total_seconds()))
-                        status['remaining_seconds'] = remaining
-
-                    if game.speaker_deadline:
-                        speaker_remaining = max(0, int((game.speaker_deadline - now).total_seconds()))
-                        status['speaker_remaining_seconds'] = speaker_remaining
-                    
-                    if not need_broadcast:
-                        socketio.emit('timer_update', status)
-                
-                # 投票阶段：检查是否有未投票的组超时
-                elif status.get('status') == 'voting':
-                    if game.phase_deadline:
-                        remaining = max(0, int((game.phase_deadline - now).total_seconds()))
-                        status['remaining_seconds'] = remaining
-                        
-                        # 检查每个未投票的组是否超过60秒
-                        active_groups = [g for g in game.describe_order if g not in game.eliminated_groups]
-                        round_votes = game.votes.get(game.current_round, {})
-                        for group_name in active_groups:
-                            if group_name not in round_votes and group_name in game.vote_start_times:
-                                # 该组还未投票，检查是否超过60秒
-                                vote_start_time = game.vote_start_times[group_name]
-                                elapsed = (now - vote_start_time).total_seconds()
-                                if elapsed >= 60:  # 超过60秒未投票，自动跳过
-                                    if game.skip_vote_for_group(group_name):
-                                        print(f"组 {group_name} 投票超时（{int(elapsed)}秒），已自动跳过")
-                                        need_broadcast = True
-                        
-                        # 重新获取投票数据（因为可能已经跳过了一些投票）
-                        round_votes = game.votes.get(game.current_round, {})
-                        
-                        # 检查是否所有人都投票了（包括超时跳过的）
-                        # 同时检查游戏状态是否还是 VOTING（避免重复处理）
-                        if len(round_votes) >= len(active_groups) and game.game_status.value == 'voting':
-                            # 所有人已投票，自动处理投票结果
-                            vote_result = game.process_voting_result()
-                            if 'error' not in vote_result:
-                                print("所有人已投票，自动处理投票结果")
-                                need_broadcast = True
-                                # 停止倒计时广播
-                                stop_timer_broadcast()
-                                # 广播状态变化
-                                socketio.start_background_task(broadcast_status)
-                                socketio.start_background_task(broadcast_game_state)
-                                # 广播投票结果
-                                socketio.emit('vote_result', vote_result)
-                                # 广播分数更新
-                                socketio.start_background_task(broadcast_scores)
-                                
-                                # 如果游戏未结束且处于 ROUND_END 状态，自动开始下一回合
-                                if not vote_result.get('game_ended') and game.game_status.value == 'round_end':
-                                    order = game.start_round()
-                                    if order:
-                                        # 启动倒计时广播
-                                        start_timer_broadcast()
-                                        # 广播状态变化
-                                        socketio.start_background_task(broadcast_status)
-                                        socketio.start_background_task(broadcast_game_state)
-                                        # 广播描述列表更新
-                                        socketio.start_background_task(broadcast_descriptions)
-                        
-                        elif remaining <= 0:
-                            # 投票阶段总时间到了，自动跳过所有未投票的组
-                            for group_name in active_groups:
-                                if group_name not in round_votes:
-                                    if game.skip_vote_for_group(group_name):
-                                        print(f"投票阶段时间到，组 {group_name} 已自动跳过")
-                                        need_broadcast = True
-                            
-                            # 跳过所有未投票的组后，再次检查是否所有人都投票了
-                            round_votes = game.votes.get(game.current_round, {})
-                            # 同时检查游戏状态是否还是 VOTING（避免重复处理）
-                            if len(round_votes) >= len(active_groups) and game.game_status.value == 'voting':
-                                vote_result = game.process_voting_result()
-                                if 'error' not in vote_result:
-                                    print("投票阶段时间到，所有人已投票，自动处理投票结果")
-                                    need_broadcast = True
-                                    # 停止倒计时广播
-                                    stop_timer_broadcast()
-                                    # 广播状态变化
-                                    socketio.start_background_task(broadcast_status)
-                                    socketio.start_background_task(broadcast_game_state)
-                                    # 广播投票结果
-                                    socketio.emit('vote_result', vote_result)
-                                    # 广播分数更新
-                                    socketio.start_background_task(broadcast_scores)
-                                    
-                                    # 如果游戏未结束且处于 ROUND_END 状态，自动开始下一回合
-                                    if not vote_result.get('game_ended') and game.game_status.value == 'round_end':
-                                        order = game.start_round()
-                                        if order:
-                                            # 启动倒计时广播
-                                            start_timer_broadcast()
-                                            # 广播状态变化
-                                            socketio.start_background_task(broadcast_status)
-                                            socketio.start_background_task(broadcast_game_state)
-                                            # 广播描述列表更新
-                                            socketio.start_background_task(broadcast_descriptions)
-                        
-                        if need_broadcast and not (len(round_votes) >= len(active_groups)):
-                            # 广播状态更新（但不要重复广播，如果已经处理了投票结果）
-                            socketio.start_background_task(broadcast_status)
-                            socketio.start_background_task(broadcast_game_state)
-                    
-                    if not need_broadcast:
-                        socketio.emit('timer_update', status)
-
-            time.sleep(1)  # 每秒更新一次
-        except Exception as e:
-            print(f"定时器广播错误: {e}")
-            time.sleep(1)
-
-
-def start_timer_broadcast():
-    """启动倒计时广播线程"""
-    global timer_thread, timer_running
-    if timer_thread is None or not timer_thread.is_alive():
-        timer_running = True
-        timer_thread = Thread(target=timer_broadcast_loop, daemon=True)
-        timer_thread.start()
-        print("倒计时广播线程已启动")
-
-
-def stop_timer_broadcast():
-    """停止倒计时广播线程"""
-    global timer_running
-    timer_running = False
-    print("倒计时广播线程已停止")
+def _next_deadline(game) -> Optional[datetime]:
+    """
+    当前阶段最近的截止时间（需持有锁），没有需要等待的截止时间时返回None
+    描述阶段是当前发言者的截止时间（大厅模式下是整个描述窗口的截止时间）；投票阶段是阶段截止时间和各未投票组的投票超时中最早的一个
+    """
+    if game.game_status == GameStatus.DESCRIBING:
+        return game.phase_deadline if game.lobby_mode else game.speaker_deadline
+
+    if game.game_status == GameStatus.VOTING and game.phase_deadline:
+        if game.all_voted():
+            # 所有人已投票但还没有处理结果，立即处理
+            return datetime.now()
+        round_votes = game.votes.get(game.current_round, {})
+        deadlines = [game.phase_deadline]
+        for group_name, vote_start_time in game.vote_start_times.items():
+            if group_name not in round_votes:
+                deadlines.append(vote_start_time + timedelta(seconds=VOTE_TIMEOUT))
+        return min(deadlines)
+
+    return None
+
+
+def _finish_voting(room, message) -> bool:
+    """所有人已投票时处理投票结果并自动开始下一回合（需持有写锁）"""
+    game = room.game
+    vote_result = game.process_voting_result()
+    if 'error' in vote_result:
+        return False
+
+    print(message)
+    # 停止倒计时广播
+    stop_timer_broadcast(room)
+    # 广播状态变化
+    mark_dirty(room, 'status', 'game_state')
+    # 广播投票结果（释放写锁之后发出）
+    emit_after_commit(room, 'vote_result', vote_result)
+    # 广播分数更新，向各组推送自己的投票明细
+    mark_dirty(room, 'scores', 'private')
+
+    # 如果游戏未结束且处于 ROUND_END 状态，自动开始下一回合
+    if not vote_result.get('game_ended') and game.game_status.value == 'round_end':
+        order = game.start_round()
+        if order:
+            # 启动倒计时广播
+            start_timer_broadcast(room)
+            # 广播状态变化和描述列表（新回合开始时描述列表被清空）
+            mark_dirty(room, 'status', 'game_state', 'descriptions')
+    return True
+
+
+def _process_timeouts(room, now) -> bool:
+    """
+    处理到期的发言/投票超时（需持有写锁）
+    返回本次是否已经触发了状态广播
+    """
+    game = room.game
+    need_broadcast = False
+
+    # 大厅模式的描述阶段：描述窗口到时，公开全部描述并进入投票
+    if game.game_status == GameStatus.DESCRIBING and game.lobby_mode:
+        if game.phase_deadline and now > game.phase_deadline:
+            if game.close_describe_window():
+                print(f"描述窗口已关闭，进入投票阶段")
+                need_broadcast = True
+                mark_dirty(room, 'status', 'game_state', 'descriptions')
+
+    # 描述阶段：检查发言者是否超时
+    elif game.game_status == GameStatus.DESCRIBING:
+        if game.speaker_deadline and now > game.speaker_deadline:
+            # 当前发言者超时，自动跳过
+            if game.skip_current_speaker():
+                print(f"发言者超时，已自动跳过")
+                need_broadcast = True
+                # 广播状态和描述列表更新
+                mark_dirty(room, 'status', 'game_state', 'descriptions')
+
+    # 投票阶段：检查是否有未投票的组超时
+    elif game.game_status == GameStatus.VOTING and game.phase_deadline:
+        remaining = max(0, int((game.phase_deadline - now).total_seconds()))
+
+        # 检查每个未投票的组是否超过60秒（vote_start_times 中只剩还未投票的组）
+        for group_name, vote_start_time in list(game.vote_start_times.items()):
+            if group_name in game.active_index:
+                elapsed = (now - vote_start_time).total_seconds()
+                if elapsed >= VOTE_TIMEOUT:  # 超过60秒未投票，自动跳过（与 _next_deadline 使用同一超时）
+                    if game.skip_vote_for_group(group_name):
+                        print(f"组 {group_name} 投票超时（{int(elapsed)}秒），已自动跳过")
+                        need_broadcast = True
+
+        # 检查是否所有人都投票了（包括超时跳过的）
+        # 同时检查游戏状态是否还是 VOTING（避免重复处理）
+        all_voted = game.all_voted()
+        if all_voted and game.game_status.value == 'voting':
+            if _finish_voting(room, "所有人已投票，自动处理投票结果"):
+                need_broadcast = True
+
+        elif remaining <= 0:
+            # 投票阶段总时间到了，自动跳过所有未投票的组
+            round_votes = game.votes.get(game.current_round, {})
+            for group_name in game.round_active_groups():
+                if group_name not in round_votes:
+                    if game.skip_vote_for_group(group_name):
+                        print(f"投票阶段时间到，组 {group_name} 已自动跳过")
+                        need_broadcast = True
+
+            # 跳过所有未投票的组后，再次检查是否所有人都投票了
+            # 同时检查游戏状态是否还是 VOTING（避免重复处理）
+            all_voted = game.all_voted()
+            if all_voted and game.game_status.value == 'voting':
+                if _finish_voting(room, "投票阶段时间到，所有人已投票，自动处理投票结果"):
+                    need_broadcast = True
+
+        if need_broadcast and not all_voted:
+            # 广播状态更新（但不要重复广播，如果已经处理了投票结果）
+            mark_dirty(room, 'status', 'game_state', 'vote_tally')
+
+    return need_broadcast
+
+
+def _schedule_deadline(room, generation):
+    """按当前游戏状态登记房间的下一个截止时间（需持有锁）"""
+    deadline = _next_deadline(room.game)
+    if deadline is not None:
+        scheduler.schedule(deadline.timestamp(), _on_deadline, room, generation)
+
+
+def _on_deadline(room, generation):
+    """
+    截止时间到：处理超时（调度线程上执行）
+    截止时间可能在登记后被推迟（例如发言者按时提交了描述），此时 _process_timeouts 不做任何事，
+    只按新的截止时间重新登记
+    """
+    with room_transaction(room):
+        if room.timer_generation != generation:
+            return
+        _process_timeouts(room, datetime.now())
+        # 处理投票结果时可能已经停止并重新启动了倒计时（新的一代会自己登记）
+        if room.timer_generation == generation:
+            _schedule_deadline(room, generation)
+
+
+def _on_tick(room, generation, when):
+    """每秒向兼容模式的连接推送一次倒计时（调度线程上执行），最后一个订阅者离开后停止"""
+    if room.timer_generation != generation:
+        return
+    if not room.timer_sockets:
+        with room.lock:
+            # 加锁后再确认一次：订阅者加入时看到推送仍在进行，不会重新开始
+            if not room.timer_sockets:
+                if room.tick_generation == generation:
+                    room.tick_generation = None
+                return
+    with room.lock.read():
+        status = build_status(room)
+    if status.get('status') in ('describing', 'voting'):
+        socketio.emit('timer_update', status, to=room.sub_channel('timer'))
+    scheduler.schedule(when + 1, _on_tick, room, generation, when + 1)
+
+
+def start_timer_tick(room):
+    """
+    倒计时运行中且有兼容模式的订阅者时开始每秒推送（需持有写锁）
+    倒计时启动时和第一个订阅者加入时调用，已经在推送时不做任何事；没有订阅者的房间不登记每秒的任务
+    """
+    generation = room.timer_generation
+    if room.timer_running and room.timer_sockets and room.tick_generation != generation:
+        room.tick_generation = generation
+        when = time.time() + 1
+        scheduler.schedule(when, _on_tick, room, generation, when)
+
+
+def start_timer_broadcast(room):
+    """
+    开始房间的倒计时：登记下一个截止时间，有订阅者时每秒推送倒计时（需持有写锁）
+    每次启动都是新的一代，之前登记的任务到期后发现代数不符直接丢弃
+    """
+    room.timer_generation += 1
+    room.timer_running = True
+    _schedule_deadline(room, room.timer_generation)
+    start_timer_tick(room)
+
+
+def restart_deadline(room):
+    """
+    阶段提前结束时按新阶段重新登记截止时间（需持有写锁），例如所有组提前提交了描述而进入投票阶段
+    调度器不能撤销任务，之前登记的截止时间（大厅模式下是整个描述窗口）可能远晚于投票超时；
+    开始新的一代，旧任务到期后直接丢弃
+    """
+    if room.timer_running:
+        start_timer_broadcast(room)
+
 
+def stop_timer_broadcast(room):
+    """停止房间的倒计时（需持有写锁），已登记的任务到期后直接丢弃"""
+    room.timer_generation += 1
+    room.timer_running = False
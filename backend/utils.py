@@ -1,24 +1,25 @@
 """
 后端工具函数模块
 """
-from flask import request, jsonify
+from flask import request, jsonify, current_app
+from functools import wraps
 from typing import Dict, Optional
+import hashlib
+import hmac
+import json
 import socket
-from backend.config import ADMIN_TOKEN
+import time
+from backend.config import ADMIN_TOKEN, HOST_TICKET_TTL
 
 # 这些变量需要在运行时从app.py注入
-game = None
-game_lock = None
-group_sockets = None
+rooms = None
 socketio = None
 
 
-def init_utils(game_instance, lock, sockets_dict, socketio_instance):
+def init_utils(room_registry, socketio_instance):
     """初始化工具函数需要的全局变量"""
-    global game, game_lock, group_sockets, socketio
-    game = game_instance
-    game_lock = lock
-    group_sockets = sockets_dict
+    global rooms, socketio
+    rooms = room_registry
     socketio = socketio_instance
 
 
@@ -40,42 +41,126 @@ def require_admin():
     return header_token == ADMIN_TOKEN
 
 
+def _host_ticket_signature(room_id: str, expires: int) -> str:
+    """主持方连接凭证的签名（以主持方令牌为密钥）"""
+    message = f"{room_id}:{expires}".encode()
+    return hmac.new(ADMIN_TOKEN.encode(), message, hashlib.sha256).hexdigest()
+
+
+def issue_host_ticket(room_id: str, ttl: int = HOST_TICKET_TTL) -> str:
+    """
+    签发房间的主持方连接凭证："<过期时间戳>.<签名>"
+    只能在有效期内用于 WebSocket 连接该房间时加入主持方子频道，不能调用任何主持方接口
+    """
+    expires = int(time.time()) + ttl
+    return f"{expires}.{_host_ticket_signature(room_id, expires)}"
+
+
+def verify_host_ticket(ticket, room_id: str) -> bool:
+    """校验主持方连接凭证属于该房间且未过期"""
+    if not isinstance(ticket, str):
+        return False
+    expires, _, signature = ticket.partition('.')
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _host_ticket_signature(room_id, int(expires)))
+
+
 def admin_forbidden_response():
     """返回无权限响应"""
     return make_response({}, 403, '无权限：需要主持方令牌')
 
 
-def make_response(data=None, code=200, message="ok"):
-    """统一响应格式"""
+def make_response(data=None, code=200, message="ok", etag: Optional[str] = None):
+    """统一响应格式，传入 etag 时在成功响应上设置 ETag 头"""
     payload = {
         "code": code,
         "message": message,
         "data": data or {}
     }
-    return jsonify(payload), code
+    response = jsonify(payload)
+    if etag and code == 200:
+        response.set_etag(etag)
+    return response, code
+
+
+def state_etag(room) -> str:
+    """由房间实例标识和状态版本号构成的ETag（需持有读锁），只适用于完全由游戏状态决定的响应"""
+    return f"{room.instance_id}-{room.game.version}"
+
+
+def etag_matches(etag: str) -> bool:
+    """客户端的 If-None-Match 是否与 etag 相同"""
+    return request.if_none_match.contains(etag)
+
+
+def not_modified_response(etag: str):
+    """304 响应（无响应体）"""
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    return response
 
 
-def get_websocket_status() -> Optional[Dict[str, bool]]:
+def encode_json(data) -> str:
+    """序列化为紧凑的JSON字符串（用于缓存，之后由 make_cached_response 拼接成响应）"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+def make_cached_response(data_json: str, extra: Optional[Dict] = None, code=200, message="ok",
+                         etag: Optional[str] = None):
+    """
+    统一响应格式，data 使用预先序列化好的JSON对象字符串
+    extra 中的字段（例如倒计时）每次重新序列化后追加到 data 中，不能与缓存中的字段重名
+    传入 etag 时，客户端 If-None-Match 命中则返回 304
+    """
+    if etag and etag_matches(etag):
+        return not_modified_response(etag)
+    if extra:
+        extra_json = encode_json(extra)
+        if data_json == '{}':
+            data_json = extra_json
+        else:
+            data_json = data_json[:-1] + ',' + extra_json[1:]
+    body = '{"code":%d,"message":%s,"data":%s}' % (code, encode_json(message), data_json)
+    response = current_app.response_class(body, status=code, mimetype='application/json')
+    if etag and code == 200:
+        response.set_etag(etag)
+    return response
+
+
+def room_route(app, rule: str, **options):
+    """
+    注册房间作用域路由
+    同一个视图函数同时挂载在旧路径（默认房间）和 /api/rooms/<room_id>/... 路径上，
+    视图函数的第一个参数为解析后的 Room 对象
+    例如 '/api/status' 同时对应 '/api/rooms/<room_id>/status'
     """
-    获取各组基于WebSocket的连接状态
-    如果没有WebSocket连接，则返回None，让get_online_status使用HTTP活跃时间降级方案
+    def decorator(func):
+        @wraps(func)
+        def view(room_id: Optional[str] = None):
+            room = rooms.get(room_id)
+            if room is None:
+                return make_response({}, 404, '房间不存在')
+            return func(room)
+
+        scoped_rule = '/api/rooms/<room_id>' + rule[len('/api'):]
+        app.add_url_rule(rule, func.__name__, view, **options)
+        app.add_url_rule(scoped_rule, func.__name__, view, **options)
+        return view
+
+    return decorator
+
+
+def get_websocket_status(room):
     """
-    global game, group_sockets
-    
-    if game is None or group_sockets is None:
+    获取房间内各组基于WebSocket的连接状态（connections.Presence 视图：有连接的组在线，其余组离线），
+    不遍历组列表；如果没有WebSocket连接，则返回None，让get_online_status使用HTTP活跃时间降级方案
+    """
+    if room is None:
         return None
-    
-    # 检查是否有任何WebSocket连接
-    has_any_connection = any(len(socket_ids) > 0 for socket_ids in group_sockets.values())
-    
-    if not has_any_connection:
+
+    connections = room.connections
+    if not connections.online_count:
         # 没有任何WebSocket连接，返回None，使用HTTP活跃时间降级
         return None
-    
-    # 有WebSocket连接，返回WebSocket连接状态
-    websocket_status = {}
-    for group_name in game.groups.keys():
-        socket_ids = group_sockets.get(group_name, set())
-        websocket_status[group_name] = len(socket_ids) > 0
-    return websocket_status
-
+    return connections.presence
@@ -1,40 +1,277 @@
 """
 WebSocket事件处理模块
+客户端连接时通过查询参数 room_id 选择房间（不传则进入默认房间），
+也可以在 register_socket 事件中携带 room_id 切换房间；
+连接时携带查询参数 patch=1 则以增量模式接收 status / game_state 推送；
+携带 timer=1 则额外每秒收到一次 timer_update（兼容模式，默认由客户端根据截止时间本地倒计时）
+
+每个房间按受众划分子频道：
+- room:<id>                 房间内所有连接（公开事件）
+- room:<id>:full / :patch   按推送模式划分的 status 订阅者
+- room:<id>:host:full / :host:patch  主持方（连接时 auth 携带 admin_token），接收 game_state
+- room:<id>:players         已通过 register_socket 注册的游戏方连接
+- room:<id>:group:<组名>    单个组的所有连接
+- room:<id>:timer           订阅每秒倒计时推送的连接
+
+断线重连：register_socket 成功后下发该组的重连令牌 resume_token 和当前事件序号 seq；
+组的最后一个连接断开后有 RECONNECT_GRACE 秒宽限期，期间携带 resume_token 和最后收到的 last_seq
+重新连接（auth 或查询参数）即恢复该组的连接，并按顺序补发错过的广播事件；
+宽限期内没有重连才按退出游戏处理
 """
 from flask import request
-from flask_socketio import emit
+from flask_socketio import emit, join_room, leave_room, rooms as socket_channels, ConnectionRefusedError
+import time
 from datetime import datetime
-from backend.utils import get_websocket_status
-from backend.services import broadcast_status, broadcast_game_state, broadcast_groups, broadcast_scores, stop_timer_broadcast
+from typing import Dict
+from backend.utils import get_websocket_status, verify_host_ticket
+from backend.config import ADMIN_TOKEN, RECONNECT_GRACE
+from backend.services import mark_dirty, stop_timer_broadcast, restart_deadline, emit_after_commit, room_transaction
+from backend.services import build_status, build_game_state, get_published_state
+from backend.services.timer import scheduler, start_timer_tick
 
 # 这些变量需要在运行时注入
-game = None
-game_lock = None
-group_sockets = None
+rooms = None
 socketio = None
 
+# 连接所在房间：session_id -> room_id
+socket_rooms: Dict[str, str] = {}
+
+# 以增量模式接收状态推送的连接
+patch_sockets: set = set()
+
+# 主持方连接（可以接收完整游戏状态）
+host_sockets: set = set()
 
-def init_websocket_handlers(game_instance, lock, sockets_dict, socketio_instance):
+# 订阅每秒倒计时推送的连接
+timer_sockets: set = set()
+
+
+def init_websocket_handlers(room_registry, socketio_instance):
     """初始化WebSocket处理器"""
-    global game, game_lock, group_sockets, socketio
-    game = game_instance
-    game_lock = lock
-    group_sockets = sockets_dict
+    global rooms, socketio
+    rooms = room_registry
     socketio = socketio_instance
 
 
+def get_socket_room(sid):
+    """获取连接所在的房间（房间已被删除时返回None）"""
+    return rooms.get(socket_rooms.get(sid))
+
+
+def _join_room_channels(room, sid):
+    """加入房间频道以及对应推送模式（和主持方）的子频道"""
+    socket_rooms[sid] = room.room_id
+    mode = 'patch' if sid in patch_sockets else 'full'
+    join_room(room.channel)
+    join_room(room.sub_channel(mode))
+    if sid in host_sockets:
+        join_room(room.sub_channel('host', mode))
+    if sid in timer_sockets:
+        join_room(room.sub_channel('timer'))
+        with room.lock:
+            room.timer_sockets.add(sid)
+            # 第一个订阅者加入时开始每秒推送
+            start_timer_tick(room)
+
+
+def close_room_channels(room):
+    """
+    房间被删除时解散它的频道及所有子频道，并解除连接与房间的关联；
+    之后同ID重新创建的房间不会再推送给旧连接，旧连接也不会操作到新房间
+    """
+    for sid in [sid for sid, room_id in socket_rooms.items() if room_id == room.room_id]:
+        del socket_rooms[sid]
+    room.timer_sockets.clear()
+    prefix = room.channel + ':'
+    # 管理器的频道表里还有 None（所有连接）和每个连接自己的频道，只取本房间的频道
+    channels = socketio.server.manager.rooms.get('/', {})
+    for channel in [c for c in channels if isinstance(c, str) and (c == room.channel or c.startswith(prefix))]:
+        socketio.close_room(channel)
+
+
+def _leave_room_channels(room, sid):
+    """离开该房间的频道及其所有子频道"""
+    room.timer_sockets.discard(sid)
+    prefix = room.channel + ':'
+    for channel in socket_channels():
+        if channel == room.channel or channel.startswith(prefix):
+            leave_room(channel)
+
+
+def _is_host(auth, room) -> bool:
+    """
+    连接是否属于主持方（Socket.IO auth 或同名查询参数）
+    - admin_token：主持方令牌
+    - host_ticket：由 /api/host/ticket 签发的本房间连接凭证，浏览器页面用它代替主持方令牌
+    """
+    auth = auth if isinstance(auth, dict) else {}
+    token = auth.get('admin_token') or request.args.get('admin_token', '')
+    if token:
+        return token == ADMIN_TOKEN
+    ticket = auth.get('host_ticket') or request.args.get('host_ticket', '')
+    return bool(ticket) and verify_host_ticket(ticket, room.room_id)
+
+
+def _current_state(room, sid, topic):
+    """
+    给单个连接发送的当前状态
+    增量模式的连接拿到的是最近一次发布的状态，后续补丁的 base_version 才能与之衔接
+    """
+    if sid in patch_sockets:
+        published = get_published_state(room, topic)
+        if published is not None:
+            return published
+    builder = build_status if topic == 'status' else build_game_state
+    with room.lock.read():
+        return builder(room)
+
+
+def _detach_socket(room, sid):
+    """
+    将连接从房间的组追踪中移除，需在持有 room.lock 时调用
+    返回已没有任何连接的组名列表
+    """
+    return room.connections.detach(sid)
+
+
+def _resume_request(auth):
+    """连接携带的断线重连参数 (令牌, 最后收到的事件序号)，没有携带令牌时返回None"""
+    auth = auth if isinstance(auth, dict) else {}
+    token = auth.get('resume_token') or request.args.get('resume_token', '')
+    if not token:
+        return None
+    try:
+        last_seq = int(auth.get('last_seq', request.args.get('last_seq', 0)))
+    except (TypeError, ValueError):
+        last_seq = -1
+    return token, last_seq
+
+
+def _group_left(room, group_name):
+    """组的所有连接都已断开且没有在宽限期内重连：按退出游戏处理（需持有写锁）"""
+    result = room.game.handle_disconnect(group_name)
+    if result is None:
+        # 游戏继续：断开的组可能是最后一个没提交描述或没投票的组，最近的截止时间随之提前
+        # （提前进入投票阶段，或所有人都已投票需要立即结算），按当前状态重新登记
+        restart_deadline(room)
+    if result:
+        # 如果有游戏结果（游戏结束），广播结果（释放写锁之后发出）
+        if result.get('game_ended'):
+            stop_timer_broadcast(room)
+            emit_after_commit(room, 'vote_result', result)
+            # 广播分数更新（因为游戏结束可能计算了分数）
+            mark_dirty(room, 'scores')
+        # 广播状态更新、组列表更新和被淘汰组的私有状态（因为可能有组被标记为淘汰）
+        mark_dirty(room, 'status', 'game_state', 'groups', 'private')
+
+
+def _defer_disconnect(room, group_name):
+    """组的最后一个连接断开：进入重连宽限期，到期仍未重连再按退出游戏处理（需持有写锁）"""
+    marker = object()
+    room.disconnect_pending[group_name] = marker
+    scheduler.schedule(time.time() + RECONNECT_GRACE, _on_grace_expired, room, group_name, marker)
+    # 在线状态变化
+    mark_dirty(room, 'status')
+
+
+def _socket_left(room, sid):
+    """
+    连接离开房间（断开连接或切换到其他房间，需持有写锁）
+    因此没有任何连接的组，宽限期内没有重连才按退出游戏处理
+    """
+    for group_name in _detach_socket(room, sid):
+        if RECONNECT_GRACE > 0:
+            _defer_disconnect(room, group_name)
+        else:
+            _group_left(room, group_name)
+
+
+def _on_grace_expired(room, group_name, marker):
+    """重连宽限期到期（调度线程上执行）：期间重连过或重新注册过的组不处理"""
+    with room_transaction(room):
+        if room.disconnect_pending.get(group_name) is not marker:
+            return
+        del room.disconnect_pending[group_name]
+        if not room.connections.is_online(group_name):
+            _group_left(room, group_name)
+
+
+def _attach_group(room, sid, group_name) -> str:
+    """将连接关联到组并取消该组的断线宽限期（需持有写锁），返回该组的重连令牌"""
+    room.connections.attach(sid, group_name)
+    if room.disconnect_pending.pop(group_name, None) is not None:
+        # 在线状态变化
+        mark_dirty(room, 'status')
+    room.game.update_activity(group_name)
+    return room.resume_token(group_name)
+
+
+def _resume_session(room, sid, token, last_seq) -> bool:
+    """
+    凭重连令牌恢复组的连接并补发错过的事件，令牌无效时返回False
+    补发的事件在事件缓冲的锁内计算并发出，之后的实时广播一定排在它们后面；
+    错过的事件已不在缓冲区内时改为发送当前完整状态；最后下发该组当前的私有状态
+    """
+    with room_transaction(room):
+        group_name = room.resume_tokens.get(token)
+        if group_name is None:
+            return False
+        _attach_group(room, sid, group_name)
+
+    ring = room.events
+    with ring.lock:
+        _join_room_channels(room, sid)
+        join_room(room.sub_channel('players'))
+        join_room(room.sub_channel('group', group_name))
+        missed = ring.since(last_seq, set(socket_channels()))
+        if missed is not None:
+            for event, payload in missed:
+                emit(event, payload)
+        seq = ring.seq
+    if missed is None:
+        emit('status_update', _current_state(room, sid, 'status'))
+    # 私有状态不登记到事件缓冲，恢复时总是下发当前值
+    with room.lock.read():
+        private_state = room.game.get_private_state(group_name)
+    emit('session_resumed', {
+        'group_name': group_name,
+        'room_id': room.room_id,
+        'resume_token': token,
+        'replayed': len(missed) if missed is not None else 0,
+        'resync': missed is None,
+        'seq': seq
+    })
+    emit('private_update', private_state)
+    return True
+
+
 def register_websocket_handlers(socketio_app):
     """注册WebSocket事件处理器"""
-    
+
     @socketio_app.on('connect')
-    def handle_connect():
-        """客户端连接时发送当前状态"""
-        with game_lock:
-            websocket_status = get_websocket_status()
-            status = game.get_public_status()
-            # 更新在线状态（使用WebSocket连接状态）
-            status['online_status'] = game.get_online_status(websocket_status)
-        emit('status_update', status)
+    def handle_connect(auth=None):
+        """客户端连接时加入房间频道并发送当前状态"""
+        room = rooms.get(request.args.get('room_id', '').strip())
+        if room is None:
+            raise ConnectionRefusedError('房间不存在')
+
+        sid = request.sid
+        if request.args.get('patch') in ('1', 'true'):
+            patch_sockets.add(sid)
+        if _is_host(auth, room):
+            host_sockets.add(sid)
+        if request.args.get('timer') in ('1', 'true'):
+            timer_sockets.add(sid)
+
+        resume = _resume_request(auth)
+        if resume is not None and _resume_session(room, sid, *resume):
+            return
+        _join_room_channels(room, sid)
+
+        emit('status_update', _current_state(room, sid, 'status'))
+        if resume is not None:
+            # 令牌无效（房间已重建或进程重启），客户端需要重新注册
+            emit('session_resume_failed', {'message': '重连令牌无效，请重新注册'})
 
     @socketio_app.on('register_socket')
     def handle_register_socket(data):
@@ -43,69 +280,87 @@ def register_websocket_handlers(socketio_app):
         if not group_name:
             emit('error', {'message': '组名不能为空'})
             return
-        
+
         sid = request.sid  # 获取当前连接的session ID
-        
-        with game_lock:
-            # 将socket ID关联到组名
-            if group_name not in group_sockets:
-                group_sockets[group_name] = set()
-            group_sockets[group_name].add(sid)
-            
-            # 更新活跃时间
-            game.update_activity(group_name)
-        
-        emit('socket_registered', {'group_name': group_name, 'status': 'success'})
+        room = get_socket_room(sid)
+
+        # 客户端在注册时指定了其他房间，则切换房间
+        room_id = data.get('room_id', '').strip()
+        if room_id and (room is None or room_id != room.room_id):
+            target = rooms.get(room_id)
+            if target is None:
+                emit('error', {'message': '房间不存在'})
+                return
+            if room is not None:
+                # 与断开连接相同：原房间里因此没有任何连接的组进入重连宽限期
+                with room_transaction(room):
+                    _socket_left(room, sid)
+                _leave_room_channels(room, sid)
+            room = target
+            _join_room_channels(room, sid)
+
+        if room is None:
+            emit('error', {'message': '房间不存在'})
+            return
+
+        with room_transaction(room):
+            # 将socket ID关联到组名（同时更新活跃时间、取消断线宽限期）
+            token = _attach_group(room, sid, group_name)
+            private_state = room.game.get_private_state(group_name)
+
+        join_room(room.sub_channel('players'))
+        join_room(room.sub_channel('group', group_name))
+        emit('socket_registered', {'group_name': group_name, 'room_id': room.room_id, 'status': 'success',
+                                   'resume_token': token, 'seq': room.events.seq})
+        # 本组当前的私有状态（词语、是否淘汰、最近一次投票明细），之后有变化时推送到本组频道
+        emit('private_update', private_state)
 
     @socketio_app.on('disconnect')
     def handle_disconnect():
         """客户端断开连接时自动检测并处理"""
         sid = request.sid
-        
-        with game_lock:
-            # 找到断开连接的组
-            disconnected_groups = []
-            for group_name, socket_ids in list(group_sockets.items()):
-                if sid in socket_ids:
-                    socket_ids.remove(sid)
-                    # 如果这个组没有其他连接了
-                    if len(socket_ids) == 0:
-                        disconnected_groups.append(group_name)
-                        # 处理断开连接（视为退出游戏）
-                        result = game.handle_disconnect(group_name)
-                        if result:
-                            # 如果有游戏结果（游戏结束），广播结果
-                            if result.get('game_ended'):
-                                stop_timer_broadcast()
-                                socketio.emit('vote_result', result)
-                                # 广播分数更新（因为游戏结束可能计算了分数）
-                                socketio.start_background_task(broadcast_scores)
-                            # 广播状态更新
-                            socketio.start_background_task(broadcast_status)
-                            socketio.start_background_task(broadcast_game_state)
-                            # 广播组列表更新（因为可能有组被标记为淘汰）
-                            socketio.start_background_task(broadcast_groups)
-            
-            # 清理空的socket集合
-            for group_name in disconnected_groups:
-                if group_name in group_sockets and len(group_sockets[group_name]) == 0:
-                    del group_sockets[group_name]
+        patch_sockets.discard(sid)
+        host_sockets.discard(sid)
+        timer_sockets.discard(sid)
+        room = rooms.get(socket_rooms.pop(sid, None))
+        if room is None:
+            return
+        room.timer_sockets.discard(sid)
+
+        with room_transaction(room):
+            _socket_left(room, sid)
 
     @socketio_app.on('request_status')
     def handle_request_status():
-        """客户端请求状态更新"""
-        with game_lock:
-            websocket_status = get_websocket_status()
-            status = game.get_public_status()
-            # 更新在线状态（使用WebSocket连接状态）
-            status['online_status'] = game.get_online_status(websocket_status)
-        emit('status_update', status)
+        """客户端请求状态更新（增量模式的连接在发现版本不连续时也通过它重新同步）"""
+        room = get_socket_room(request.sid)
+        if room is None:
+            emit('error', {'message': '房间不存在'})
+            return
+        emit('status_update', _current_state(room, request.sid, 'status'))
+
+    @socketio_app.on('request_game_state')
+    def handle_request_game_state():
+        """客户端请求完整游戏状态（主持方用，增量模式重新同步）"""
+        if request.sid not in host_sockets:
+            emit('error', {'message': '无权限：需要主持方令牌'})
+            return
+        room = get_socket_room(request.sid)
+        if room is None:
+            emit('error', {'message': '房间不存在'})
+            return
+        emit('game_state_update', _current_state(room, request.sid, 'game_state'))
 
     @socketio_app.on('request_timer')
     def handle_request_timer():
         """客户端请求倒计时更新"""
-        with game_lock:
-            websocket_status = get_websocket_status()
+        room = get_socket_room(request.sid)
+        if room is None:
+            emit('error', {'message': '房间不存在'})
+            return
+        game = room.game
+        with room.lock.read():
+            websocket_status = get_websocket_status(room)
             status = game.get_public_status()
             # 更新在线状态（使用WebSocket连接状态）
             status['online_status'] = game.get_online_status(websocket_status)
@@ -120,4 +375,3 @@ def register_websocket_handlers(socketio_app):
                 status['speaker_remaining_seconds'] = speaker_remaining
 
         emit('timer_update', status)
-
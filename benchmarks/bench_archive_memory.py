@@ -0,0 +1,96 @@
+"""
+对局归档基准测试
+开启 SQLite 归档后连续进行大量对局，每隔一段统计一次进程内存（tracemalloc 当前占用），
+验证内存不随局数增长；同时统计请求路径上的归档开销（入队）和写入线程的批量写入吞吐
+
+运行方式：python benchmarks/bench_archive_memory.py [--games 2000] [--groups 10]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_logic import GameLogic, GameStatus  # noqa: E402
+from backend.services.archive import GameArchive  # noqa: E402
+
+
+def play_game(game: GameLogic, groups):
+    """进行一局完整的游戏（每轮所有人描述后投给第一个发言者，直到游戏结束）"""
+    game.start_game('卧底词', '平民词', {name: True for name in groups})
+    while game.game_status != GameStatus.GAME_END:
+        game.start_round()
+        order = list(game.describe_order)
+        for name in order:
+            game.submit_description(name, f'{name}的描述' * 5)
+        for name in order:
+            game.submit_vote(name, order[1] if name == order[0] else order[0])
+        game.process_voting_result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对局归档基准测试')
+    parser.add_argument('--games', type=int, default=2000, help='连续进行的游戏局数')
+    parser.add_argument('--groups', type=int, default=10, help='组数')
+    args = parser.parse_args()
+
+    groups = [f'组{i}' for i in range(args.groups)]
+    with tempfile.TemporaryDirectory() as directory:
+        store = GameArchive(os.path.join(directory, 'archive.db'))
+        game = GameLogic()
+        game.archive = store.room('bench')
+        for name in groups:
+            game.register_group(name)
+
+        # 第一遍：统计请求路径上的归档耗时（入队）和总耗时
+        enqueue_seconds = []
+        original_finished = game._archive_finished
+
+        def timed_finished():
+            start = time.perf_counter()
+            original_finished()
+            enqueue_seconds.append(time.perf_counter() - start)
+
+        game._archive_finished = timed_finished
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(args.games):
+                play_game(game, groups)
+        elapsed = time.perf_counter() - start
+        game._archive_finished = original_finished
+        enqueue_seconds.sort()
+        print(f"games={args.games} total={elapsed:.2f}s archive enqueue on request path: "
+              f"p50={enqueue_seconds[len(enqueue_seconds) // 2] * 1e6:.0f}us "
+              f"p99={enqueue_seconds[int(len(enqueue_seconds) * 0.99)] * 1e6:.0f}us")
+
+        # 第二遍：继续进行同样多的对局，每隔一段统计一次内存占用
+        tracemalloc.start()
+        checkpoints = max(args.games // 5, 1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(1, args.games + 1):
+                play_game(game, groups)
+                if i % checkpoints == 0:
+                    store.flush()
+                    current = tracemalloc.get_traced_memory()[0] / 1024
+                    print(f"games={args.games + i} memory={current:.0f}KB", file=sys.stderr)
+        tracemalloc.stop()
+
+        store.flush()
+        rounds = store.query('SELECT COUNT(*) AS n FROM rounds')[0]['n']
+        descriptions = store.query('SELECT COUNT(*) AS n FROM descriptions')[0]['n']
+        size_mb = os.path.getsize(store.path) / 1024 / 1024
+        print(f"archived rounds={rounds} descriptions={descriptions} db={size_mb:.1f}MB")
+
+        start = time.perf_counter()
+        for _ in range(100):
+            game.archive.get_rounds(game.game_id, group=groups[0])
+        print(f"indexed query (game + group): {(time.perf_counter() - start) * 10:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
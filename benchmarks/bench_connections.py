@@ -0,0 +1,112 @@
+"""
+连接追踪基准测试
+一个房间内有若干组、共 --sockets 个WebSocket连接，随机断开并重新连接（churn），
+每次连接变化后查询一次在线状态（对应一次状态广播）；
+对比原来的做法（断开时遍历所有组的连接集合、每次查询重建整个在线状态字典）与 ConnectionRegistry
+
+运行方式：python benchmarks/bench_connections.py [--sockets 10000] [--groups 2000] [--churn 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.connections import ConnectionRegistry  # noqa: E402
+
+
+class LegacyConnections:
+    """原来的做法：组名 -> 连接集合，没有反向索引"""
+
+    def __init__(self, groups):
+        self.groups = groups
+        self.group_sockets = {}
+
+    def attach(self, sid, group_name):
+        if group_name not in self.group_sockets:
+            self.group_sockets[group_name] = set()
+        self.group_sockets[group_name].add(sid)
+
+    def detach(self, sid):
+        disconnected_groups = []
+        for group_name, socket_ids in list(self.group_sockets.items()):
+            if sid in socket_ids:
+                socket_ids.remove(sid)
+                if len(socket_ids) == 0:
+                    disconnected_groups.append(group_name)
+                    del self.group_sockets[group_name]
+        return disconnected_groups
+
+    def status(self):
+        if not any(len(socket_ids) > 0 for socket_ids in self.group_sockets.values()):
+            return None
+        return {name: len(self.group_sockets.get(name, set())) > 0 for name in self.groups}
+
+
+class RegistryConnections:
+    """ConnectionRegistry"""
+
+    def __init__(self, groups):
+        self.registry = ConnectionRegistry()
+
+    def attach(self, sid, group_name):
+        self.registry.attach(sid, group_name)
+
+    def detach(self, sid):
+        return self.registry.detach(sid)
+
+    def status(self):
+        return self.registry.presence if self.registry.online_count else None
+
+
+def run(impl, names, sockets, churn_ops):
+    """登记所有连接，然后执行 churn：断开一个连接并以新的 sid 重新连接同一组，每次变化后查询在线状态"""
+    connections = impl(names)
+    owners = {}
+    start = time.perf_counter()
+    for i in range(sockets):
+        sid = f's{i}'
+        owners[sid] = names[i % len(names)]
+        connections.attach(sid, owners[sid])
+    connect_time = time.perf_counter() - start
+
+    rng = random.Random(1)
+    live = list(owners)
+    next_sid = sockets
+    start = time.perf_counter()
+    for _ in range(churn_ops):
+        idx = rng.randrange(len(live))
+        sid = live[idx]
+        group_name = owners.pop(sid)
+        connections.detach(sid)
+        connections.status()
+        new_sid = f's{next_sid}'
+        next_sid += 1
+        owners[new_sid] = group_name
+        live[idx] = new_sid
+        connections.attach(new_sid, group_name)
+        connections.status()
+    churn_time = time.perf_counter() - start
+    return connect_time, churn_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description='连接追踪基准测试')
+    parser.add_argument('--sockets', type=int, default=10000, help='连接数')
+    parser.add_argument('--groups', type=int, default=2000, help='组数')
+    parser.add_argument('--churn', type=int, default=20000, help='断开并重连的次数')
+    args = parser.parse_args()
+
+    names = [f'组{i}' for i in range(args.groups)]
+    print(f"连接数={args.sockets}，组数={args.groups}，churn={args.churn} 次（每次断开+重连，各查询一次在线状态）")
+    for label, impl in (('原来的做法', LegacyConnections), ('ConnectionRegistry', RegistryConnections)):
+        connect_time, churn_time = run(impl, names, args.sockets, args.churn)
+        per_op = churn_time / (args.churn * 2) * 1e6
+        print(f"{label:<18} 建立连接={connect_time * 1000:8.1f}ms  churn={churn_time:7.2f}s  "
+              f"每次变化+查询={per_op:9.1f}us")
+
+
+if __name__ == '__main__':
+    main()
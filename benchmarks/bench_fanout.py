@@ -0,0 +1,79 @@
+"""
+扇出基准测试
+一个房间里有若干个正常连接和一个始终不读取数据的慢连接，连续广播若干次 status_update（每次附带一条补丁），
+对比默认客户端管理器与 FanoutManager 下：广播耗时、慢连接积压的数据包数（内存占用）以及慢连接是否被断开
+
+运行方式：python benchmarks/bench_fanout.py [--clients 200] [--broadcasts 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import socketio  # noqa: E402
+from backend.services.fanout import FanoutManager  # noqa: E402
+
+
+class Transport:
+    """假 engine.io 连接：正常连接立即写出，慢连接的数据包全部积压"""
+
+    def __init__(self, slow: bool):
+        self.slow = slow
+        self.packets = []
+        self.queue = self
+
+    def qsize(self):
+        return len(self.packets)
+
+    def send(self, pkt):
+        if self.slow:
+            self.packets.append(pkt)
+
+
+def run(manager, clients: int, broadcasts: int, payload: dict):
+    server = socketio.Server(client_manager=manager, async_mode='threading')
+    transports = {}
+    disconnected = []
+    server._send_eio_packet = lambda eio_sid, pkt: transports[eio_sid].send(pkt)
+
+    def disconnect(eio_sid):
+        # 与真实服务器一样，底层连接断开后连接离开所有频道
+        disconnected.append(eio_sid)
+        manager.disconnect(manager.sid_from_eio_sid(eio_sid, '/'), '/')
+
+    server.eio.disconnect = disconnect
+    for i in range(clients + 1):
+        eio_sid = f'c{i}'
+        transports[eio_sid] = server.eio.sockets[eio_sid] = Transport(slow=i == clients)
+        manager.enter_room(manager.connect(eio_sid, '/'), '/', 'room:bench')
+
+    start = time.perf_counter()
+    for version in range(broadcasts):
+        payload['version'] = version
+        server.emit('status_update', payload, to='room:bench')
+        server.emit('status_patch', {'base_version': version - 1, 'version': version}, to='room:bench')
+    elapsed = time.perf_counter() - start
+    time.sleep(0.2)
+    slow = transports[f'c{clients}']
+    queued = manager.pending() if isinstance(manager, FanoutManager) else 0
+    return elapsed, len(slow.packets) + queued, disconnected
+
+
+def main():
+    parser = argparse.ArgumentParser(description='扇出基准测试')
+    parser.add_argument('--clients', type=int, default=200, help='正常连接数')
+    parser.add_argument('--broadcasts', type=int, default=2000, help='广播次数')
+    args = parser.parse_args()
+
+    payload = {'status': 'voting', 'groups': [f'组{i}' for i in range(50)], 'version': 0}
+    print(f"正常连接={args.clients}，慢连接=1，广播 {args.broadcasts} 次（每次 status_update + status_patch）")
+    for name, manager in (('默认管理器', socketio.Manager()), ('FanoutManager', FanoutManager())):
+        elapsed, backlog, disconnected = run(manager, args.clients, args.broadcasts, payload)
+        print(f"{name:<14} 广播耗时={elapsed:6.2f}s  慢连接积压={backlog:>6} 条  "
+              f"被断开={'是' if disconnected else '否'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+组数据模型基准测试
+放开 MAX_GROUPS 后注册上千个组，其中一部分离线（开始游戏时即被标记为淘汰），
+完整进行一回合（开始游戏、所有组准备、描述、投票、结算），分别统计各阶段耗时和组信息的内存占用
+
+运行方式：python benchmarks/bench_group_model.py [--groups 1000] [--offline 0.5]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import game_logic  # noqa: E402
+from game_logic import GameLogic  # noqa: E402
+
+
+def timed(label: str, func, results: dict):
+    start = time.perf_counter()
+    func()
+    results[label] = time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='组数据模型基准测试')
+    parser.add_argument('--groups', type=int, default=1000, help='组数')
+    parser.add_argument('--offline', type=float, default=0.5, help='离线组所占比例')
+    args = parser.parse_args()
+
+    game_logic.MAX_GROUPS = args.groups
+    names = [f'组{i}' for i in range(args.groups)]
+    game = GameLogic()
+    results = {}
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    timed('register', lambda: [game.register_group(name) for name in names], results)
+    groups_kb = (tracemalloc.get_traced_memory()[0] - before) / 1024
+    tracemalloc.stop()
+
+    offline_count = int(args.groups * args.offline)
+    online = {name: i >= offline_count for i, name in enumerate(names)}
+
+    def start():
+        game.start_game('卧底词', '平民词', online)
+
+    def ready():
+        for name in names[offline_count:]:
+            game.submit_ready(name)
+        game.start_round()
+
+    def describe():
+        for name in list(game.describe_order):
+            game.submit_description(name, '描述')
+
+    def vote():
+        order = list(game.describe_order)
+        for name in order:
+            game.submit_vote(name, order[1] if name == order[0] else order[0])
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        timed('start_game', start, results)
+        timed('ready+start_round', ready, results)
+        timed('describe', describe, results)
+        timed('vote', vote, results)
+        timed('process_result', game.process_voting_result, results)
+        timed('public_status', game.get_public_status, results)
+
+    print(f"groups={args.groups} offline={offline_count} group records={groups_kb:.0f}KB")
+    for label, seconds in results.items():
+        print(f"  {label:<18} {seconds * 1000:8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+事件日志基准测试
+在一个开启事件日志的房间里反复进行完整的游戏（注册、开始、描述、投票、重置），
+直到写入指定数量的事件，统计记录开销、刷盘后的文件大小，以及从日志重放恢复状态的耗时
+
+运行方式：python benchmarks/bench_journal_replay.py [--events 100000] [--groups 8]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_logic import GameLogic, GameStatus  # noqa: E402
+from backend.services.journal import EventJournal, read_journal, replay_journal  # noqa: E402
+
+
+def play_game(game: GameLogic, groups):
+    """进行一局完整的游戏（每轮所有人描述后投给第一个发言者，直到游戏结束）"""
+    game.start_game('卧底词', '平民词', {name: True for name in groups})
+    for name in groups:
+        game.submit_ready(name)
+    while game.game_status != GameStatus.GAME_END:
+        game.start_round()
+        order = list(game.describe_order)
+        for name in order:
+            game.submit_description(name, f'{name}的描述')
+        for name in order:
+            game.submit_vote(name, order[1] if name == order[0] else order[0])
+        game.process_voting_result()
+    game.reset_game()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='事件日志基准测试')
+    parser.add_argument('--events', type=int, default=100000, help='至少写入的事件数')
+    parser.add_argument('--groups', type=int, default=8, help='组数')
+    args = parser.parse_args()
+
+    groups = [f'组{i}' for i in range(args.groups)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.log')
+        game = GameLogic()
+        journal = game.journal = EventJournal(path)
+        for name in groups:
+            game.register_group(name)
+
+        start = time.perf_counter()
+        games = 0
+        # 游戏逻辑会打印每局的重置信息，基准测试中不输出
+        with contextlib.redirect_stdout(io.StringIO()):
+            while game.version < args.events:
+                play_game(game, groups)
+                games += 1
+        record_seconds = time.perf_counter() - start
+        journal.close()
+
+        events = len(read_journal(path))
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"games={games} events={events} file={size_mb:.1f}MB "
+              f"record={record_seconds:.2f}s ({record_seconds / events * 1e6:.1f}us/event, 含游戏逻辑)")
+
+        restored = GameLogic()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            replayed = replay_journal(restored, path)
+        replay_seconds = time.perf_counter() - start
+        print(f"replay: events={replayed} time={replay_seconds:.2f}s "
+              f"({replayed / replay_seconds:.0f} events/s)")
+        assert restored.get_game_state() == game.get_game_state(), "重放后的状态与原状态不一致"
+        print("replayed state matches original")
+
+
+if __name__ == '__main__':
+    main()
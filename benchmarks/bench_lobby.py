@@ -0,0 +1,80 @@
+"""
+大厅模式容量基准测试
+开启大厅模式后注册数百个组，完整进行一回合：所有组按随机顺序同时提交描述（按发言顺序批量公开）、
+投票、结算，统计各阶段耗时、每次提交公开的描述条数分布，以及与逐个发言相比描述阶段的最长用时
+
+运行方式：python benchmarks/bench_lobby.py [--groups 500]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_logic import GameLogic, GameStatus, DESCRIBE_TIMEOUT, SPEAKER_TIMEOUT  # noqa: E402
+
+
+def timed(label: str, func, results: dict):
+    start = time.perf_counter()
+    func()
+    results[label] = time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='大厅模式容量基准测试')
+    parser.add_argument('--groups', type=int, default=500, help='组数')
+    args = parser.parse_args()
+
+    names = [f'组{i}' for i in range(args.groups)]
+    game = GameLogic()
+    game.set_lobby_mode(True)
+    results = {}
+    batches = []
+
+    def register():
+        for name in names:
+            assert game.register_group(name)
+
+    def ready():
+        game.start_game('卧底词', '平民词', {name: True for name in names})
+        for name in names:
+            game.submit_ready(name)
+        game.start_round()
+
+    def describe():
+        submit_order = list(game.describe_order)
+        random.Random(1).shuffle(submit_order)
+        for name in submit_order:
+            before = len(game.descriptions[game.current_round])
+            game.submit_description(name, '描述')
+            batches.append(len(game.descriptions[game.current_round]) - before)
+        assert game.game_status == GameStatus.VOTING
+
+    def vote():
+        order = list(game.describe_order)
+        for name in order:
+            game.submit_vote(name, order[1] if name == order[0] else order[0])
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        timed('register', register, results)
+        timed('ready+start_round', ready, results)
+        timed('describe', describe, results)
+        timed('vote', vote, results)
+        timed('process_result', game.process_voting_result, results)
+
+    reveals = [b for b in batches if b]
+    print(f"groups={args.groups} lobby_mode=on")
+    for label, seconds in results.items():
+        print(f"  {label:<18} {seconds * 1000:8.1f}ms")
+    print(f"  reveal batches: {len(reveals)} non-empty of {len(batches)} submissions, "
+          f"largest={max(reveals)} mean={sum(reveals) / len(reveals):.1f}")
+    print(f"  describe phase worst case: sequential {args.groups * SPEAKER_TIMEOUT / 60:.0f}min, "
+          f"lobby {DESCRIBE_TIMEOUT / 60:.0f}min")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+锁竞争基准测试
+模拟多个游戏方高频轮询 /api/status（读）的同时，主持端持续提交投票/描述等写操作，
+对比原来的独占锁 threading.Lock 与房间读写锁 RWLock 下写操作的等待时间和读吞吐
+
+运行方式：python benchmarks/bench_lock_contention.py [--readers 10] [--seconds 3] [--io-ms 0]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_logic import GameLogic  # noqa: E402
+from backend.services.rwlock import RWLock  # noqa: E402
+
+
+def build_game(num_groups: int) -> GameLogic:
+    """构建一个处于投票阶段、已有若干轮描述的游戏"""
+    game = GameLogic()
+    names = [f"组{i + 1}" for i in range(num_groups)]
+    for name in names:
+        game.register_group(name)
+    game.start_game("卧底词", "平民词", {name: True for name in names})
+    game.start_round()
+    while game.get_current_speaker():
+        game.submit_description(game.get_current_speaker(), "一段用于基准测试的描述" * 3)
+    return game
+
+
+def run(lock, exclusive_reads: bool, readers: int, seconds: float, num_groups: int, io_delay: float):
+    """运行一轮基准，返回 (写等待时间列表, 读次数)"""
+    game = build_game(num_groups)
+    names = list(game.groups.keys())
+    stop = threading.Event()
+    read_count = [0] * readers
+    write_waits = []
+
+    def read_ctx():
+        return lock if exclusive_reads else lock.read()
+
+    def reader(idx):
+        while not stop.is_set():
+            with read_ctx():
+                status = game.get_public_status()
+                status['online_status'] = game.get_online_status()
+                json.dumps(status, ensure_ascii=False)
+            read_count[idx] += 1
+            if io_delay:
+                time.sleep(io_delay)  # 模拟响应写回socket等锁外I/O
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            name = names[i % len(names)]
+            start = time.perf_counter()
+            with lock:
+                write_waits.append(time.perf_counter() - start)
+                game.scores[name] = game.scores.get(name, 0) + 1
+                game.update_activity(name)
+            i += 1
+            time.sleep(0.002)  # 写操作频率约数百次每秒
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads.append(threading.Thread(target=writer))
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return write_waits, sum(read_count)
+
+
+def report(name, waits, reads, seconds):
+    waits_ms = sorted(w * 1000 for w in waits)
+    p99 = waits_ms[int(len(waits_ms) * 0.99) - 1] if waits_ms else 0
+    print(f"{name:<28} 写次数={len(waits_ms):>6}  写等待 p50={statistics.median(waits_ms):7.3f}ms "
+          f"p99={p99:7.3f}ms max={max(waits_ms):7.3f}ms  读吞吐={reads / seconds:9.0f}/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='房间锁竞争基准测试')
+    parser.add_argument('--readers', type=int, default=10, help='并发轮询线程数')
+    parser.add_argument('--seconds', type=float, default=3.0, help='每种锁的运行时长')
+    parser.add_argument('--groups', type=int, default=10, help='房间内的组数')
+    parser.add_argument('--io-ms', type=float, default=0.0, help='每次读请求在锁外的I/O耗时（毫秒），0表示持续满负荷轮询')
+    args = parser.parse_args()
+
+    print(f"并发读线程={args.readers}，组数={args.groups}，每项运行{args.seconds}秒")
+    waits, reads = run(threading.Lock(), True, args.readers, args.seconds, args.groups, args.io_ms / 1000)
+    report("threading.Lock（独占）", waits, reads, args.seconds)
+    waits, reads = run(RWLock(), False, args.readers, args.seconds, args.groups, args.io_ms / 1000)
+    report("RWLock（读共享/写优先）", waits, reads, args.seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+房间锁持有时间基准测试
+模拟每次 Socket.IO 写出都要耗费若干毫秒的慢连接，通过HTTP接口完成若干局投票（最后一票触发结算、
+推送 vote_result 并自动开始下一回合），同时合并线程照常推送状态，统计房间写锁的持有时间、
+写操作等待写锁的时间和读锁的持有时间
+
+消息在持有房间锁时发出，慢连接的写出时间就会直接计入锁的持有时间；
+改为释放锁之后再发出（发件箱）后，锁的持有时间与连接快慢无关
+
+运行方式：python benchmarks/bench_lock_hold.py [--groups 10] [--games 20] [--emit-ms 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import app, socketio, rooms  # noqa: E402
+from backend.config import BROADCAST_TICK  # noqa: E402
+from backend.services.rwlock import RWLock  # noqa: E402
+
+
+class TimedRWLock(RWLock):
+    """记录每次持有写锁、读锁的时长以及等待写锁的时长"""
+
+    def __init__(self):
+        super().__init__()
+        self.write_holds = []
+        self.write_waits = []
+        self.read_holds = []
+        self._write_start = 0.0
+        self._read_starts = {}
+
+    def acquire_write(self):
+        start = time.perf_counter()
+        super().acquire_write()
+        self._write_start = time.perf_counter()
+        self.write_waits.append(self._write_start - start)
+
+    def release_write(self):
+        self.write_holds.append(time.perf_counter() - self._write_start)
+        super().release_write()
+
+    def acquire_read(self):
+        super().acquire_read()
+        self._read_starts[threading.get_ident()] = time.perf_counter()
+
+    def release_read(self):
+        self.read_holds.append(time.perf_counter() - self._read_starts.pop(threading.get_ident()))
+        super().release_read()
+
+
+def play_game(client, room, names):
+    """在房间里准备好投票阶段，然后通过HTTP接口逐个投票"""
+    game = room.game
+    with room.lock:
+        for name in names:
+            game.register_group(name)
+        game.start_game('卧底词', '平民词', {name: True for name in names})
+        game.start_round()
+        while game.get_current_speaker():
+            game.submit_description(game.get_current_speaker(), '一段用于基准测试的描述')
+    prefix = f'/api/rooms/{room.room_id}'
+    for i, name in enumerate(names):
+        target = names[1] if i == 0 else names[0]
+        response = client.post(f'{prefix}/vote', json={'voter_group': name, 'target_group': target})
+        assert response.status_code == 200, response.get_json()
+    assert game.game_status.value != 'voting'
+
+
+def report(label, samples):
+    values = sorted(s * 1000 for s in samples)
+    p99 = values[max(int(len(values) * 0.99) - 1, 0)]
+    print(f"{label:<10} 次数={len(values):>6}  p50={statistics.median(values):8.3f}ms "
+          f"p99={p99:8.3f}ms  max={values[-1]:8.3f}ms  合计={sum(values):9.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='房间锁持有时间基准测试')
+    parser.add_argument('--groups', type=int, default=10, help='每局的组数')
+    parser.add_argument('--games', type=int, default=20, help='局数')
+    parser.add_argument('--emit-ms', type=float, default=5.0, help='每次 Socket.IO 写出的耗时（毫秒）')
+    args = parser.parse_args()
+
+    emit = socketio.emit
+    emit_delay = args.emit_ms / 1000
+
+    def slow_emit(*a, **kw):
+        time.sleep(emit_delay)  # 模拟慢连接的写出
+        return emit(*a, **kw)
+
+    socketio.emit = slow_emit
+    names = [f'组{i + 1}' for i in range(args.groups)]
+    locks = []
+    start = time.perf_counter()
+    with app.test_client() as client:
+        for g in range(args.games):
+            room = rooms.create(f'bench-lock-{g}')
+            room.lock = TimedRWLock()
+            locks.append(room.lock)
+            play_game(client, room, names)
+            time.sleep(BROADCAST_TICK * 3)  # 等合并线程推送完这一局的状态
+            with room.lock:
+                room.timer_generation += 1
+            rooms.remove(room.room_id)
+    elapsed = time.perf_counter() - start
+    socketio.emit = emit
+
+    print(f"组数={args.groups}，局数={args.games}，每次写出耗时={args.emit_ms}ms，总耗时={elapsed:.2f}s")
+    report('写锁持有', [s for lock in locks for s in lock.write_holds])
+    report('写锁等待', [s for lock in locks for s in lock.write_waits])
+    report('读锁持有', [s for lock in locks for s in lock.read_holds])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+快照基准测试
+在一个同时开启事件日志和快照的房间里连续进行数百局游戏（不重置，分数和卧底次数持续累计），
+统计写快照时持有房间锁的时间（浅复制）、写快照总耗时、快照大小和写入时的内存峰值，
+并比较冷启动时"读快照"与"从头重放事件日志"两种恢复方式的耗时和内存峰值
+
+运行方式：python benchmarks/bench_snapshot_restore.py [--games 500] [--groups 10]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_logic import GameLogic, GameStatus  # noqa: E402
+from backend.services.journal import EventJournal, replay_journal  # noqa: E402
+from backend.services.rooms import Room  # noqa: E402
+from backend.services.snapshot import write_snapshot, load_snapshot  # noqa: E402
+
+
+def play_game(game: GameLogic, groups):
+    """进行一局完整的游戏（每轮所有人描述后投给第一个发言者，直到游戏结束）"""
+    game.start_game('卧底词', '平民词', {name: True for name in groups})
+    for name in groups:
+        game.submit_ready(name)
+    while game.game_status != GameStatus.GAME_END:
+        game.start_round()
+        order = list(game.describe_order)
+        for name in order:
+            game.submit_description(name, f'{name}的描述')
+        for name in order:
+            game.submit_vote(name, order[1] if name == order[0] else order[0])
+        game.process_voting_result()
+
+
+def measure(func):
+    """执行 func，返回 (结果, 耗时秒, 内存峰值MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='快照基准测试')
+    parser.add_argument('--games', type=int, default=500, help='连续进行的游戏局数')
+    parser.add_argument('--groups', type=int, default=10, help='组数')
+    args = parser.parse_args()
+
+    groups = [f'组{i}' for i in range(args.groups)]
+    with tempfile.TemporaryDirectory() as directory:
+        journal_file = os.path.join(directory, 'bench.log')
+        snapshot_file = os.path.join(directory, 'bench.snap')
+        room = Room('bench')
+        game = room.game
+        game.journal = EventJournal(journal_file)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for name in groups:
+                game.register_group(name)
+            for _ in range(args.games):
+                play_game(game, groups)
+        game.journal.flush()
+        journal_mb = os.path.getsize(journal_file) / 1024 / 1024
+        print(f"games={args.games} groups={args.groups} version={game.version} journal={journal_mb:.1f}MB")
+
+        # 写快照时持有锁的部分只有浅复制
+        copies = []
+        for _ in range(100):
+            start = time.perf_counter()
+            with room.lock.read():
+                game.snapshot_state()
+            copies.append(time.perf_counter() - start)
+        copies.sort()
+        print(f"lock hold (snapshot_state): p50={copies[50] * 1e6:.0f}us max={copies[-1] * 1e6:.0f}us")
+
+        # 先写快照但不压缩日志，以便下面比较两种恢复方式
+        game.journal, journal = None, game.journal
+        _, write_seconds, write_peak = measure(lambda: write_snapshot(room, snapshot_file))
+        snapshot_kb = os.path.getsize(snapshot_file) / 1024
+        print(f"snapshot write: {write_seconds * 1000:.1f}ms size={snapshot_kb:.1f}KB peak={write_peak:.2f}MB")
+
+        def restore_from_snapshot():
+            restored = GameLogic()
+            restored.restore_state(load_snapshot(snapshot_file)[1])
+            return restored
+
+        restored, seconds, peak = measure(restore_from_snapshot)
+        assert restored.get_game_state() == game.get_game_state(), "快照恢复的状态与原状态不一致"
+        print(f"restore from snapshot: {seconds * 1000:.1f}ms peak={peak:.2f}MB")
+
+        def restore_from_journal():
+            restored = GameLogic()
+            replay_journal(restored, journal_file)
+            return restored
+
+        restored, seconds, peak = measure(restore_from_journal)
+        assert restored.get_game_state() == game.get_game_state(), "日志重放的状态与原状态不一致"
+        print(f"restore by full journal replay: {seconds * 1000:.1f}ms peak={peak:.2f}MB")
+
+        journal.compact(game.version)
+        print(f"journal after compaction: {os.path.getsize(journal_file)} bytes")
+
+
+if __name__ == '__main__':
+    main()
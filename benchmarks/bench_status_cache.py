@@ -0,0 +1,78 @@
+"""
+公开状态缓存基准测试
+对比每次请求都重建公开状态并 jsonify（原来的做法）与按版本缓存JSON、只重新计算倒计时的做法，
+统计单次 /api/status 响应构建的耗时
+
+运行方式：python benchmarks/bench_status_cache.py [--groups 10] [--rounds 3] [--iterations 20000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import app  # noqa: E402
+from backend.services.rooms import Room  # noqa: E402
+from backend.routes.public import public_status_json  # noqa: E402
+from backend.utils import make_response, make_cached_response, get_websocket_status  # noqa: E402
+
+
+def build_room(num_groups: int, rounds: int) -> Room:
+    """构建一个已经进行了若干回合描述、处于投票阶段的房间"""
+    room = Room('bench')
+    game = room.game
+    names = [f"组{i + 1}" for i in range(num_groups)]
+    for name in names:
+        game.register_group(name)
+    game.start_game("卧底词", "平民词", {name: True for name in names})
+    for _ in range(rounds):
+        game.start_round()
+        while game.get_current_speaker():
+            game.submit_description(game.get_current_speaker(), "一段用于基准测试的描述" * 3)
+    return room
+
+
+def full_rebuild(room):
+    """原来的做法：每次重建整个公开状态并 jsonify"""
+    game = room.game
+    game._public_status_cache = None
+    status = game.get_public_status()
+    status['online_status'] = game.get_online_status(get_websocket_status(room))
+    return make_response(status)
+
+
+def cached(room):
+    """缓存JSON，只重新计算倒计时和在线状态"""
+    game = room.game
+    extra = game.get_countdown()
+    extra['online_status'] = game.get_online_status(get_websocket_status(room))
+    return make_cached_response(public_status_json(room), extra)
+
+
+def measure(func, room, iterations: int) -> float:
+    """返回单次调用的平均耗时（微秒）"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(room)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='公开状态缓存基准测试')
+    parser.add_argument('--groups', type=int, default=10, help='组数')
+    parser.add_argument('--rounds', type=int, default=3, help='已进行的回合数')
+    parser.add_argument('--iterations', type=int, default=20000, help='每种做法的调用次数')
+    args = parser.parse_args()
+
+    room = build_room(args.groups, args.rounds)
+    with app.test_request_context():
+        baseline = measure(full_rebuild, room, args.iterations)
+        fast = measure(cached, room, args.iterations)
+    print(f"groups={args.groups} rounds={args.rounds}")
+    print(f"full rebuild + jsonify: {baseline:.1f} us/request")
+    print(f"version-keyed cache:    {fast:.1f} us/request ({baseline / fast:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+倒计时调度基准测试
+创建大量处于描述阶段的房间，让它们的发言截止时间分散在几秒内，
+统计共用调度线程处理超时的延迟（实际处理时间 - 截止时间）和进程线程数
+
+运行方式：python benchmarks/bench_timer_scheduler.py [--rooms 2000] [--spread 3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import socketio  # noqa: E402,F401  注入各服务模块的 socketio
+from backend.services import timer  # noqa: E402
+from backend.services.rooms import Room  # noqa: E402
+
+lateness = []
+lateness_lock = threading.Lock()
+done = threading.Event()
+
+
+def build_room(index: int, deadline: datetime) -> Room:
+    """构建一个处于描述阶段、发言截止时间为 deadline 的房间"""
+    room = Room(f"bench-{index}")
+    game = room.game
+    for name in ['组1', '组2', '组3']:
+        game.register_group(name)
+    game.start_game('卧底词', '平民词', {name: True for name in game.groups})
+    game.start_round()
+    game.speaker_deadline = deadline
+    return room
+
+
+def main():
+    parser = argparse.ArgumentParser(description='倒计时调度基准测试')
+    parser.add_argument('--rooms', type=int, default=2000, help='房间数')
+    parser.add_argument('--spread', type=float, default=3.0, help='截止时间分布区间（秒）')
+    args = parser.parse_args()
+
+    # 包一层 skip_current_speaker，记录每个房间实际被跳过的时刻
+    original_process = timer._process_timeouts
+
+    def recording_process(room, now):
+        deadline = room.game.speaker_deadline
+        handled = original_process(room, now)
+        if handled and deadline is not None:
+            with lateness_lock:
+                lateness.append((datetime.now() - deadline).total_seconds() * 1000)
+                if len(lateness) >= args.rooms:
+                    done.set()
+        return handled
+
+    timer._process_timeouts = recording_process
+    # 只测超时处理，倒计时推送不在本基准范围内
+    timer._on_tick = lambda room, generation, when: None
+
+    base = datetime.now() + timedelta(seconds=1)
+    rooms = [build_room(i, base + timedelta(seconds=args.spread * i / args.rooms)) for i in range(args.rooms)]
+    threads_before = threading.active_count()
+    for room in rooms:
+        with room.lock:
+            timer.start_timer_broadcast(room)
+
+    done.wait(args.spread + 10)
+    lateness.sort()
+    print(f"rooms={args.rooms} handled={len(lateness)} threads_before={threads_before} "
+          f"threads_after={threading.active_count()}")
+    if lateness:
+        print(f"lateness ms: p50={statistics.median(lateness):.2f} "
+              f"p99={lateness[int(len(lateness) * 0.99) - 1]:.2f} max={lateness[-1]:.2f}")
+
+
+if __name__ == '__main__':
+    main()
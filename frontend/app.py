@@ -37,6 +37,17 @@ def api_public_status():
     return jsonify(data)
 
 
+@frontend_app.route('/api/host/ticket', methods=['POST'])
+def api_host_ticket():
+    """代理后端API：换取主持方连接凭证（主持方令牌只留在服务器端，不写入页面）"""
+    response = requests.post(
+        f"{BACKEND_URL}/api/host/ticket",
+        headers=ADMIN_HEADERS,
+        timeout=2
+    )
+    return jsonify(response.json()), response.status_code
+
+
 @frontend_app.route('/api/game/start', methods=['POST'])
 def api_start_game():
     """代理后端API"""
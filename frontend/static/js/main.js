@@ -1,11 +1,21 @@
-// WebSocket 连接
-const socket = io('http://127.0.0.1:5000');
+// WebSocket 连接（patch=1：status / game_state 以增量补丁推送；携带主持方连接凭证才能收到 game_state）
+// 凭证由前端服务器代为换取且有效期很短，每次（重新）连接前都重新获取
+const socket = io('http://127.0.0.1:5000', {
+    query: { patch: 1 },
+    auth: function(cb) {
+        fetch('/api/host/ticket', { method: 'POST' })
+            .then(response => response.json())
+            .then(result => cb({ host_ticket: (result.data && result.data.ticket) || '' }))
+            .catch(() => cb({}));
+    }
+});
 let gameData = {};
 let allVoteResults = {}; // 存储所有回合的投票结果，键为 "gameNumber_round" 或 "round"
 let allDescriptions = {}; // 存储所有回合的描述记录，键为 "gameNumber_round" 或 "round"
 let gameRoundMapping = {}; // 映射：round -> gameNumber（用于单轮游戏或兼容性）
 let descriptionRoundMapping = {}; // 映射：round -> gameNumber（用于描述记录）
 let voteRoundMapping = {}; // 映射：round -> gameNumber（用于投票记录）
+let liveVoteTally = null; // 本回合的实时计票（vote_tally_update，服务端开启 LIVE_VOTE_TALLY 时推送）
 
 // localStorage 键名
 const STORAGE_KEYS = {
@@ -109,25 +119,118 @@ socket.on('connect', function() {
     socket.emit('request_timer');
 });
 
+// 增量模式下本地维护的状态副本（补丁的应用基准）
+let syncedStatus = null;
+let syncedGameState = null;
+
+// 把补丁应用到本地状态副本（格式见 backend/services/state_diff.py）
+function applyStatePatch(state, patch) {
+    (patch.unset || []).forEach(function(path) {
+        let target = state;
+        for (let i = 0; i < path.length - 1 && target; i++) {
+            target = target[path[i]];
+        }
+        if (target) {
+            delete target[path[path.length - 1]];
+        }
+    });
+    (patch.set || []).forEach(function(op) {
+        const path = op[0];
+        const value = op[1];
+        let target = state;
+        for (let i = 0; i < path.length - 1; i++) {
+            if (typeof target[path[i]] !== 'object' || target[path[i]] === null) {
+                target[path[i]] = {};
+            }
+            target = target[path[i]];
+        }
+        target[path[path.length - 1]] = value;
+    });
+    state.version = patch.version;
+    return state;
+}
+
 // 接收状态更新推送
 socket.on('status_update', function(data) {
+    syncedStatus = data;
     updateRealTimeInfo(data);
-    updateTimers(data);
+    syncCountdown(data);
 });
 
-// 接收倒计时更新推送
+// 接收状态补丁推送：版本不连续时请求完整状态重新同步
+socket.on('status_patch', function(patch) {
+    if (!syncedStatus || syncedStatus.version !== patch.base_version) {
+        socket.emit('request_status');
+        return;
+    }
+    applyStatePatch(syncedStatus, patch);
+    updateRealTimeInfo(syncedStatus);
+    syncCountdown(syncedStatus);
+});
+
+// 接收倒计时更新推送（连接时请求 request_timer 的回复；每秒推送需要连接时携带 timer=1）
 socket.on('timer_update', function(data) {
-    updateTimers(data);
+    syncCountdown(data);
     updateGameStateDisplay(data);
 });
 
+// 本地倒计时：根据状态中的绝对截止时间计算剩余时间，不依赖服务器每秒推送
+let countdown = null;
+
+// 记录截止时间并用服务器时间校准本地时钟
+function syncCountdown(data) {
+    countdown = {
+        status: data.status,
+        phaseDeadlineMs: data.phase_deadline_ms,
+        speakerDeadlineMs: data.speaker_deadline_ms,
+        // 服务器时间 - 本地时间
+        offsetMs: typeof data.server_time_ms === 'number' ? data.server_time_ms - Date.now() : 0
+    };
+    renderCountdown();
+}
+
+// 截止时间对应的剩余秒数（与服务器的 remaining_seconds 计算方式一致）
+function secondsUntil(deadlineMs, nowMs) {
+    if (typeof deadlineMs !== 'number') {
+        return undefined;
+    }
+    return Math.max(0, Math.floor((deadlineMs - nowMs) / 1000));
+}
+
+// 按校准后的时间刷新倒计时显示
+function renderCountdown() {
+    if (!countdown) {
+        return;
+    }
+    const nowMs = Date.now() + countdown.offsetMs;
+    updateTimers({
+        status: countdown.status,
+        remaining_seconds: secondsUntil(countdown.phaseDeadlineMs, nowMs),
+        speaker_remaining_seconds: secondsUntil(countdown.speakerDeadlineMs, nowMs)
+    });
+}
+
+setInterval(renderCountdown, 1000);
+
 // 接收完整游戏状态推送
 socket.on('game_state_update', function(data) {
     console.log('收到游戏状态推送:', data);
+    syncedGameState = data;
     gameData = data;
     updateAllDisplay();
 });
 
+// 接收游戏状态补丁推送：版本不连续时请求完整状态重新同步
+socket.on('game_state_patch', function(patch) {
+    if (!syncedGameState || syncedGameState.version !== patch.base_version) {
+        socket.emit('request_game_state');
+        return;
+    }
+    applyStatePatch(syncedGameState, patch);
+    gameData = syncedGameState;
+    updateAllDisplay();
+});
+
 // 接收描述列表更新推送（参考投票记录的机制）
 socket.on('descriptions_update', function(data) {
     console.log('收到描述列表更新推送:', data);
@@ -159,10 +262,55 @@ socket.on('descriptions_update', function(data) {
     }
 });
 
+// 接收大厅模式新公开的一批描述：追加到本回合的描述记录
+socket.on('descriptions_reveal', function(data) {
+    console.log('收到描述公开推送:', data);
+
+    if (data.round) {
+        // 与 descriptions_update 使用相同的组合键：gameNumber_round
+        const gameNumber = totalRounds > 0 ? (currentRoundIndex + 1) : null;
+        const descKey = gameNumber ? `${gameNumber}_${data.round}` : data.round.toString();
+
+        // offset 为 0 表示从头公开（新回合），否则接在已收到的描述后面
+        const revealed = data.offset === 0 ? [] : (allDescriptions[descKey] || []);
+        let descriptions = revealed.concat(data.descriptions || []);
+        if (revealed.length !== data.offset) {
+            // 漏收了某一批：改用完整游戏状态中的描述列表
+            const stateDescriptions = gameData.descriptions && gameData.descriptions[data.round];
+            if (stateDescriptions && stateDescriptions.length >= data.total) {
+                descriptions = stateDescriptions.slice(0, data.total);
+            }
+        }
+
+        if (descriptions.length > 0) {
+            allDescriptions[descKey] = descriptions;
+
+            // 保存回合号到轮次的映射（用于兼容性和显示）
+            if (gameNumber) {
+                descriptionRoundMapping[data.round] = gameNumber;
+            }
+
+            // 保存到 localStorage
+            saveToLocalStorage();
+
+            // 更新显示
+            updateDescriptions();
+        }
+    }
+});
+
+// 接收实时计票推送（只推送给主持方连接）
+socket.on('vote_tally_update', function(data) {
+    liveVoteTally = data;
+    updateVoteRecords();
+});
+
 // 接收投票结果推送
 socket.on('vote_result', function(data) {
     console.log('收到投票结果推送:', data);
     showAlert('warning', '投票结果已生成');
+    // 本回合已结算，实时计票不再显示
+    liveVoteTally = null;
 
     // 存储投票结果，添加轮次信息
     if (data.round) {
@@ -605,11 +753,42 @@ function updateDescriptions() {
     container.innerHTML = html || '<div class="description-item"><div class="desc-header">暂无描述记录</div></div>';
 }
 
+// 本回合投票中的实时计票：各组得票和领先优势
+function renderLiveVoteTally() {
+    const tally = liveVoteTally;
+    if (!tally || gameData.status !== 'voting' || tally.round !== gameData.current_round) {
+        return '';
+    }
+
+    let html = `
+        <div class="round-vote-section">
+            <div class="round-title">第 ${tally.round} 回合实时计票（已投 ${tally.total_votes} / ${tally.active_count}）</div>
+    `;
+    if (tally.leaders.length === 1) {
+        html += `<div style="margin-bottom: 10px;"><strong>领先:</strong> ${tally.leaders[0]}（领先 ${tally.lead_margin} 票）</div>`;
+    } else if (tally.leaders.length > 1) {
+        html += `<div style="margin-bottom: 10px;"><strong>并列领先:</strong> ${tally.leaders.join('、')}（各 ${tally.max_votes} 票）</div>`;
+    }
+    Object.entries(tally.vote_count)
+        .sort((a, b) => b[1] - a[1])
+        .forEach(([group, count]) => {
+            html += `
+                <div class="vote-count-item">
+                    <div>${group}</div>
+                    <div style="color: var(--warning-color); font-weight: bold;">${count} 票</div>
+                </div>
+            `;
+        });
+    html += `</div>`;
+    return html;
+}
+
 function updateVoteRecords() {
     const container = document.getElementById('votes-content');
+    const liveHtml = renderLiveVoteTally();
     // 如果 allVoteResults 为空，显示暂无记录
     if (Object.keys(allVoteResults).length === 0) {
-        container.innerHTML = `
+        container.innerHTML = liveHtml || `
             <div class="round-vote-section">
                 <div class="round-title">暂无投票记录</div>
             </div>
@@ -710,7 +889,7 @@ function updateVoteRecords() {
         html += `</div>`;
     });
 
-    container.innerHTML = html;
+    container.innerHTML = liveHtml + html;
 }
 
 function updateGameResults() {
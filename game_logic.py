@@ -2,16 +2,23 @@
 游戏逻辑模块
 负责游戏状态管理、投票判定、得分计算等核心逻辑
 """
+import functools
 import random
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from enum import Enum
+from report_store import ReportStore
+from group_model import GroupRecord, GroupSet, ObservedGroupSet
+from vote_tally import VoteTally
 
 # 配置常量
 MAX_GROUPS = 10  # 最大组数
-DESCRIBE_TIMEOUT = 180  # 描述阶段总超时时间（秒）
+LOBBY_MAX_GROUPS = 500  # 大厅模式下的最大组数
+DESCRIBE_TIMEOUT = 180  # 描述阶段总超时时间（秒），大厅模式下即整个描述窗口
 VOTE_TIMEOUT = 60  # 投票阶段超时时间（秒）
 SPEAKER_TIMEOUT = 60  # 每个人发言超时时间（秒）
+REPORT_RETENTION = 200  # 内存中保留的异常报告条数（更早的转存到对局归档）
+RECENT_REPORTS_IN_STATE = 5  # get_game_state 中附带的最近报告条数
 
 
 class GameStatus(Enum):
@@ -25,23 +32,45 @@ class GameStatus(Enum):
     GAME_END = "game_end"  # 游戏结束
 
 
+def journaled(method):
+    """
+    标记会改变游戏状态的方法
+    最外层调用期间固定随机数种子和当前时间，调用改变了状态（版本号变化）时交给 self.journal 记录；
+    重放（replay_event）时使用记录下的种子和时间，得到与原调用完全相同的结果。
+    方法内部嵌套调用的其他 journaled 方法不单独记录
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._journal_depth:
+            return method(self, *args, **kwargs)
+        return self._run_journaled(method, args, kwargs, random.getrandbits(32), datetime.now(), True)
+
+    wrapper.journaled = True
+    return wrapper
+
+
 class GameLogic:
     """游戏逻辑核心类"""
 
-    def __init__(self):
-        self.groups: Dict[str, Dict] = {}  # 组名 -> 组信息
+    def __init__(self, report_retention: int = REPORT_RETENTION, early_vote_close: bool = False):
+        self.groups: Dict[str, GroupRecord] = {}  # 组名 -> 组信息
         self.game_status = GameStatus.WAITING
         self.undercover_group: Optional[str] = None  # 卧底组名
         self.undercover_word: str = ""  # 卧底词
         self.civilian_word: str = ""  # 平民词
         self.current_round = 0  # 当前回合数
-        self.describe_order: List[str] = []  # 描述顺序
-        self.current_speaker_index: int = 0  # 当前发言者索引
+        self.describe_order = GroupSet()  # 描述顺序（in 判断 O(1)）；大厅模式下是描述的公开顺序
+        self.current_speaker_index: int = 0  # 当前发言者索引；大厅模式下是已公开的描述数
+        # 大厅模式：所有活跃组在同一个描述窗口内同时提交，描述按 describe_order 依次公开
+        self.lobby_mode = False
+        self.pending_descriptions: Dict[str, Dict] = {}  # 已提交、还没轮到公开的描述（大厅模式或提前排队）
+        self.described_groups: set = set()  # 本回合已提交描述的组（含未公开的）
         self.descriptions: Dict[int, List[Dict]] = {}  # 每回合的描述 {round: [{group, desc, time}]}
         self.votes: Dict[int, Dict[str, str]] = {}  # 每回合的投票 {round: {voter: target}}
-        self.eliminated_groups: List[str] = []  # 已淘汰的组
+        # 已淘汰的组（按淘汰顺序，in 判断 O(1)）；直接修改它（append、remove、clear 等）时活跃组索引同步更新
+        self.eliminated_groups = self._new_eliminated_groups()
         self.scores: Dict[str, int] = {}  # 得分 {group: score}
-        self.reports: List[Dict] = []  # 异常上报记录（由主持端自动检测生成）
+        self.reports = ReportStore(report_retention)  # 异常上报记录（由主持端自动检测生成）
         self.last_vote_result: Optional[Dict] = None  # 最近一次投票结果
         self.phase_deadline: Optional[datetime] = None  # 当前阶段截止时间
         self.speaker_deadline: Optional[datetime] = None  # 当前发言者截止时间
@@ -50,9 +79,212 @@ class GameLogic:
         self.undercover_history: Dict[str, int] = {}  # 每个组当卧底的次数
         self.total_games_played = 0  # 总游戏次数
         self.last_activity: Dict[str, datetime] = {}  # 组名 -> 最后活跃时间（用于检测在线状态）
-        self.ready_groups: List[str] = []  # 已准备好开始回合的组（每回合开始前清空）
+        self.ready_groups = GroupSet()  # 已准备好开始回合的组（每回合开始前清空）
+        # 活跃组索引（由 eliminated_groups / groups / describe_order 派生，在淘汰和阶段切换时增量维护）：
+        # 未淘汰的组（按注册顺序的有序集合）和本回合发言列表中未淘汰的组数，
+        # "是否都已投票/准备/描述"、"游戏是否结束" 的判断因此都是 O(1)
+        self.active_index: Dict[str, None] = {}
+        self.round_active_count = 0
+        # 本回合的增量计票（随 votes[current_round] 更新）和最近一次结算的计票（对应 last_vote_result）
+        self.vote_tally = VoteTally()
+        self.last_vote_tally = VoteTally()
+        # 提前结束投票：领先者的优势已无法被剩余的票追平时，剩余未投票的组按弃权处理，立即结算
+        self.early_vote_close = early_vote_close
         self.vote_start_times: Dict[str, datetime] = {}  # 组名 -> 投票开始时间（用于检测投票超时）
+        # 状态版本号：每次游戏状态变更都会递增（活跃时间更新除外），用于增量推送和缓存
+        self.version = 0
+        # 公开状态中与时间无关部分的缓存：(版本号, 状态字典)
+        self._public_status_cache: Optional[Tuple[int, Dict]] = None
+        # 事件日志（见 journaled），为None时不记录
+        self.journal = None
+        # 对局归档（backend.services.archive.RoomArchive），为None时不归档；
+        # 回合或游戏结束时写入归档，descriptions / votes 只保留进行中的这一局
+        self.archive = None
+        self.game_id: Optional[str] = None  # 当前这局游戏的ID（start_game 时生成）
+        self.game_started_at: Optional[str] = None
+        self.rng = random.Random()  # 游戏内的随机数（选卧底、发言顺序），重放时按记录的种子重新设定
+        self._journal_depth = 0
+        self._frozen_now: Optional[datetime] = None  # journaled 方法执行期间固定的当前时间
+
+    def _bump_version(self):
+        """标记游戏状态已变更"""
+        self.version += 1
+
+    def _not_eliminated(self, names) -> List[str]:
+        """names 中未被淘汰的组（保持原顺序）"""
+        eliminated = self.eliminated_groups.members
+        return [g for g in names if g not in eliminated]
+
+    def _rebuild_active_index(self):
+        """按淘汰列表重建活跃组索引（开始/重置游戏、恢复快照时调用）"""
+        self.active_index = dict.fromkeys(self._not_eliminated(self.groups))
+        self.round_active_count = len(self._not_eliminated(self.describe_order))
+
+    def _new_eliminated_groups(self, names=()) -> ObservedGroupSet:
+        """新的淘汰组列表：加入成员时增量更新活跃组索引，其他修改后整体重建"""
+        return ObservedGroupSet(names, self._on_eliminated, self._rebuild_active_index)
+
+    def _on_eliminated(self, name: str):
+        """组被加入淘汰列表：从活跃组索引中移除"""
+        self.active_index.pop(name, None)
+        if name in self.describe_order:
+            self.round_active_count -= 1
+
+    def _eliminate(self, names):
+        """淘汰组并标记组信息（已淘汰的组忽略），活跃组索引由淘汰列表同步更新"""
+        for name in names:
+            if name in self.eliminated_groups:
+                continue
+            self.eliminated_groups.append(name)
+            if name in self.groups:
+                self.groups[name]["eliminated"] = True
+
+    def round_active_groups(self) -> List[str]:
+        """本回合发言列表中未被淘汰的组（保持发言顺序）"""
+        return [g for g in self.describe_order if g in self.active_index]
+
+    def remaining_civilian_count(self) -> int:
+        """未被淘汰的平民组数"""
+        return len(self.active_index) - (1 if self.undercover_group in self.active_index else 0)
+
+    def all_voted(self) -> bool:
+        """本回合的活跃组是否都已投票"""
+        return len(self.votes.get(self.current_round, {})) >= self.round_active_count
+
+    def _close_voting_if_decided(self) -> bool:
+        """
+        开启提前结束投票时，若唯一领先者领先第二名的票数超过剩余未投的票数（结果已无法改变），
+        剩余未投票的组按弃权（投给自己，与超时跳过相同）处理
+        :return: 是否提前结束了投票
+        """
+        if not self.early_vote_close or self.all_voted():
+            return False
+        round_votes = self.votes[self.current_round]
+        remaining = self.round_active_count - len(round_votes)
+        if self.vote_tally.lead_margin() <= remaining:
+            return False
+        for group_name in self.round_active_groups():
+            if group_name not in round_votes:
+                round_votes[group_name] = group_name
+                self.vote_tally.add(group_name, group_name)
+                self.vote_start_times.pop(group_name, None)
+        return True
+
+    def _now(self) -> datetime:
+        """当前时间（journaled 方法执行期间固定为调用开始的时间）"""
+        return self._frozen_now or datetime.now()
+
+    def _run_journaled(self, method, args, kwargs, seed: int, ts: datetime, record: bool):
+        """以固定的随机数种子和时间执行状态变更方法"""
+        version_before = self.version
+        status_before = self.game_status
+        self._journal_depth += 1
+        self._frozen_now = ts
+        self.rng.seed(seed)
+        try:
+            result = method(self, *args, **kwargs)
+            # 回合或游戏刚刚结束：归档（重放时同样归档，主键相同的行会被覆盖，不会重复）
+            if (self.archive is not None and self.game_status != status_before
+                    and self.game_status in (GameStatus.ROUND_END, GameStatus.GAME_END)):
+                self._archive_finished()
+        finally:
+            self._journal_depth -= 1
+            self._frozen_now = None
+        if record and self.journal is not None and self.version != version_before:
+            self.journal.record(method.__name__, args, kwargs, seed, ts, self.version)
+        return result
+
+    def replay_event(self, name: str, args, kwargs, seed: int, ts: datetime):
+        """重放一条事件日志（不会再次记录）"""
+        method = getattr(type(self), name, None)
+        if not getattr(method, 'journaled', False):
+            raise ValueError(f"未知的事件: {name}")
+        return self._run_journaled(method.__wrapped__, args, kwargs or {}, seed, ts, False)
+
+    def _archive_finished(self):
+        """归档刚结束的回合，游戏结束时同时归档整局游戏"""
+        now = self._now().isoformat()
+        round_num = self.current_round
+        self.archive.archive_round(self.game_id, round_num, list(self.descriptions.get(round_num, [])),
+                                   dict(self.votes.get(round_num, {})), self.last_vote_result, now)
+        if self.game_status != GameStatus.GAME_END:
+            return
+        result = self.last_vote_result or {}
+        self.archive.archive_game(self.game_id, {
+            'started_at': self.game_started_at,
+            'ended_at': now,
+            'undercover_group': self.undercover_group,
+            'undercover_word': self.undercover_word,
+            'civilian_word': self.civilian_word,
+            'winner': result.get('winner'),
+            'rounds': round_num,
+            'roles': {name: info.get('role') for name, info in self.groups.items() if info.get('role')},
+            'scores': dict(self.scores),
+        })
+
+    # 不属于游戏状态、不写入快照的属性
+    # 活跃组索引、计票、已描述的组是派生数据，恢复时按淘汰列表、投票和描述记录重建
+    _SNAPSHOT_EXCLUDED = ('_public_status_cache', 'journal', 'archive', 'rng', '_journal_depth', '_frozen_now',
+                          'active_index', 'round_active_count', 'vote_tally', 'last_vote_tally',
+                          'described_groups')
+    # 值本身会被原地修改的容器：{组名: 组信息}、{回合: 描述列表}、{回合: {投票组: 目标}}
+    _SNAPSHOT_NESTED = ('groups', 'descriptions', 'votes')
 
+    def snapshot_state(self) -> Dict:
+        """
+        复制当前游戏状态用于写快照（需持有房间锁，只做浅复制）
+        顶层容器复制一层，groups / descriptions / votes 再复制一层；
+        描述、上报等记录创建后不再修改，可以与游戏共享，释放锁后在锁外序列化是安全的
+        """
+        state = {}
+        for key, value in vars(self).items():
+            if key in self._SNAPSHOT_EXCLUDED:
+                continue
+            if key in self._SNAPSHOT_NESTED:
+                value = {k: v.copy() for k, v in value.items()}
+            elif isinstance(value, (dict, list, ReportStore)):
+                value = value.copy()
+            state[key] = value
+        return state
+
+    def restore_state(self, state: Dict):
+        """从快照恢复游戏状态（兼容组信息还是字典、淘汰/准备列表还是普通列表的旧快照）"""
+        for key, value in state.items():
+            if key not in self._SNAPSHOT_EXCLUDED:
+                setattr(self, key, value)
+        self.groups = {name: info if isinstance(info, GroupRecord) else GroupRecord(**info)
+                       for name, info in self.groups.items()}
+        self.eliminated_groups = self._new_eliminated_groups(self.eliminated_groups)
+        self.ready_groups = GroupSet(self.ready_groups)
+        self.describe_order = GroupSet(self.describe_order)
+        self._rebuild_active_index()
+        self.vote_tally = VoteTally.from_votes(self.votes.get(self.current_round, {}))
+        self.last_vote_tally = VoteTally.from_votes((self.last_vote_result or {}).get('vote_details', {}))
+        self.described_groups = {desc["group"] for desc in self.descriptions.get(self.current_round, [])}
+        self.described_groups.update(self.pending_descriptions)
+        self._public_status_cache = None
+
+    def max_groups(self) -> int:
+        """当前模式下的最大组数"""
+        return LOBBY_MAX_GROUPS if self.lobby_mode else MAX_GROUPS
+
+    @journaled
+    def set_lobby_mode(self, enabled: bool) -> Tuple[bool, str]:
+        """
+        开启/关闭大厅模式（只能在游戏开始前或结束后切换）
+        大厅模式下组数上限为 LOBBY_MAX_GROUPS，描述阶段所有组同时提交，按发言顺序批量公开
+        """
+        if self.game_status not in [GameStatus.WAITING, GameStatus.REGISTERED, GameStatus.GAME_END]:
+            return False, "游戏进行中不能切换模式"
+        if not enabled and len(self.groups) > MAX_GROUPS:
+            return False, f"已注册 {len(self.groups)} 组，超过普通模式的最大组数({MAX_GROUPS}组)"
+        if self.lobby_mode == enabled:
+            return True, "模式未变化"
+        self.lobby_mode = enabled
+        self._bump_version()
+        return True, "已开启大厅模式" if enabled else "已关闭大厅模式"
+
+    @journaled
     def register_group(self, group_name: str) -> bool:
         """
         注册游戏组
@@ -61,16 +293,12 @@ class GameLogic:
         """
         if group_name in self.groups:
             return False
-        if len(self.groups) >= MAX_GROUPS:
+        if len(self.groups) >= self.max_groups():
             return False
 
-        self.groups[group_name] = {
-            "name": group_name,
-            "role": None,  # "undercover" 或 "civilian"
-            "word": "",
-            "registered_time": datetime.now().isoformat(),
-            "eliminated": False
-        }
+        self.groups[group_name] = GroupRecord(group_name, self._now().isoformat())
+        if group_name not in self.eliminated_groups:
+            self.active_index[group_name] = None
 
         # 初始化统计和分数
         if group_name not in self.undercover_history:
@@ -85,8 +313,10 @@ class GameLogic:
         # 更新活跃时间
         self.update_activity(group_name)
 
+        self._bump_version()
         return True
 
+    @journaled
     def start_game(self, undercover_word: str, civilian_word: str,
                    websocket_status: Optional[Dict[str, bool]] = None) -> bool:
         """
@@ -110,7 +340,7 @@ class GameLogic:
             return False
 
         # 清空淘汰组和重置所有组的淘汰状态（用于多轮游戏）
-        self.eliminated_groups = []
+        self.eliminated_groups = self._new_eliminated_groups()
 
         # 更新所有组的淘汰状态
         for group_name in self.groups:
@@ -125,9 +355,18 @@ class GameLogic:
                 self.groups[group_name]["role"] = None
                 self.groups[group_name]["word"] = ""
 
+        self._rebuild_active_index()
+
         self.undercover_word = undercover_word
         self.civilian_word = civilian_word
 
+        # 上一局的描述和投票已在结束时归档，内存中只保留这一局
+        self.descriptions.clear()
+        self.votes.clear()
+        self.vote_tally = VoteTally()
+        self.pending_descriptions = {}
+        self.described_groups = set()
+
         # 只给在线玩家分配角色
         group_names = online_groups
 
@@ -144,13 +383,16 @@ class GameLogic:
                                if self.undercover_history[name] == min_count]
 
             # 从符合条件的组中随机选择
-            self.undercover_group = random.choice(eligible_groups)
+            self.undercover_group = self.rng.choice(eligible_groups)
 
             # 增加计数
             self.undercover_history[self.undercover_group] += 1
             self.game_counter += 1
             self.total_games_played += 1
 
+        self.game_id = f"{self._now():%Y%m%d%H%M%S}-{self.rng.getrandbits(32):08x}"
+        self.game_started_at = self._now().isoformat()
+
         # 分配身份和词语（只给在线玩家）
         for group_name in group_names:
             if group_name == self.undercover_group:
@@ -168,11 +410,13 @@ class GameLogic:
                 self.scores[group_name] = 0
 
         # 清空准备状态
-        self.ready_groups = []
+        self.ready_groups = GroupSet()
 
         self.game_status = GameStatus.WORD_ASSIGNED
+        self._bump_version()
         return True
 
+    @journaled
     def start_round(self) -> List[str]:
         """
         开始新回合，随机排序（只包括未淘汰的组）
@@ -184,39 +428,86 @@ class GameLogic:
         if self.game_status == GameStatus.ROUND_END:
             self.current_round += 1
 
-        # 获取未淘汰的组
-        active_groups = [g for g in self.groups.keys() if g not in self.eliminated_groups]
         # 即使只有1组也可以开始回合
-        if len(active_groups) < 1:
+        if len(self.active_index) < 1:
             return []
 
         # 清空准备状态（新回合开始）
-        self.ready_groups = []
+        self.ready_groups = GroupSet()
 
         # 随机排序（只包括活跃组）
-        self.describe_order = active_groups.copy()
-        random.shuffle(self.describe_order)
+        order = list(self.active_index)
+        self.rng.shuffle(order)
+        self.describe_order = GroupSet(order)
+        self.round_active_count = len(order)
 
         # 初始化本回合的描述和投票
         self.descriptions[self.current_round] = []
         self.votes[self.current_round] = {}
+        self.vote_tally = VoteTally()
+        self.pending_descriptions = {}
+        self.described_groups = set()
 
         # 重置发言者索引
         self.current_speaker_index = 0
 
         # 设置描述阶段截止时间
-        self.phase_deadline = datetime.now() + timedelta(seconds=DESCRIBE_TIMEOUT)
+        self.phase_deadline = self._now() + timedelta(seconds=DESCRIBE_TIMEOUT)
 
-        # 设置第一个发言者的截止时间
-        if len(self.describe_order) > 0:
-            self.speaker_deadline = datetime.now() + timedelta(seconds=SPEAKER_TIMEOUT)
+        # 设置第一个发言者的截止时间（大厅模式没有逐个发言的截止时间，只有整个描述窗口）
+        if len(self.describe_order) > 0 and not self.lobby_mode:
+            self.speaker_deadline = self._now() + timedelta(seconds=SPEAKER_TIMEOUT)
+        else:
+            self.speaker_deadline = None
 
         self.game_status = GameStatus.DESCRIBING
+        self._bump_version()
         return self.describe_order
 
-    def submit_description(self, group_name: str, description: str) -> Tuple[bool, str]:
+    def _reveal_pending(self) -> int:
+        """
+        从当前发言者起按发言顺序公开已提交（大厅模式或提前排队）的描述，遇到还没提交的组停下；
+        连续多个提前提交的发言者在这一次调用中一并公开。逐个发言模式下轮到的下一个组重新开始计时
+        :return: 公开的条数
+        """
+        order = self.describe_order
+        round_descriptions = self.descriptions[self.current_round]
+        revealed = 0
+        while self.current_speaker_index < len(order):
+            entry = self.pending_descriptions.pop(order[self.current_speaker_index], None)
+            if entry is None:
+                break
+            round_descriptions.append(entry)
+            self.current_speaker_index += 1
+            revealed += 1
+        if revealed and not self.lobby_mode:
+            self._reset_speaker_deadline()
+        return revealed
+
+    def _reset_speaker_deadline(self):
+        """为当前发言者重新设置截止时间（发言列表已轮完时清除）"""
+        if self.current_speaker_index < len(self.describe_order):
+            self.speaker_deadline = self._now() + timedelta(seconds=SPEAKER_TIMEOUT)
+        else:
+            self.speaker_deadline = None
+
+    def _start_voting_if_described(self):
+        """发言列表中的组都已描述（或被跳过）时进入投票阶段"""
+        if self.game_status != GameStatus.DESCRIBING or self.current_speaker_index < len(self.describe_order):
+            return
+        # 设置投票阶段截止时间
+        self.phase_deadline = self._now() + timedelta(seconds=VOTE_TIMEOUT)
+        self.speaker_deadline = None
+        self.game_status = GameStatus.VOTING
+        # 记录每个活跃组的投票开始时间
+        self.vote_start_times = dict.fromkeys(self.round_active_groups(), self._now())
+
+    @journaled
+    def submit_description(self, group_name: str, description: str, queue: bool = False) -> Tuple[bool, str]:
         """
         提交描述
+        大厅模式下不必等轮到自己：描述先暂存，按发言顺序轮到时公开
+        :param queue: 逐个发言模式下还没轮到时提前排队，轮到该组时立即公开（不带时仍然要求轮到才能提交）
         """
         # 检查是否被淘汰
         if group_name in self.eliminated_groups:
@@ -229,56 +520,48 @@ class GameLogic:
             return False, "该组不在发言列表中"
 
         # 检查是否已经提交过
-        for desc in self.descriptions.get(self.current_round, []):
-            if desc["group"] == group_name:
-                return False, "该组已提交过描述"
+        if group_name in self.described_groups:
+            return False, "该组已提交过描述"
 
-        # 检查是否轮到该组发言
-        current_speaker = self.get_current_speaker()
-        if current_speaker != group_name:
-            return False, f"请等待，当前应由 {current_speaker} 发言"
+        # 检查是否轮到该组发言（大厅模式和提前排队不需要）
+        my_turn = self.get_current_speaker() == group_name
+        if not self.lobby_mode and not my_turn and not queue:
+            return False, f"请等待，当前应由 {self.get_current_speaker()} 发言"
 
-        # 检查是否超时
-        is_timeout = False
-        if self.speaker_deadline and datetime.now() > self.speaker_deadline:
-            is_timeout = True
+        # 检查是否超时（大厅模式看整个描述窗口；提前排队的不算超时）
+        if self.lobby_mode:
+            deadline = self.phase_deadline
+        else:
+            deadline = self.speaker_deadline if my_turn else None
+        is_timeout = bool(deadline and self._now() > deadline)
 
-        self.descriptions[self.current_round].append({
+        entry = {
             "group": group_name,
             "description": description,
-            "time": datetime.now().isoformat(),
+            "time": self._now().isoformat(),
             "timeout": is_timeout  # 标记是否超时提交
-        })
+        }
+        self.described_groups.add(group_name)
 
         # 更新活跃时间
         self.update_activity(group_name)
-        # 移动到下一个发言者
-        self.current_speaker_index += 1
 
-        # 设置下一个发言者的截止时间
-        if self.current_speaker_index < len(self.describe_order):
-            self.speaker_deadline = datetime.now() + timedelta(seconds=SPEAKER_TIMEOUT)
-        else:
-            self.speaker_deadline = None
+        # 先暂存，再从当前发言者起按顺序公开（轮到该组时，连同后面已排队的描述一起公开）
+        self.pending_descriptions[group_name] = entry
+        self._reveal_pending()
 
         # 检查是否所有人都提交了
-        active_groups = [g for g in self.describe_order if g not in self.eliminated_groups]
-        if len(self.descriptions[self.current_round]) >= len(active_groups):
-            # 设置投票阶段截止时间
-            self.phase_deadline = datetime.now() + timedelta(seconds=VOTE_TIMEOUT)
-            self.speaker_deadline = None
-            self.game_status = GameStatus.VOTING
-            # 记录每个活跃组的投票开始时间
-            now = datetime.now()
-            self.vote_start_times = {}
-            for group_name in active_groups:
-                self.vote_start_times[group_name] = now
+        self._start_voting_if_described()
 
+        self._bump_version()
         msg = "描述提交成功"
         if is_timeout:
             msg += "（超时提交）"
+        elif not self.lobby_mode and group_name in self.pending_descriptions:
+            msg += "，已排队（轮到时自动公开）"
         return True, msg
 
+    @journaled
     def submit_vote(self, voter_group: str, target_group: str) -> Tuple[bool, str, bool]:
         """
         提交投票
@@ -307,12 +590,12 @@ class GameLogic:
         if voter_group in self.votes[self.current_round]:
             return False, "已经投过票了", False
 
-        # 检查被投票的是否是活跃组
-        active_groups = [g for g in self.describe_order if g not in self.eliminated_groups]
-        if target_group not in active_groups:
+        # 检查被投票的是否是活跃组（本回合发言列表中且未被淘汰）
+        if target_group not in self.describe_order or target_group in self.eliminated_groups:
             return False, "被投票的组不是活跃组", False
 
         self.votes[self.current_round][voter_group] = target_group
+        self.vote_tally.add(voter_group, target_group)
 
         # 更新活跃时间
         self.update_activity(voter_group)
@@ -321,13 +604,14 @@ class GameLogic:
         if voter_group in self.vote_start_times:
             del self.vote_start_times[voter_group]
 
-        # 检查是否所有人投票完成
-        round_votes = self.votes[self.current_round]
-        active_groups = [g for g in self.describe_order if g not in self.eliminated_groups]
-        all_voted = len(round_votes) >= len(active_groups)
+        closed_early = self._close_voting_if_decided()
 
-        return True, "投票成功", all_voted
+        self._bump_version()
+        if closed_early:
+            return True, "投票成功，结果已确定，提前结束投票", True
+        return True, "投票成功", self.all_voted()
 
+    @journaled
     def submit_ready(self, group_name: str) -> Tuple[bool, str, bool]:
         """
         提交准备就绪状态
@@ -355,39 +639,33 @@ class GameLogic:
         # 更新活跃时间
         self.update_activity(group_name)
 
-        # 获取活跃组列表（未淘汰的）
-        active_groups = [g for g in self.groups.keys() if g not in self.eliminated_groups]
-
         # 检查是否所有人都准备好了
-        all_ready = len(self.ready_groups) >= len(active_groups)
+        all_ready = len(self.ready_groups) >= len(self.active_index)
 
+        self._bump_version()
         return True, "准备成功", all_ready
 
+    @journaled
     def process_voting_result(self) -> Dict:
         """处理投票结果，判定淘汰和游戏状态"""
         if self.game_status != GameStatus.VOTING:
             return {"error": "当前不在投票阶段"}
 
         round_votes = self.votes[self.current_round]
-        active_groups = [g for g in self.describe_order if g not in self.eliminated_groups]
 
         # 检查是否所有活跃组都投票了
-        if len(round_votes) < len(active_groups):
+        if not self.all_voted():
             return {"error": "还有组未投票"}
 
-        # 统计票数
-        vote_count: Dict[str, int] = {}
-        for target in round_votes.values():
-            vote_count[target] = vote_count.get(target, 0) + 1
-
-        # 找出得票最多的组
-        max_votes = max(vote_count.values()) if vote_count else 0
-        max_voted_groups = [g for g, v in vote_count.items() if v == max_votes]
+        # 票数和得票最多的组已在投票时增量统计
+        tally = self.vote_tally
+        self.last_vote_tally = tally
+        vote_count = dict(tally.counts)
+        max_votes = tally.max_votes
+        max_voted_groups = tally.leaders()
 
         # 构建详细的投票信息
-        vote_details = {}
-        for voter, target in round_votes.items():
-            vote_details[voter] = target
+        vote_details = dict(round_votes)
 
         result = {
             "round": self.current_round,
@@ -404,7 +682,7 @@ class GameLogic:
             "civilian_word": "",
             "round_scores": {},
             "total_scores": self.scores.copy(),
-            "active_groups": active_groups,
+            "active_groups": self.round_active_groups(),
             "voted_groups": list(round_votes.keys())
         }
 
@@ -412,10 +690,7 @@ class GameLogic:
         if len(max_voted_groups) == 1:
             # 情况a：票数最多的有1组，该组被淘汰
             eliminated = max_voted_groups[0]
-            self.eliminated_groups.append(eliminated)
-            # 更新组的淘汰状态
-            if eliminated in self.groups:
-                self.groups[eliminated]["eliminated"] = True
+            self._eliminate([eliminated])
             result["eliminated"] = [eliminated]
 
             # 计算本轮得分
@@ -433,14 +708,13 @@ class GameLogic:
                 self.game_status = GameStatus.GAME_END
             else:
                 # 平民被淘汰，检查剩余人数
-                remaining_groups = [g for g in self.groups.keys() if g not in self.eliminated_groups]
-                remaining_civilians = [g for g in remaining_groups if g != self.undercover_group]
+                remaining_civilians = self.remaining_civilian_count()
 
-                if len(remaining_civilians) <= 1:
+                if remaining_civilians <= 1:
                     # 平民只剩1组或0组，卧底胜利
                     result["game_ended"] = True
                     result["winner"] = "undercover"
-                    result["message"] = f"😈 投票结果：{eliminated} 是平民，被投出后平民只剩{len(remaining_civilians)}组\n"
+                    result["message"] = f"😈 投票结果：{eliminated} 是平民，被投出后平民只剩{remaining_civilians}组\n"
                     result["message"] += f"🎭 卧底 {self.undercover_group} 胜利！"
                     result["undercover_word"] = self.undercover_word
                     result["civilian_word"] = self.civilian_word
@@ -453,7 +727,7 @@ class GameLogic:
                     # 不立即增加回合数，等待玩家准备下一轮
                     self.game_status = GameStatus.ROUND_END  # 保持当前回合状态
                     # 清空准备状态，等待玩家准备下一轮
-                    self.ready_groups = []
+                    self.ready_groups = GroupSet()
 
         elif len(max_voted_groups) == 2:
             # 情况c：票数最多的组有2组，检查是否都是平民
@@ -461,26 +735,21 @@ class GameLogic:
 
             if all_civilians:
                 # 都是平民，全部淘汰
-                self.eliminated_groups.extend(max_voted_groups)
-                # 更新组的淘汰状态
-                for g in max_voted_groups:
-                    if g in self.groups:
-                        self.groups[g]["eliminated"] = True
+                self._eliminate(max_voted_groups)
                 result["eliminated"] = max_voted_groups.copy()
 
                 # 计算本轮得分
                 self._calculate_round_scores(result)
 
                 # 检查游戏是否结束
-                remaining_groups = [g for g in self.groups.keys() if g not in self.eliminated_groups]
-                remaining_civilians = [g for g in remaining_groups if g != self.undercover_group]
+                remaining_civilians = self.remaining_civilian_count()
 
-                if len(remaining_civilians) <= 1:
+                if remaining_civilians <= 1:
                     # 平民只剩1组或0组，卧底胜利
                     result["game_ended"] = True
                     result["winner"] = "undercover"
                     result["message"] = f"😈 投票结果：{' 和 '.join(max_voted_groups)} 票数相同且都是平民，全部淘汰！\n"
-                    result["message"] += f"平民只剩{len(remaining_civilians)}组\n"
+                    result["message"] += f"平民只剩{remaining_civilians}组\n"
                     result["message"] += f"🎭 卧底 {self.undercover_group} 胜利！"
                     result["undercover_word"] = self.undercover_word
                     result["civilian_word"] = self.civilian_word
@@ -495,7 +764,7 @@ class GameLogic:
                     # 不立即增加回合数，等待玩家准备下一轮
                     self.game_status = GameStatus.ROUND_END  # 保持当前回合状态
                     # 清空准备状态，等待玩家准备下一轮
-                    self.ready_groups = []
+                    self.ready_groups = GroupSet()
             else:
                 # 包含卧底，进入下一轮（无人淘汰）
                 groups_str = ' 和 '.join(max_voted_groups)
@@ -507,18 +776,14 @@ class GameLogic:
 
                 self.game_status = GameStatus.ROUND_END
                 # 清空准备状态，等待玩家准备下一轮
-                self.ready_groups = []
+                self.ready_groups = GroupSet()
 
         elif len(max_voted_groups) >= 3:
             # 情况b：得票最多有3组或更多
             all_civilians = all(g != self.undercover_group for g in max_voted_groups)
             if all_civilians:
                 # 都是平民，全部淘汰，游戏结束，卧底胜利
-                self.eliminated_groups.extend(max_voted_groups)
-                # 更新组的淘汰状态
-                for g in max_voted_groups:
-                    if g in self.groups:
-                        self.groups[g]["eliminated"] = True
+                self._eliminate(max_voted_groups)
                 result["eliminated"] = max_voted_groups
 
                 # 计算本轮得分
@@ -540,13 +805,14 @@ class GameLogic:
 
                 self.game_status = GameStatus.ROUND_END
                 # 清空准备状态，等待玩家准备下一轮
-                self.ready_groups = []
+                self.ready_groups = GroupSet()
 
         # 清除倒计时
         self.phase_deadline = None
         self.speaker_deadline = None
 
         self.last_vote_result = result
+        self._bump_version()
         return result
 
     def _calculate_round_scores(self, result: Dict):
@@ -557,26 +823,19 @@ class GameLogic:
         """
         round_scores = {}  # 初始化每轮得分字典
 
-        # 本轮被淘汰的组
-        eliminated_this_round = result.get('eliminated', [])
         # 游戏是否结束
         game_ended = result.get('game_ended', False)
         winner = result.get('winner')
 
-        # 计算本轮结束后存活的平民组数量
-        remaining_civilians = 0
-        for group_name in self.groups.keys():
-            if (group_name != self.undercover_group and
-                    group_name not in self.eliminated_groups and
-                    group_name not in eliminated_this_round):
-                remaining_civilians += 1
+        # 计算本轮结束后存活的平民组数量（本轮被淘汰的组已从活跃组索引中移除）
+        remaining_civilians = self.remaining_civilian_count()
 
         # 遍历所有组计算本轮得分
         for group_name in self.groups.keys():
             round_score = 0
 
             # 规则1：生存分 - 所有存活到本轮结束的组获得1分
-            if group_name not in eliminated_this_round and group_name not in self.eliminated_groups:
+            if group_name in self.active_index:
                 round_score += 1
 
             # 规则2：胜利分 - 卧底胜利时（平民剩余≤1组）加3分
@@ -592,19 +851,15 @@ class GameLogic:
         result["round_scores"] = round_scores
         result["total_scores"] = self.scores.copy()
 
+    @journaled
     def add_report(self, group_name: str, report_type: str, detail: str) -> Dict:
 
         """记录异常报告"""
-        ticket = f"RPT-{datetime.now().strftime('%Y%m%d%H%M%S')}-{len(self.reports) + 1:03d}"
-
-        entry = {
-            "ticket": ticket,
-            "group": group_name or "unknown",
-            "type": report_type,
-            "detail": detail,
-            "time": datetime.now().isoformat()
-        }
-        self.reports.append(entry)
+        entry, evicted = self.reports.add(group_name, report_type, detail, self.current_round, self._now())
+        # 超出保留条数被挤出的报告转存到对局归档
+        if evicted is not None and self.archive is not None:
+            self.archive.archive_report(evicted)
+        self._bump_version()
         return entry
 
     def get_vote_details_for_group(self, group_name: str) -> Dict:
@@ -624,21 +879,40 @@ class GameLogic:
         }
 
         # 获取我投给了谁
-        if group_name in self.last_vote_result.get('vote_details', {}):
-            result['my_vote'] = self.last_vote_result['vote_details'][group_name]
+        result['my_vote'] = result['vote_details'].get(group_name)
 
-        # 获取谁投了我
-        vote_details = self.last_vote_result.get('vote_details', {})
-        for voter, target in vote_details.items():
-            if target == group_name:
-                result['voted_by'].append(voter)
+        # 获取谁投了我（结算时的计票倒排索引）
+        result['voted_by'] = self.last_vote_tally.voted_by(group_name)
 
         return result
 
+    def get_private_state(self, group_name: str) -> Dict:
+        """
+        只属于指定组的状态（通过该组的私有频道推送）：自己的词语、是否已淘汰，以及最近一次投票中
+        自己投给了谁、谁投了自己；不含其他组的词语和完整投票明细，每个组的数据量与组数无关
+        """
+        info = self.groups.get(group_name)
+        last_vote = None
+        if self.last_vote_result:
+            last_vote = {
+                'round': self.last_vote_result.get('round'),
+                'my_vote': self.last_vote_result.get('vote_details', {}).get(group_name),
+                'voted_by': self.last_vote_tally.voted_by(group_name),
+                'eliminated': self.last_vote_result.get('eliminated', []),
+                'game_ended': self.last_vote_result.get('game_ended', False),
+                'winner': self.last_vote_result.get('winner')
+            }
+        return {
+            'group_name': group_name,
+            'word': (info.get('word') or None) if info else None,
+            'is_eliminated': group_name in self.eliminated_groups,
+            'last_vote': last_vote
+        }
+
     def update_activity(self, group_name: str):
         """更新组的最后活跃时间"""
         if group_name in self.groups:
-            self.last_activity[group_name] = datetime.now()
+            self.last_activity[group_name] = self._now()
 
     def get_online_status(self, websocket_status: Optional[Dict[str, bool]] = None) -> Dict[str, bool]:
         """检测各组是否在线（优先使用WebSocket连接状态，降级使用活跃时间）"""
@@ -653,30 +927,17 @@ class GameLogic:
                 # 降级：使用HTTP活跃时间
                 last_active = self.last_activity.get(group_name)
                 if last_active:
-                    online_status[group_name] = (datetime.now() - last_active) < threshold
+                    online_status[group_name] = (self._now() - last_active) < threshold
                 else:
                     online_status[group_name] = False
 
         return online_status
 
     def _has_existing_report(self, group_name: str, report_type: str, round_num: int) -> bool:
-        """检查是否已经为指定组在当前轮次记录过相同类型的异常"""
-        for report in self.reports:
-            if report.get('group') == group_name and report.get('type') == report_type:
-                # 对于断开连接类型，检查是否在最近一段时间内已经记录过（避免重复记录）
-                if report_type == 'disconnect':
-                    try:
-                        report_time = datetime.fromisoformat(report.get('time', ''))
-                        # 5分钟内不重复记录断开连接
-                        if (datetime.now() - report_time).total_seconds() < 300:
-                            return True
-                    except:
-                        pass
-                # 对于其他类型，检查轮次
-                elif f'第{round_num}轮' in report.get('detail', ''):
-                    return True
-        return False
+        """检查是否已经为指定组在当前轮次记录过相同类型的异常（断开连接类型：5分钟内不重复记录）"""
+        return self.reports.has_recent(group_name, report_type, round_num, self._now())
 
+    @journaled
     def handle_disconnect(self, group_name: str) -> Optional[Dict]:
         """
         处理断开连接（视为退出游戏）
@@ -693,9 +954,8 @@ class GameLogic:
             return None
 
         # 标记为淘汰（退出游戏）
-        self.eliminated_groups.append(group_name)
-        if group_name in self.groups:
-            self.groups[group_name]["eliminated"] = True
+        self._eliminate([group_name])
+        self._bump_version()
 
         # 记录异常
         if not self._has_existing_report(group_name, 'disconnect', self.current_round):
@@ -725,7 +985,7 @@ class GameLogic:
                 "civilian_word": self.civilian_word,
                 "round_scores": {},
                 "total_scores": self.scores.copy(),
-                "active_groups": [g for g in self.groups.keys() if g not in self.eliminated_groups],
+                "active_groups": list(self.active_index),
                 "voted_groups": []
             }
 
@@ -734,14 +994,14 @@ class GameLogic:
 
             self.game_status = GameStatus.GAME_END
             self.last_vote_result = result
+            self.last_vote_tally = VoteTally()
 
             return result
 
         # 如果断开的是平民，检查是否满足游戏结束条件
-        remaining_groups = [g for g in self.groups.keys() if g not in self.eliminated_groups]
-        remaining_civilians = [g for g in remaining_groups if g != self.undercover_group]
+        remaining_civilians = self.remaining_civilian_count()
 
-        if len(remaining_civilians) <= 1:
+        if remaining_civilians <= 1:
             # 平民只剩1组或0组，卧底胜利，游戏结束
             self._calculate_scores()
 
@@ -755,14 +1015,14 @@ class GameLogic:
                 "game_ended": True,
                 "winner": "undercover",
                 "message": f"📡 {group_name}（平民）断开连接，视为退出游戏。\n"
-                           f"平民只剩{len(remaining_civilians)}组\n"
+                           f"平民只剩{remaining_civilians}组\n"
                            f"🎭 卧底 {self.undercover_group} 胜利！",
                 "undercover_group": self.undercover_group,
                 "undercover_word": self.undercover_word,
                 "civilian_word": self.civilian_word,
                 "round_scores": {},
                 "total_scores": self.scores.copy(),
-                "active_groups": remaining_groups,
+                "active_groups": list(self.active_index),
                 "voted_groups": []
             }
 
@@ -771,6 +1031,7 @@ class GameLogic:
 
             self.game_status = GameStatus.GAME_END
             self.last_vote_result = result
+            self.last_vote_tally = VoteTally()
 
             return result
 
@@ -779,15 +1040,22 @@ class GameLogic:
         # 如果正在描述或投票阶段，需要从发言顺序中移除
         if self.game_status == GameStatus.DESCRIBING:
             if group_name in self.describe_order:
+                # 排在当前发言者之前（已发言/已公开）的组被移除后，索引前移一位，当前发言者不变；
+                # 断开的组是当前发言者时，下一个组自动顶上
+                position = self.describe_order.index(group_name)
+                if position < self.current_speaker_index:
+                    self.current_speaker_index -= 1
                 self.describe_order.remove(group_name)
-                # 如果断开的组是当前发言者，需要调整
-                if self.get_current_speaker() == group_name:
-                    # 会自动跳过，因为已从顺序中移除
-                    pass
+                self.pending_descriptions.pop(group_name, None)
+                # 顶上来的组可能已经提前提交，一并公开
+                if not self._reveal_pending() and position == self.current_speaker_index and not self.lobby_mode:
+                    self._reset_speaker_deadline()
+                self._start_voting_if_described()
         elif self.game_status == GameStatus.VOTING:
             # 从投票中移除（如果已投票）
             if self.current_round in self.votes and group_name in self.votes[self.current_round]:
                 del self.votes[self.current_round][group_name]
+                self.vote_tally = VoteTally.from_votes(self.votes[self.current_round])
 
         return None
 
@@ -868,6 +1136,7 @@ class GameLogic:
             voted_groups = list(self.votes[self.current_round].keys())
 
         return {
+            "version": self.version,  # 状态版本号
             "status": self.game_status.value,
             "groups": {name: {
                 "name": info["name"],
@@ -880,13 +1149,17 @@ class GameLogic:
             "describe_order": self.describe_order,
             "current_speaker": self.get_current_speaker(),
             "current_speaker_index": self.current_speaker_index,
+            "lobby_mode": self.lobby_mode,
+            "pending_descriptions": list(self.pending_descriptions.values()),  # 已提交、还没轮到公开的描述
             "described_groups": described_groups,  # 已发言的组
             "voted_groups": voted_groups,  # 已投票的组
             "eliminated_groups": self.eliminated_groups,
             "scores": self.scores,  # 返回累计得分
             "descriptions": self.descriptions,
             "votes": self.votes,
-            "reports": self.reports,
+            # 完整的报告列表通过 /api/game/reports 分页查询，这里只带最近几条
+            "reports_total": self.reports.total,
+            "recent_reports": self.reports.recent(RECENT_REPORTS_IN_STATE),
             "game_counter": self.game_counter,  # 游戏计数
             "undercover_history": self.undercover_history,  # 卧底历史
             "total_games_played": self.total_games_played,  # 总游戏次数
@@ -898,22 +1171,54 @@ class GameLogic:
 
     def get_public_status(self) -> Dict:
         """面向游戏方的公开状态"""
-        active_groups = [g for g in self.groups.keys() if g not in self.eliminated_groups]
+        status = dict(self.get_public_status_static())
+        status.update(self.get_countdown())
+        return status
+
+    def get_countdown(self) -> Dict:
+        """公开状态中与时间相关的倒计时字段（每次调用都重新计算）"""
+        now = self._now()
 
         # 计算阶段剩余时间
         remaining_seconds = None
+        phase_deadline_ms = None
         if self.phase_deadline:
-            delta = self.phase_deadline - datetime.now()
+            delta = self.phase_deadline - now
             remaining_seconds = max(0, int(delta.total_seconds()))
+            phase_deadline_ms = int(self.phase_deadline.timestamp() * 1000)
 
         # 计算当前发言者剩余时间
         speaker_remaining = None
+        speaker_deadline_ms = None
         if self.speaker_deadline and self.game_status == GameStatus.DESCRIBING:
-            delta = self.speaker_deadline - datetime.now()
+            delta = self.speaker_deadline - now
             speaker_remaining = max(0, int(delta.total_seconds()))
+            speaker_deadline_ms = int(self.speaker_deadline.timestamp() * 1000)
 
-        # 获取当前发言人（只对活跃组）
-        current_speaker = self.get_current_speaker() if self.game_status == GameStatus.DESCRIBING else None
+        return {
+            "remaining_seconds": remaining_seconds,
+            "speaker_remaining_seconds": speaker_remaining,
+            # 绝对截止时间（毫秒时间戳）和服务器当前时间，客户端据此校准时钟并在本地倒计时
+            "phase_deadline_ms": phase_deadline_ms,
+            "speaker_deadline_ms": speaker_deadline_ms,
+            "server_time_ms": int(now.timestamp() * 1000)
+        }
+
+    def get_public_status_static(self) -> Dict:
+        """
+        公开状态中与时间无关的部分，按状态版本号缓存
+        返回的是缓存对象本身，调用方不能修改
+        """
+        cached = self._public_status_cache
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+
+        active_groups = list(self.active_index)
+
+        # 获取当前发言人（只对活跃组；大厅模式下所有组同时描述，没有当前发言人）
+        current_speaker = None
+        if self.game_status == GameStatus.DESCRIBING and not self.lobby_mode:
+            current_speaker = self.get_current_speaker()
 
         # 获取当前回合已提交的描述（供游戏方查看）
         current_descriptions = []
@@ -964,7 +1269,8 @@ class GameLogic:
                 len(self.descriptions) == 0):
             new_game_started = True
 
-        return {
+        status = {
+            "version": self.version,  # 状态版本号
             "status": self.game_status.value,
             "phase_info": phase_info,
             "round": self.current_round,
@@ -973,9 +1279,10 @@ class GameLogic:
                                                                           GameStatus.VOTING] else [],
             "current_speaker": current_speaker,
             "current_speaker_index": self.current_speaker_index if self.game_status == GameStatus.DESCRIBING else None,
+            "lobby_mode": self.lobby_mode,
+            # 本回合已提交描述的组数（大厅模式下含还没公开的）
+            "submitted_count": len(self.described_groups),
             "eliminated_groups": self.eliminated_groups,
-            "remaining_seconds": remaining_seconds,
-            "speaker_remaining_seconds": speaker_remaining,
             "descriptions": current_descriptions,
             "voted_groups": voted_groups,
             "last_vote_result": last_vote_info,
@@ -984,6 +1291,8 @@ class GameLogic:
             "game_ended": self.game_status == GameStatus.GAME_END,
             "ready_groups": self.ready_groups  # 已准备好的组
         }
+        self._public_status_cache = (self.version, status)
+        return status
 
     def get_current_speaker(self) -> Optional[str]:
         """获取当前应该发言的组"""
@@ -1005,9 +1314,11 @@ class GameLogic:
         self.update_activity(group_name)
         return self.groups[group_name].get("word")
 
+    @journaled
     def skip_current_speaker(self) -> bool:
         """
         跳过当前发言者（超时自动跳过）
+        大厅模式下跳过的是下一个待公开、还没提交描述的组
         返回: 是否成功跳过
         """
         if self.game_status != GameStatus.DESCRIBING:
@@ -1017,46 +1328,44 @@ class GameLogic:
         if not current_speaker:
             return False
 
-        # 检查是否已经提交过描述
-        already_submitted = False
-        for desc in self.descriptions.get(self.current_round, []):
-            if desc["group"] == current_speaker:
-                already_submitted = True
-                break
+        self._skip_speaker(current_speaker)
+        self._start_voting_if_described()
+        self._bump_version()
+        return True
 
+    def _skip_speaker(self, current_speaker: str):
+        """为当前发言者记录超时并移到下一个发言者"""
         # 如果还没提交，记录一个超时的空描述
-        if not already_submitted:
+        if current_speaker not in self.described_groups:
+            self.described_groups.add(current_speaker)
             self.descriptions[self.current_round].append({
                 "group": current_speaker,
                 "description": "[超时跳过]",
-                "time": datetime.now().isoformat(),
+                "time": self._now().isoformat(),
                 "timeout": True  # 标记为超时
             })
 
-        # 移动到下一个发言者
+        # 移动到下一个发言者，继续公开排在后面、已经提交的描述
         self.current_speaker_index += 1
+        if not self._reveal_pending() and not self.lobby_mode:
+            # 设置下一个发言者的截止时间
+            self._reset_speaker_deadline()
 
-        # 设置下一个发言者的截止时间
-        if self.current_speaker_index < len(self.describe_order):
-            self.speaker_deadline = datetime.now() + timedelta(seconds=SPEAKER_TIMEOUT)
-        else:
-            self.speaker_deadline = None
-
-        # 检查是否所有人都提交了
-        active_groups = [g for g in self.describe_order if g not in self.eliminated_groups]
-        if len(self.descriptions[self.current_round]) >= len(active_groups):
-            # 设置投票阶段截止时间
-            self.phase_deadline = datetime.now() + timedelta(seconds=VOTE_TIMEOUT)
-            self.speaker_deadline = None
-            self.game_status = GameStatus.VOTING
-            # 记录每个活跃组的投票开始时间
-            now = datetime.now()
-            self.vote_start_times = {}
-            for group_name in active_groups:
-                self.vote_start_times[group_name] = now
-
+    @journaled
+    def close_describe_window(self) -> bool:
+        """
+        大厅模式：描述窗口到时，还没提交的组记为超时跳过，公开全部描述并进入投票阶段
+        返回: 是否关闭了描述窗口
+        """
+        if self.game_status != GameStatus.DESCRIBING or not self.lobby_mode:
+            return False
+        while self.current_speaker_index < len(self.describe_order):
+            self._skip_speaker(self.describe_order[self.current_speaker_index])
+        self._start_voting_if_described()
+        self._bump_version()
         return True
 
+    @journaled
     def skip_vote_for_group(self, group_name: str) -> bool:
         """
         跳过某个组的投票（超时自动跳过）
@@ -1073,20 +1382,24 @@ class GameLogic:
         if group_name in self.votes[self.current_round]:
             return False
 
-        # 检查是否在活跃组中
-        active_groups = [g for g in self.describe_order if g not in self.eliminated_groups]
-        if group_name not in active_groups:
+        # 检查是否在本回合的发言列表中（上面已排除被淘汰的组）
+        if group_name not in self.describe_order:
             return False
 
         # 自动投票：投给自己（表示弃权）
         self.votes[self.current_round][group_name] = group_name
+        self.vote_tally.add(group_name, group_name)
 
         # 清除该组的投票开始时间（已跳过）
         if group_name in self.vote_start_times:
             del self.vote_start_times[group_name]
 
+        self._close_voting_if_decided()
+
+        self._bump_version()
         return True
 
+    @journaled
     def reset_game(self):
         """
         重置游戏 - 保留注册的组及其基本信息，只重置游戏数据
@@ -1101,17 +1414,21 @@ class GameLogic:
         self.undercover_word = ""
         self.civilian_word = ""
         self.current_round = 0
-        self.describe_order = []
+        self.describe_order = GroupSet()
         self.current_speaker_index = 0
         self.descriptions.clear()  # 清空所有描述记录
+        self.pending_descriptions = {}
+        self.described_groups = set()
         self.votes.clear()  # 清空所有投票记录
-        self.eliminated_groups = []  # 清空淘汰组
+        self.eliminated_groups = self._new_eliminated_groups()  # 清空淘汰组
         self.scores.clear()  # 清空得分
         self.reports.clear()  # 清空异常报告
         self.last_vote_result = None  # 清空最后投票结果
+        self.vote_tally = VoteTally()
+        self.last_vote_tally = VoteTally()
         self.phase_deadline = None
         self.speaker_deadline = None
-        self.ready_groups = []  # 清空准备状态
+        self.ready_groups = GroupSet()  # 清空准备状态
         self.game_counter = 0  # 重置游戏计数
         self.total_games_played = 0  # 重置总游戏次数
         self.vote_start_times.clear()  # 清空投票开始时间
@@ -1133,12 +1450,16 @@ class GameLogic:
             # 重置该组的卧底计数（从0开始重新计数）
             self.undercover_history[group_name] = 0  # 为每个组重新初始化
 
+        self._rebuild_active_index()
+
         # 如果有注册的组，恢复状态为已注册
         if len(self.groups) > 0:
             self.game_status = GameStatus.REGISTERED
 
+        self._bump_version()
         print(f"游戏已重置：保留 {len(self.groups)} 个注册组，清空所有游戏数据")
 
+    @journaled
     def clear_all(self):
         """
         完全清空所有组和缓存，就像新开了一次游戏一样
@@ -1151,16 +1472,22 @@ class GameLogic:
         self.undercover_word = ""
         self.civilian_word = ""
         self.current_round = 0
-        self.describe_order = []
+        self.describe_order = GroupSet()
         self.current_speaker_index = 0
         self.descriptions.clear()
+        self.pending_descriptions = {}
+        self.described_groups = set()
         self.votes.clear()
-        self.eliminated_groups = []
+        self.eliminated_groups = self._new_eliminated_groups()
         self.last_vote_result = None
+        self.vote_tally = VoteTally()
+        self.last_vote_tally = VoteTally()
         self.phase_deadline = None
         self.speaker_deadline = None
         self.last_activity.clear()
-        self.ready_groups = []
+        self.ready_groups = GroupSet()
+        self.active_index = {}
+        self.round_active_count = 0
         self.vote_start_times.clear()
         # 清空所有统计和缓存
         self.scores.clear()
@@ -1168,3 +1495,4 @@ class GameLogic:
         self.reports.clear()
         self.game_counter = 0
         self.total_games_played = 0
+        self._bump_version()
@@ -0,0 +1,184 @@
+"""
+组数据模型
+- GroupRecord：单个组的信息，使用 __slots__ 存储（组数上千时比字典省内存），
+  同时保留 record["role"] / record.get("word") 这种字典式访问，外部代码无需改动
+- GroupSet：按加入顺序排列的组名列表，内部同步维护一个集合，`in` 判断为 O(1)；
+  它是 list 的子类，JSON 序列化、切片、遍历的结果与普通列表完全一致
+- ObservedGroupSet：修改时通知所有者的 GroupSet，所有者据此维护由它派生的索引
+"""
+from typing import Callable, Iterable, Optional
+
+
+class GroupRecord:
+    """单个组的信息"""
+
+    __slots__ = ('name', 'role', 'word', 'registered_time', 'eliminated')
+    FIELDS = __slots__
+
+    def __init__(self, name: str, registered_time: str, role: Optional[str] = None,
+                 word: str = "", eliminated: bool = False):
+        self.name = name
+        self.role = role  # "undercover" 或 "civilian"
+        self.word = word
+        self.registered_time = registered_time
+        self.eliminated = eliminated
+
+    def __getitem__(self, key: str):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.FIELDS
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def keys(self):
+        return self.FIELDS
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.FIELDS]
+
+    def to_dict(self) -> dict:
+        """序列化为字典"""
+        return {key: getattr(self, key) for key in self.FIELDS}
+
+    def copy(self) -> 'GroupRecord':
+        return GroupRecord(self.name, self.registered_time, self.role, self.word, self.eliminated)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, GroupRecord):
+            other = other.to_dict()
+        return isinstance(other, dict) and self.to_dict() == other
+
+    def __repr__(self) -> str:
+        return f"GroupRecord({self.to_dict()!r})"
+
+
+class GroupSet(list):
+    """
+    保持加入顺序、成员判断 O(1) 的组名列表
+    只通过下面重写的方法修改（append / extend / remove / clear 等），内部集合随之更新
+    """
+
+    __slots__ = ('_members',)
+
+    def __init__(self, names: Iterable[str] = ()):
+        super().__init__(names)
+        self._members = set(self)
+
+    def __contains__(self, name) -> bool:
+        return name in self._members
+
+    @property
+    def members(self) -> set:
+        """
+        内部集合（只读）。在循环里大量做成员判断时直接用它，
+        省去每次调用 __contains__ 的 Python 层开销
+        """
+        return self._members
+
+    def append(self, name: str):
+        super().append(name)
+        self._members.add(name)
+
+    def extend(self, names: Iterable[str]):
+        names = list(names)
+        super().extend(names)
+        self._members.update(names)
+
+    def __iadd__(self, names: Iterable[str]):
+        self.extend(names)
+        return self
+
+    def insert(self, index: int, name: str):
+        super().insert(index, name)
+        self._members.add(name)
+
+    def remove(self, name: str):
+        super().remove(name)
+        if not list.__contains__(self, name):
+            self._members.discard(name)
+
+    def pop(self, index: int = -1):
+        name = super().pop(index)
+        self._members = set(self)
+        return name
+
+    def clear(self):
+        super().clear()
+        self._members.clear()
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._members = set(self)
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._members = set(self)
+
+    def copy(self) -> 'GroupSet':
+        return GroupSet(self)
+
+    def __reduce__(self):
+        # pickle（快照）时只保存列表内容，恢复时重建集合
+        return (GroupSet, (list(self),))
+
+
+class ObservedGroupSet(GroupSet):
+    """
+    修改时通知所有者的 GroupSet
+    - 加入新成员（append / insert / extend / +=）时对每个新成员调用 on_add(name)，便于增量维护派生数据
+    - 其他修改（remove / pop / clear / 下标赋值或删除）之后调用 on_reset()，由所有者整体重建
+    复制和 pickle 得到的是普通 GroupSet，不再通知
+    """
+
+    __slots__ = ('_on_add', '_on_reset')
+
+    def __init__(self, names: Iterable[str], on_add: Callable[[str], None], on_reset: Callable[[], None]):
+        super().__init__(names)
+        self._on_add = on_add
+        self._on_reset = on_reset
+
+    def append(self, name: str):
+        added = name not in self._members
+        super().append(name)
+        if added:
+            self._on_add(name)
+
+    def extend(self, names: Iterable[str]):
+        for name in names:
+            self.append(name)
+
+    def insert(self, index: int, name: str):
+        added = name not in self._members
+        super().insert(index, name)
+        if added:
+            self._on_add(name)
+
+    def remove(self, name: str):
+        super().remove(name)
+        self._on_reset()
+
+    def pop(self, index: int = -1):
+        name = super().pop(index)
+        self._on_reset()
+        return name
+
+    def clear(self):
+        super().clear()
+        self._on_reset()
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._on_reset()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._on_reset()
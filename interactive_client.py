@@ -13,6 +13,9 @@ from urllib.parse import urlparse
 # 配置服务器地址
 BASE_URL = "http://192.168.241.90:5000"
 
+# 长轮询单次最长等待时间（秒），状态一有变化服务器就会立即返回
+LONG_POLL_WAIT = 25
+
 
 class InteractiveClient:
     def __init__(self, group_name: str):
@@ -25,6 +28,9 @@ class InteractiveClient:
         self.total_score = 0  # 记录总得分
         self.reconnect_count = 0
         self.max_reconnect = 100  # 增大重连次数
+        self.clock_offset_ms = 0  # 服务器时间 - 本地时间（毫秒），用于本地计算倒计时
+        self.etag_cache = {}  # 请求URL -> (ETag, 上次的data)，轮询时带 If-None-Match，未变化时服务器返回 304
+        self.last_version = None  # 最近一次收到的状态版本号（长轮询的 since 参数）
         
         # WebSocket 相关
         self.sio = None
@@ -129,18 +135,46 @@ class InteractiveClient:
         print(f"  {title}")
         print("=" * 50)
 
-    def get_status(self, retry=3):
-        """获取游戏状态，增加重试机制"""
+    def conditional_get(self, path, params=None, timeout=5):
+        """
+        带 If-None-Match 的GET请求，返回 (状态码, data)
+        服务器返回 304 时 data 为上次缓存的内容
+        """
+        url = f"{BASE_URL}{path}"
+        key = (url, tuple(sorted((params or {}).items())))
+        headers = {}
+        if key in self.etag_cache:
+            headers['If-None-Match'] = self.etag_cache[key][0]
+        r = requests.get(url, params=params, headers=headers, timeout=timeout)
+        if r.status_code == 304 and key in self.etag_cache:
+            return 304, self.etag_cache[key][1]
+        data = r.json().get('data', {}) if r.content else {}
+        if r.status_code == 200 and r.headers.get('ETag'):
+            self.etag_cache[key] = (r.headers['ETag'], data)
+        return r.status_code, data
+
+    def get_status(self, retry=3, wait=0):
+        """
+        获取游戏状态，增加重试机制
+        :param wait: 大于0时使用长轮询，服务器在状态版本号变化或等待 wait 秒后才返回
+        """
+        params = {"group_name": self.group_name}
+        if wait > 0 and self.last_version is not None:
+            params.update({"since": self.last_version, "wait": wait})
         for attempt in range(retry):
             try:
-                r = requests.get(f"{BASE_URL}/api/status",
-                                 params={"group_name": self.group_name},
-                                 timeout=5)
-                if r.status_code == 200:
-                    data = r.json().get('data', {})
+                status_code, data = self.conditional_get("/api/status",
+                                                         params=params,
+                                                         timeout=wait + 5)
+                if status_code in (200, 304):
+                    if data.get('version') is not None:
+                        self.last_version = data['version']
                     # 更新淘汰状态
                     if 'is_eliminated' in data:
                         self.is_eliminated = data['is_eliminated']
+                    # 用服务器时间校准本地时钟（304 时缓存里的服务器时间已过期）
+                    if status_code == 200 and data.get('server_time_ms') is not None:
+                        self.clock_offset_ms = data['server_time_ms'] - int(time.time() * 1000)
                     return data
             except:
                 if attempt < retry - 1:
@@ -148,6 +182,28 @@ class InteractiveClient:
                     time.sleep(1)
         return {}
 
+    def seconds_left(self, status, deadline_key, fallback_key):
+        """
+        根据状态中的绝对截止时间在本地计算剩余秒数
+        状态获取之后过了一段时间再显示也是准确的；旧版服务器没有截止时间字段时使用服务器算好的剩余秒数
+        """
+        deadline_ms = status.get(deadline_key)
+        if deadline_ms is None:
+            return status.get(fallback_key)
+        now_ms = int(time.time() * 1000) + self.clock_offset_ms
+        return max(0, (deadline_ms - now_ms) // 1000)
+
+    def wait_for_change(self):
+        """
+        等待游戏状态变化：用长轮询代替固定间隔的 sleep
+        没有等待就返回了同一版本（例如服务器不支持长轮询）时，退回到原来的 2 秒间隔
+        """
+        version = self.last_version
+        start = time.time()
+        status = self.get_status(wait=LONG_POLL_WAIT)
+        if status.get('version') == version and time.time() - start < 1:
+            time.sleep(2)
+
     def get_vote_details(self):
         """获取详细的投票信息"""
         try:
@@ -163,9 +219,9 @@ class InteractiveClient:
     def get_descriptions(self):
         """获取当前回合的描述"""
         try:
-            r = requests.get(f"{BASE_URL}/api/descriptions", timeout=3)
-            if r.status_code == 200:
-                return r.json().get('data', {})
+            status_code, data = self.conditional_get("/api/descriptions", timeout=3)
+            if status_code in (200, 304):
+                return data
         except:
             pass
         return {}
@@ -320,11 +376,11 @@ class InteractiveClient:
         # 倒计时（只对未淘汰的组显示）
         if not self.is_eliminated:
             if game_status == 'describing':
-                speaker_time = status.get('speaker_remaining_seconds')
+                speaker_time = self.seconds_left(status, 'speaker_deadline_ms', 'speaker_remaining_seconds')
                 if speaker_time is not None:
                     print(f"║  ⏱️ 当前发言者剩余: {speaker_time} 秒".ljust(49) + "║")
 
-            remaining = status.get('remaining_seconds')
+            remaining = self.seconds_left(status, 'phase_deadline_ms', 'remaining_seconds')
             if remaining is not None:
                 print(f"║  ⏱️ 阶段剩余时间: {remaining} 秒".ljust(49) + "║")
 
@@ -462,12 +518,12 @@ class InteractiveClient:
 
             if game_status == 'game_end':
                 print("游戏已结束，等待新游戏...")
-                time.sleep(2)
+                self.wait_for_change()
                 continue
 
             # 显示等待状态
             print(f"当前状态: {game_status}")
-            time.sleep(2)
+            self.wait_for_change()
 
     def wait_for_my_turn(self):
         """等待轮到自己发言，同时显示状态"""
@@ -482,14 +538,14 @@ class InteractiveClient:
             if self.is_eliminated:
                 print(f"\n你已被淘汰，观看游戏中...")
                 print(f"当前发言者: {status.get('current_speaker')}")
-                time.sleep(2)
+                self.wait_for_change()
                 continue
 
             if status.get('current_speaker') == self.group_name:
                 return 'my_turn'
 
             print(f"\n等待 {status.get('current_speaker')} 发言中...")
-            time.sleep(2)
+            self.wait_for_change()
 
     def voting_phase(self, status: dict):
         """投票阶段处理"""
@@ -508,7 +564,7 @@ class InteractiveClient:
                 s = self.get_status()
                 if s.get('status') != 'voting':
                     break
-                time.sleep(2)
+                self.wait_for_change()
             return False
 
         # 获取可投票的组
@@ -529,7 +585,8 @@ class InteractiveClient:
             print("\n⚠️  没有其他组可以投票，等待中...")
             return False
 
-        print(f"\n🗳️ 投票阶段！剩余 {status.get('remaining_seconds', 120)} 秒")
+        remaining = self.seconds_left(status, 'phase_deadline_ms', 'remaining_seconds')
+        print(f"\n🗳️ 投票阶段！剩余 {remaining if remaining is not None else 120} 秒")
         print("可投票的组:")
         for i, g in enumerate(others, 1):
             print(f"  {i}. {g}")
@@ -674,7 +731,9 @@ class InteractiveClient:
                     status = self.get_status()
                     self.display_status(status)
 
-                    speaker_time = status.get('speaker_remaining_seconds', 30)
+                    speaker_time = self.seconds_left(status, 'speaker_deadline_ms', 'speaker_remaining_seconds')
+                    if speaker_time is None:
+                        speaker_time = 30
                     print(f"\n👉 轮到你发言了！剩余 {speaker_time} 秒")
                     print(f"你的词语是: 【{self.word}】")
 
@@ -710,7 +769,7 @@ class InteractiveClient:
                             if vote_details:
                                 self.show_vote_details(vote_details)
                         break
-                    time.sleep(2)
+                    self.wait_for_change()
 
             elif game_status == 'round_end':
                 self.display_status(status)
@@ -770,7 +829,7 @@ class InteractiveClient:
                     if len(active_groups) > 0:
                         print(f"\r等待准备: {len(ready_groups)}/{len(active_groups)} 组已准备", end='', flush=True)
                     
-                    time.sleep(2)
+                    self.wait_for_change()
 
             elif game_status == 'word_assigned':
                 self.display_status(status)
@@ -830,7 +889,7 @@ class InteractiveClient:
                     if len(active_groups) > 0:
                         print(f"\r等待准备: {len(ready_groups)}/{len(active_groups)} 组已准备", end='', flush=True)
                     
-                    time.sleep(2)
+                    self.wait_for_change()
 
             else:
                 time.sleep(2)
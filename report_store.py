@@ -0,0 +1,104 @@
+"""
+异常报告存储模块
+保留最近 retention 条报告的环形缓冲区，并维护去重用的索引：
+- (组名, 类型, 回合) -> 条数：同一组同一回合同一类型是否已记录过，O(1)
+- 组名 -> 最近一次断开连接的时间：断开连接 5 分钟内不重复记录，O(1)
+超出保留条数时最旧的报告被挤出，由调用方（GameLogic）转存到磁盘上的对局归档
+"""
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# 断开连接报告的去重时间窗口（秒）
+DISCONNECT_DEDUPE_SECONDS = 300
+
+
+class ReportStore:
+    """有界、带索引的异常报告存储"""
+
+    def __init__(self, retention: int = 200):
+        self.retention = retention
+        self._ring: deque = deque()
+        # 已记录的报告总数（含已挤出的），用于生成工单号
+        self.total = 0
+        self._keys: Dict[Tuple[str, str, int], int] = {}
+        self._last_disconnect: Dict[str, datetime] = {}
+
+    def add(self, group_name: str, report_type: str, detail: str, round_num: int,
+            now: datetime) -> Tuple[Dict, Optional[Dict]]:
+        """
+        记录一条报告
+        :return: (新报告, 被挤出环形缓冲区的最旧报告或None)
+        """
+        self.total += 1
+        entry = {
+            "ticket": f"RPT-{now.strftime('%Y%m%d%H%M%S')}-{self.total:03d}",
+            "group": group_name or "unknown",
+            "type": report_type,
+            "detail": detail,
+            "round": round_num,
+            "time": now.isoformat()
+        }
+        self._ring.append(entry)
+        key = (entry["group"], report_type, round_num)
+        self._keys[key] = self._keys.get(key, 0) + 1
+        if report_type == 'disconnect':
+            self._last_disconnect[entry["group"]] = now
+
+        evicted = None
+        if len(self._ring) > self.retention:
+            evicted = self._ring.popleft()
+            key = (evicted["group"], evicted["type"], evicted["round"])
+            if self._keys[key] <= 1:
+                del self._keys[key]
+            else:
+                self._keys[key] -= 1
+        return entry, evicted
+
+    def has_recent(self, group_name: str, report_type: str, round_num: int, now: datetime) -> bool:
+        """
+        是否已经为该组记录过同类报告：
+        断开连接类型看最近 DISCONNECT_DEDUPE_SECONDS 秒内是否记录过，其他类型看同一回合是否记录过
+        """
+        if report_type == 'disconnect':
+            last = self._last_disconnect.get(group_name)
+            return last is not None and (now - last).total_seconds() < DISCONNECT_DEDUPE_SECONDS
+        return (group_name, report_type, round_num) in self._keys
+
+    def query(self, group: Optional[str] = None, report_type: Optional[str] = None,
+              round_num: Optional[int] = None, offset: int = 0, limit: int = 50) -> Tuple[int, List[Dict]]:
+        """
+        按条件分页查询保留中的报告（最新的在前）
+        :return: (符合条件的总数, 当前页)
+        """
+        matched = [entry for entry in reversed(self._ring)
+                   if (group is None or entry["group"] == group)
+                   and (report_type is None or entry["type"] == report_type)
+                   and (round_num is None or entry["round"] == round_num)]
+        return len(matched), matched[offset:offset + limit]
+
+    def recent(self, count: int) -> List[Dict]:
+        """最近的 count 条报告（最新的在前）"""
+        return [self._ring[-i] for i in range(1, min(count, len(self._ring)) + 1)]
+
+    def clear(self):
+        """清空所有报告和索引"""
+        self._ring.clear()
+        self._keys.clear()
+        self._last_disconnect.clear()
+        self.total = 0
+
+    def copy(self) -> 'ReportStore':
+        """复制（报告条目创建后不再修改，可以共享）"""
+        other = ReportStore(self.retention)
+        other._ring = deque(self._ring)
+        other.total = self.total
+        other._keys = dict(self._keys)
+        other._last_disconnect = dict(self._last_disconnect)
+        return other
+
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    def __iter__(self):
+        return iter(self._ring)
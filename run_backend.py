@@ -9,6 +9,11 @@ import os
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+# 直接运行后端时默认开启事件日志和快照（进程重启后恢复各房间的游戏状态）以及对局归档
+os.environ.setdefault('JOURNAL_DIR', os.path.join('data', 'journal'))
+os.environ.setdefault('SNAPSHOT_DIR', os.path.join('data', 'snapshots'))
+os.environ.setdefault('ARCHIVE_DB', os.path.join('data', 'archive.db'))
+
 from backend.app import app, socketio
 from backend.config import WORD_PAIRS
 from backend.utils import get_local_ip
@@ -28,5 +33,7 @@ if __name__ == '__main__':
     print(f"=" * 50)
 
     # 使用 socketio.run 替代 app.run
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True, allow_unsafe_werkzeug=True)
+    # 不启用自动重载：重载器的父进程也会导入本模块，重放事件日志并运行自己的快照线程，
+    # 与真正提供服务的子进程争用同一批日志和快照文件
+    socketio.run(app, host='0.0.0.0', port=5000, debug=True, use_reloader=False, allow_unsafe_werkzeug=True)
 
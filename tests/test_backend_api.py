@@ -7,8 +7,13 @@ import requests
 import time
 import threading
 from flask import Flask
-from backend import app, ADMIN_TOKEN, game, game_lock
+from backend import app, socketio, rooms, ADMIN_TOKEN, game, game_lock
 from game_logic import GameStatus
+from backend.services import broadcast_status, broadcast_game_state, broadcast_groups, mark_dirty, stop_timer_broadcast
+from backend.config import BROADCAST_TICK
+from backend.utils import issue_host_ticket
+from backend.services.state_diff import apply_patch
+from backend.websocket.handlers import socket_rooms
 
 
 class TestBackendAPI:
@@ -91,13 +96,13 @@ class TestBackendAPI:
 
     def test_register_max_groups(self, client):
         """测试达到最大组数"""
-        for i in range(5):
+        for i in range(game.max_groups()):
             self.register_group(client, f"组{i+1}")
         
         response = self.register_group(client, "超出限制组")
         assert response.status_code == 400
         data = response.get_json()
-        assert "最大组数" in data['message']
+        assert f"最大组数({game.max_groups()}组)" in data['message']
 
     # ========== 开始游戏接口测试 ==========
 
@@ -654,4 +659,692 @@ class TestBackendAPI:
         assert 'scores' in state_data
         assert len(state_data['scores']) > 0
 
-   
\ No newline at end of file
+   
+
+class TestRoomAPI:
+    """多房间接口集成测试"""
+
+    @pytest.fixture(scope="class")
+    def client(self):
+        """创建测试客户端"""
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+
+    @pytest.fixture(autouse=True)
+    def cleanup_rooms(self):
+        """每个测试后删除非默认房间并清空默认房间"""
+        yield
+        for room in rooms.all():
+            if room is not rooms.default:
+                rooms.remove(room.room_id)
+        with game_lock:
+            game.clear_all()
+
+    def get_admin_headers(self):
+        """获取管理员请求头"""
+        return {'X-Admin-Token': ADMIN_TOKEN}
+
+    def create_room(self, client, room_id=None):
+        """创建房间的辅助方法"""
+        body = {'room_id': room_id} if room_id else {}
+        return client.post('/api/rooms', json=body, headers=self.get_admin_headers())
+
+    def test_create_room(self, client):
+        """测试创建房间"""
+        response = self.create_room(client, 'table-1')
+        assert response.status_code == 200
+        assert response.get_json()['data']['room_id'] == 'table-1'
+        assert 'table-1' in rooms
+
+    def test_create_room_auto_id(self, client):
+        """测试自动生成房间ID"""
+        response = self.create_room(client)
+        assert response.status_code == 200
+        assert response.get_json()['data']['room_id'] in rooms
+
+    def test_create_room_duplicate_and_invalid(self, client):
+        """测试重复和非法房间ID"""
+        self.create_room(client, 'table-1')
+        assert self.create_room(client, 'table-1').status_code == 400
+        assert self.create_room(client, 'bad id!').status_code == 400
+
+    def test_create_room_no_admin_token(self, client):
+        """测试无管理员令牌创建房间"""
+        response = client.post('/api/rooms', json={'room_id': 'table-1'})
+        assert response.status_code == 403
+
+    def test_rooms_are_isolated(self, client):
+        """测试不同房间的游戏状态互不影响"""
+        self.create_room(client, 'table-1')
+        response = client.post('/api/rooms/table-1/register', json={'group_name': '组1'})
+        assert response.status_code == 200
+
+        room = rooms.get('table-1')
+        assert '组1' in room.game.groups
+        assert '组1' not in game.groups
+
+        # 默认房间可以注册同名组
+        assert client.post('/api/register', json={'group_name': '组1'}).status_code == 200
+
+        data = client.get('/api/rooms/table-1/groups').get_json()['data']
+        assert data['total'] == 1
+
+    def test_room_scoped_game_flow(self, client):
+        """测试房间作用域的主持方接口"""
+        self.create_room(client, 'table-1')
+        for name in ['组1', '组2']:
+            client.post('/api/rooms/table-1/register', json={'group_name': name})
+        response = client.post('/api/rooms/table-1/game/start',
+                               json={'undercover_word': '苹果', 'civilian_word': '香蕉'},
+                               headers=self.get_admin_headers())
+        assert response.status_code == 200
+        response = client.post('/api/rooms/table-1/game/round/start',
+                               headers=self.get_admin_headers())
+        assert response.status_code == 200
+
+        status = client.get('/api/rooms/table-1/status').get_json()['data']
+        assert status['status'] == 'describing'
+        assert client.get('/api/status').get_json()['data']['status'] == 'waiting'
+
+        room = rooms.get('table-1')
+        with room.lock:
+            stop_timer_broadcast(room)
+
+    def test_unknown_room(self, client):
+        """测试访问不存在的房间"""
+        response = client.get('/api/rooms/missing/status')
+        assert response.status_code == 404
+
+    def test_list_and_delete_rooms(self, client):
+        """测试房间列表和删除房间"""
+        self.create_room(client, 'table-1')
+        response = client.get('/api/rooms', headers=self.get_admin_headers())
+        room_ids = [r['room_id'] for r in response.get_json()['data']['rooms']]
+        assert 'table-1' in room_ids
+        assert rooms.default.room_id in room_ids
+
+        response = client.delete('/api/rooms/table-1', headers=self.get_admin_headers())
+        assert response.status_code == 200
+        assert 'table-1' not in rooms
+
+        # 默认房间不可删除
+        response = client.delete(f'/api/rooms/{rooms.default.room_id}', headers=self.get_admin_headers())
+        assert response.status_code == 404
+
+    def test_socket_joins_room(self, client):
+        """测试WebSocket连接按room_id进入对应房间"""
+        self.create_room(client, 'table-1')
+        client.post('/api/rooms/table-1/register', json={'group_name': '组1'})
+
+        ws = socketio.test_client(app, query_string='room_id=table-1')
+        assert ws.is_connected()
+        ws.emit('register_socket', {'group_name': '组1'})
+        received = ws.get_received()
+        registered = [r for r in received if r['name'] == 'socket_registered']
+        assert registered and registered[0]['args'][0]['room_id'] == 'table-1'
+        assert rooms.get('table-1').group_sockets.get('组1')
+        assert '组1' not in rooms.default.group_sockets
+        ws.disconnect()
+
+    def test_delete_room_closes_sub_channels(self, client):
+        """测试删除房间后解散所有子频道，同ID新建的房间不会推送给旧连接"""
+        self.create_room(client, 'table-1')
+        client.post('/api/rooms/table-1/register', json={'group_name': '组1'})
+        ws = socketio.test_client(app, query_string='room_id=table-1&timer=1', auth={'admin_token': ADMIN_TOKEN})
+        ws.emit('register_socket', {'group_name': '组1'})
+        client.delete('/api/rooms/table-1', headers=self.get_admin_headers())
+
+        channels = socketio.server.manager.rooms.get('/', {})
+        assert not [c for c in channels if isinstance(c, str) and c.startswith('room:table-1')]
+        assert 'table-1' not in socket_rooms.values()
+
+        self.create_room(client, 'table-1')
+        ws.get_received()
+        client.post('/api/rooms/table-1/register', json={'group_name': '组2'})
+        time.sleep(BROADCAST_TICK * 3)
+        assert ws.get_received() == []
+        ws.disconnect()
+
+    def test_socket_switch_room_defers_disconnect(self, client):
+        """测试注册时切换房间与断开连接一样：原房间的组没有其他连接时进入重连宽限期"""
+        for room_id in ('switch-a', 'switch-b'):
+            self.create_room(client, room_id)
+            client.post(f'/api/rooms/{room_id}/register', json={'group_name': '组1'})
+        ws = socketio.test_client(app, query_string='room_id=switch-a')
+        ws.emit('register_socket', {'group_name': '组1'})
+        old_room = rooms.get('switch-a')
+        assert old_room.connections.is_online('组1')
+
+        ws.emit('register_socket', {'group_name': '组1', 'room_id': 'switch-b'})
+        assert not old_room.connections.is_online('组1')
+        assert '组1' in old_room.disconnect_pending
+        assert rooms.get('switch-b').connections.is_online('组1')
+        ws.disconnect()
+
+    def test_socket_unknown_room_refused(self):
+        """测试连接不存在的房间被拒绝"""
+        ws = socketio.test_client(app, query_string='room_id=missing')
+        assert not ws.is_connected()
+
+    def test_status_version_increments(self, client):
+        """测试状态版本号随状态变更递增"""
+        version = client.get('/api/status').get_json()['data']['version']
+        client.post('/api/register', json={'group_name': '组1'})
+        assert client.get('/api/status').get_json()['data']['version'] == version + 1
+
+    def test_socket_patch_mode(self, client):
+        """测试增量模式的连接收到与本地版本衔接的状态补丁"""
+        self.create_room(client, 'table-1')
+        room = rooms.get('table-1')
+
+        ws = socketio.test_client(app, query_string='room_id=table-1&patch=1')
+        full_ws = socketio.test_client(app, query_string='room_id=table-1')
+        ws.get_received()
+        full_ws.get_received()
+
+        broadcast_status(room)
+        baseline = [r for r in ws.get_received() if r['name'] == 'status_update'][-1]['args'][0]
+        full_ws.get_received()
+
+        with room.lock:
+            room.game.register_group('组1')
+        broadcast_status(room)
+
+        received = ws.get_received()
+        assert not [r for r in received if r['name'] == 'status_update']
+        patch = [r for r in received if r['name'] == 'status_patch'][-1]['args'][0]
+        assert patch['base_version'] == baseline['version']
+        assert patch['version'] == baseline['version'] + 1
+        assert apply_patch(baseline, patch)['active_groups'] == ['组1']
+
+        # 全量模式的连接仍然收到完整状态
+        full_received = full_ws.get_received()
+        assert [r for r in full_received if r['name'] == 'status_update']
+        assert not [r for r in full_received if r['name'] == 'status_patch']
+
+        # 重新同步拿到的是最近一次发布的状态
+        ws.emit('request_status')
+        resync = [r for r in ws.get_received() if r['name'] == 'status_update'][-1]['args'][0]
+        assert resync['version'] == patch['version']
+        ws.disconnect()
+        full_ws.disconnect()
+
+    def test_broadcasts_coalesced(self, client):
+        """测试同一周期内的多次广播请求合并为每个主题一次推送"""
+        # 使用独立的房间ID，避免前面测试里同名房间尚未推送完的广播干扰计数
+        self.create_room(client, 'coalesce-1')
+        room = rooms.get('coalesce-1')
+        ws = socketio.test_client(app, query_string='room_id=coalesce-1', auth={'admin_token': ADMIN_TOKEN})
+        ws.get_received()
+
+        for _ in range(5):
+            mark_dirty(room, 'status', 'game_state')
+        mark_dirty(room, 'scores')
+        time.sleep(BROADCAST_TICK * 6)
+
+        names = [r['name'] for r in ws.get_received()]
+        assert names.count('status_update') == 1
+        assert names.count('game_state_update') == 1
+        assert names.count('scores_update') == 1
+        assert 'groups_update' not in names
+        ws.disconnect()
+
+    def test_game_state_only_to_host(self, client):
+        """测试完整游戏状态只推送给主持方连接"""
+        self.create_room(client, 'audience-1')
+        room = rooms.get('audience-1')
+        host_ws = socketio.test_client(app, query_string='room_id=audience-1', auth={'admin_token': ADMIN_TOKEN})
+        player_ws = socketio.test_client(app, query_string='room_id=audience-1')
+        player_ws.emit('register_socket', {'group_name': '组1'})
+        host_ws.get_received()
+        player_ws.get_received()
+
+        broadcast_game_state(room)
+        broadcast_status(room)
+        host_names = [r['name'] for r in host_ws.get_received()]
+        player_names = [r['name'] for r in player_ws.get_received()]
+        assert 'game_state_update' in host_names
+        assert 'status_update' in host_names
+        assert 'game_state_update' not in player_names
+        assert 'status_update' in player_names
+
+        # 非主持方不能主动拉取完整游戏状态
+        player_ws.emit('request_game_state')
+        received = player_ws.get_received()
+        assert [r for r in received if r['name'] == 'error']
+        assert not [r for r in received if r['name'] == 'game_state_update']
+        host_ws.disconnect()
+        player_ws.disconnect()
+
+    def test_host_ticket_joins_host_channel(self, client):
+        """测试主持方连接凭证：只能由主持方换取，只对签发的房间有效，过期作废"""
+        self.create_room(client, 'audience-1')
+        self.create_room(client, 'audience-2')
+        room = rooms.get('audience-1')
+        assert client.post('/api/rooms/audience-1/host/ticket').status_code == 403
+        response = client.post('/api/rooms/audience-1/host/ticket', headers={'X-Admin-Token': ADMIN_TOKEN})
+        assert response.status_code == 200
+        ticket = response.get_json()['data']['ticket']
+        # 凭证不能代替主持方令牌调用主持方接口
+        assert client.get('/api/rooms/audience-1/game/state', headers={'X-Admin-Token': ticket}).status_code == 403
+
+        host_ws = socketio.test_client(app, query_string='room_id=audience-1', auth={'host_ticket': ticket})
+        other_room_ws = socketio.test_client(app, query_string='room_id=audience-2', auth={'host_ticket': ticket})
+        expired_ws = socketio.test_client(app, query_string='room_id=audience-1',
+                                          auth={'host_ticket': issue_host_ticket('audience-1', ttl=-1)})
+        for ws in (host_ws, other_room_ws, expired_ws):
+            ws.get_received()
+
+        broadcast_game_state(room)
+        broadcast_game_state(rooms.get('audience-2'))
+        assert 'game_state_update' in [r['name'] for r in host_ws.get_received()]
+        assert 'game_state_update' not in [r['name'] for r in other_room_ws.get_received()]
+        assert 'game_state_update' not in [r['name'] for r in expired_ws.get_received()]
+        for ws in (host_ws, other_room_ws, expired_ws):
+            ws.disconnect()
+
+    def test_register_joins_group_channel(self, client):
+        """测试注册后加入游戏方频道和本组频道"""
+        self.create_room(client, 'audience-1')
+        room = rooms.get('audience-1')
+        ws = socketio.test_client(app, query_string='room_id=audience-1')
+        other = socketio.test_client(app, query_string='room_id=audience-1')
+        ws.emit('register_socket', {'group_name': '组1'})
+        ws.get_received()
+        other.get_received()
+
+        socketio.emit('probe', {'n': 1}, to=room.sub_channel('group', '组1'))
+        socketio.emit('probe', {'n': 2}, to=room.sub_channel('players'))
+        assert [r['args'][0]['n'] for r in ws.get_received() if r['name'] == 'probe'] == [1, 2]
+        assert not [r for r in other.get_received() if r['name'] == 'probe']
+        ws.disconnect()
+        other.disconnect()
+
+    def test_timer_update_opt_in(self, client):
+        """测试每秒倒计时只推送给携带 timer=1 的连接"""
+        self.create_room(client, 'timer-1')
+        room = rooms.get('timer-1')
+        for name in ['组1', '组2', '组3']:
+            client.post('/api/rooms/timer-1/register', json={'group_name': name})
+        client.post('/api/rooms/timer-1/game/start',
+                    json={'undercover_word': '苹果', 'civilian_word': '香蕉'},
+                    headers=self.get_admin_headers())
+        client.post('/api/rooms/timer-1/game/round/start', headers=self.get_admin_headers())
+
+        ticking = socketio.test_client(app, query_string='room_id=timer-1&timer=1')
+        quiet = socketio.test_client(app, query_string='room_id=timer-1')
+        ticking.get_received()
+        quiet.get_received()
+
+        time.sleep(1.3)
+        assert [r for r in ticking.get_received() if r['name'] == 'timer_update']
+        assert not [r for r in quiet.get_received() if r['name'] == 'timer_update']
+
+        # 状态中带有绝对截止时间，供不订阅的客户端本地倒计时
+        status = client.get('/api/rooms/timer-1/status').get_json()['data']
+        assert status['speaker_deadline_ms'] > status['server_time_ms']
+
+        ticking.disconnect()
+        quiet.disconnect()
+        assert not room.timer_sockets
+        with room.lock:
+            stop_timer_broadcast(room)
+
+    def test_status_json_cached_by_version(self, client):
+        """测试公开状态按版本缓存，倒计时仍每次重新计算"""
+        self.create_room(client, 'cache-1')
+        room = rooms.get('cache-1')
+        for name in ['组1', '组2', '组3']:
+            client.post('/api/rooms/cache-1/register', json={'group_name': name})
+
+        first = client.get('/api/rooms/cache-1/status').get_json()['data']
+        cached = room.status_json
+        second = client.get('/api/rooms/cache-1/status?group_name=组1').get_json()['data']
+        assert room.status_json is cached
+        assert second['version'] == first['version']
+        assert second['is_eliminated'] is False
+        assert 'server_time_ms' in second and 'online_status' in second
+
+        client.post('/api/rooms/cache-1/game/start',
+                    json={'undercover_word': '苹果', 'civilian_word': '香蕉'},
+                    headers=self.get_admin_headers())
+        third = client.get('/api/rooms/cache-1/status').get_json()['data']
+        assert third['version'] > first['version']
+        assert third['status'] == 'word_assigned'
+        assert room.status_json[0] == third['version']
+
+    def test_conditional_get(self, client):
+        """测试公开查询接口的 ETag / 304"""
+        self.create_room(client, 'etag-1')
+        client.post('/api/rooms/etag-1/register', json={'group_name': '组1'})
+
+        for path in ['/api/rooms/etag-1/groups', '/api/rooms/etag-1/scores',
+                     '/api/rooms/etag-1/descriptions', '/api/rooms/etag-1/status']:
+            response = client.get(path)
+            etag = response.headers['ETag']
+            cached = client.get(path, headers={'If-None-Match': etag})
+            assert cached.status_code == 304, path
+            assert cached.data == b''
+
+        # 状态变化后 ETag 失效
+        etag = client.get('/api/rooms/etag-1/groups').headers['ETag']
+        client.post('/api/rooms/etag-1/register', json={'group_name': '组2'})
+        response = client.get('/api/rooms/etag-1/groups', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.get_json()['data']['total'] == 2
+        assert response.headers['ETag'] != etag
+
+    def test_etag_differs_across_room_instances(self, client):
+        """测试同名房间重建后旧 ETag 不会命中"""
+        self.create_room(client, 'etag-1')
+        etag = client.get('/api/rooms/etag-1/groups').headers['ETag']
+        rooms.remove('etag-1')
+        self.create_room(client, 'etag-1')
+        response = client.get('/api/rooms/etag-1/groups', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+
+    def test_status_long_poll(self, client):
+        """测试长轮询在状态变化时立即返回，等待期间不占用房间锁"""
+        self.create_room(client, 'poll-1')
+        version = client.get('/api/rooms/poll-1/status').get_json()['data']['version']
+        result = {}
+
+        def poll():
+            start = time.time()
+            with app.test_client() as poller:
+                response = poller.get(f'/api/rooms/poll-1/status?since={version}&wait=5')
+            result['elapsed'] = time.time() - start
+            result['data'] = response.get_json()['data']
+
+        poller_thread = threading.Thread(target=poll)
+        poller_thread.start()
+        time.sleep(0.2)
+        # 等待中的长轮询不能阻塞写操作
+        response = client.post('/api/rooms/poll-1/register', json={'group_name': '组1'})
+        assert response.status_code == 200
+        poller_thread.join(timeout=5)
+
+        assert result['data']['version'] == version + 1
+        assert result['data']['active_groups'] == ['组1']
+        assert result['elapsed'] < 2
+
+    def test_status_long_poll_timeout(self, client):
+        """测试长轮询在没有变化时等到超时再返回当前状态"""
+        self.create_room(client, 'poll-1')
+        version = client.get('/api/rooms/poll-1/status').get_json()['data']['version']
+        start = time.time()
+        response = client.get(f'/api/rooms/poll-1/status?since={version}&wait=0.3')
+        assert time.time() - start >= 0.3
+        assert response.get_json()['data']['version'] == version
+
+        # since 不是当前版本时立即返回
+        start = time.time()
+        client.get(f'/api/rooms/poll-1/status?since={version + 100}&wait=5')
+        assert time.time() - start < 1
+
+    def test_archive_routes(self, client, tmp_path):
+        """测试已归档对局的查询接口（主持方专用）"""
+        from backend.services.archive import GameArchive
+        from tests.test_services import TestGameArchive
+        self.create_room(client, 'archive-1')
+        room = rooms.get('archive-1')
+        store = GameArchive(str(tmp_path / 'archive.db'))
+        with room.lock:
+            room.game.archive = store.room('archive-1')
+            for name in ['组1', '组2', '组3']:
+                room.game.register_group(name)
+            game_id = TestGameArchive().play_game(room.game)
+        store.flush()
+
+        assert client.get('/api/rooms/archive-1/game/archive').status_code == 403
+        response = client.get('/api/rooms/archive-1/game/archive', headers=self.get_admin_headers())
+        games = response.get_json()['data']['games']
+        assert [g['game_id'] for g in games] == [game_id]
+
+        response = client.get(f'/api/rooms/archive-1/game/archive/rounds?game_id={game_id}&round=1',
+                              headers=self.get_admin_headers())
+        data = response.get_json()['data']
+        assert data['total'] == 1 and data['rounds'][0]['round'] == 1
+        # 默认房间未开启归档
+        assert client.get('/api/game/archive', headers=self.get_admin_headers()).status_code == 404
+
+    def test_reports_endpoint_pages_into_archive(self, client, tmp_path):
+        """测试异常报告分页接口：内存中保留的报告之后接着是转存到归档的报告"""
+        from backend.services.archive import GameArchive
+        from game_logic import GameLogic
+        self.create_room(client, 'reports-1')
+        room = rooms.get('reports-1')
+        store = GameArchive(str(tmp_path / 'archive.db'))
+        with room.lock:
+            room.game = GameLogic(report_retention=3)
+            room.game.archive = store.room('reports-1')
+            room.game.register_group('组1')
+            for i in range(5):
+                room.game.add_report('组1', 'timeout', f'报告{i}')
+        store.flush()
+
+        assert client.get('/api/rooms/reports-1/game/reports').status_code == 403
+        response = client.get('/api/rooms/reports-1/game/reports?limit=2&offset=2',
+                              headers=self.get_admin_headers())
+        data = response.get_json()['data']
+        assert data['total'] == 5
+        # 第3条来自内存，第4条来自归档
+        assert [r['detail'] for r in data['reports']] == ['报告2', '报告1']
+
+        response = client.get('/api/rooms/reports-1/game/reports?type=disconnect',
+                              headers=self.get_admin_headers())
+        assert response.get_json()['data']['total'] == 0
+
+    def test_lobby_mode_parallel_descriptions(self, client):
+        """测试大厅模式：超过普通组数上限注册，所有组同时提交描述，按发言顺序公开"""
+        self.create_room(client, 'lobby-1')
+        headers = self.get_admin_headers()
+        assert client.post('/api/rooms/lobby-1/game/lobby_mode', json={'enabled': True}).status_code == 403
+        response = client.post('/api/rooms/lobby-1/game/lobby_mode', json={'enabled': True}, headers=headers)
+        assert response.get_json()['data']['lobby_mode'] is True
+
+        names = [f'组{i}' for i in range(30)]
+        for name in names:
+            assert client.post('/api/rooms/lobby-1/register', json={'group_name': name}).status_code == 200
+        client.post('/api/rooms/lobby-1/game/start',
+                    json={'undercover_word': '苹果', 'civilian_word': '香蕉'}, headers=headers)
+        order = client.post('/api/rooms/lobby-1/game/round/start', headers=headers).get_json()['data']['order']
+
+        # 倒序提交：排在第一位的组提交之前，什么都不公开
+        for name in reversed(order):
+            response = client.post('/api/rooms/lobby-1/describe',
+                                   json={'group_name': name, 'description': f'{name}的描述'})
+            assert response.get_json()['message'].startswith('描述提交成功')
+        status = client.get('/api/rooms/lobby-1/status').get_json()['data']
+        assert status['status'] == 'voting'
+        assert status['lobby_mode'] is True
+        assert [d['group'] for d in status['descriptions']] == order
+
+        # 游戏进行中不能切换模式
+        response = client.post('/api/rooms/lobby-1/game/lobby_mode', json={'enabled': False}, headers=headers)
+        assert response.status_code == 400
+
+    def test_lobby_early_describe_reschedules_deadline(self, client, monkeypatch):
+        """测试大厅模式所有组提前提交描述后，按投票阶段的截止时间重新登记，而不是等描述窗口到期"""
+        from backend.services import timer
+        self.create_room(client, 'lobby-1')
+        headers = self.get_admin_headers()
+        client.post('/api/rooms/lobby-1/game/lobby_mode', json={'enabled': True}, headers=headers)
+        for name in ('组1', '组2', '组3'):
+            client.post('/api/rooms/lobby-1/register', json={'group_name': name})
+        client.post('/api/rooms/lobby-1/game/start',
+                    json={'undercover_word': '苹果', 'civilian_word': '香蕉'}, headers=headers)
+        order = client.post('/api/rooms/lobby-1/game/round/start', headers=headers).get_json()['data']['order']
+
+        scheduled = []
+        monkeypatch.setattr(timer.scheduler, 'schedule', lambda when, callback, *args: scheduled.append((when, callback, args)))
+        for name in order:
+            client.post('/api/rooms/lobby-1/describe', json={'group_name': name, 'description': '描述'})
+        room = rooms.get('lobby-1')
+        assert room.game.game_status == GameStatus.VOTING
+        deadlines = [when for when, callback, args in scheduled
+                     if callback is timer._on_deadline and args[1] == room.timer_generation]
+        assert deadlines and min(deadlines) <= room.game.phase_deadline.timestamp()
+        with room.lock:
+            stop_timer_broadcast(room)
+
+    def test_lobby_disconnect_reschedules_deadline(self, client, monkeypatch):
+        """测试大厅模式最后一个没提交描述的组断线退出后，同样按投票阶段的截止时间重新登记"""
+        from backend.services import timer
+        from backend.websocket import handlers
+        monkeypatch.setattr(handlers, 'RECONNECT_GRACE', 0)
+        self.create_room(client, 'lobby-1')
+        headers = self.get_admin_headers()
+        client.post('/api/rooms/lobby-1/game/lobby_mode', json={'enabled': True}, headers=headers)
+        for name in ('组1', '组2', '组3', '组4'):
+            client.post('/api/rooms/lobby-1/register', json={'group_name': name})
+        client.post('/api/rooms/lobby-1/game/start',
+                    json={'undercover_word': '苹果', 'civilian_word': '香蕉'}, headers=headers)
+        order = client.post('/api/rooms/lobby-1/game/round/start', headers=headers).get_json()['data']['order']
+        room = rooms.get('lobby-1')
+        # 不提交描述的组是平民，断线退出后游戏继续
+        leaving = next(name for name in order if name != room.game.undercover_group)
+        ws = socketio.test_client(app, query_string='room_id=lobby-1')
+        ws.emit('register_socket', {'group_name': leaving})
+
+        scheduled = []
+        monkeypatch.setattr(timer.scheduler, 'schedule', lambda when, callback, *args: scheduled.append((when, callback, args)))
+        for name in order:
+            if name != leaving:
+                client.post('/api/rooms/lobby-1/describe', json={'group_name': name, 'description': '描述'})
+        scheduled.clear()
+        ws.disconnect()
+        assert room.game.game_status == GameStatus.VOTING
+        deadlines = [when for when, callback, args in scheduled
+                     if callback is timer._on_deadline and args[1] == room.timer_generation]
+        assert deadlines and min(deadlines) <= room.game.phase_deadline.timestamp()
+        with room.lock:
+            stop_timer_broadcast(room)
+
+    def test_describe_queue(self, client):
+        """测试提前排队提交描述：不带 queue 仍要求轮到才能提交，带 queue 时轮到即公开"""
+        self.create_room(client, 'queue-1')
+        headers = self.get_admin_headers()
+        for name in ('组1', '组2', '组3'):
+            client.post('/api/rooms/queue-1/register', json={'group_name': name})
+        client.post('/api/rooms/queue-1/game/start',
+                    json={'undercover_word': '苹果', 'civilian_word': '香蕉'}, headers=headers)
+        order = client.post('/api/rooms/queue-1/game/round/start', headers=headers).get_json()['data']['order']
+
+        response = client.post('/api/rooms/queue-1/describe', json={'group_name': order[1], 'description': '描述'})
+        assert '请等待' in response.get_json()['message']
+        response = client.post('/api/rooms/queue-1/describe',
+                               json={'group_name': order[1], 'description': '描述', 'queue': True})
+        data = response.get_json()['data']
+        assert data['queued'] is True and data['total_descriptions'] == 0
+
+        response = client.post('/api/rooms/queue-1/describe', json={'group_name': order[0], 'description': '描述'})
+        data = response.get_json()['data']
+        assert data['queued'] is False and data['total_descriptions'] == 2
+        status = client.get('/api/rooms/queue-1/status').get_json()['data']
+        assert status['current_speaker'] == order[2]
+
+
+    def start_resume_room(self, client, room_id):
+        """创建房间并开始一局游戏，返回房间和已注册 组1 的连接收到的 socket_registered"""
+        self.create_room(client, room_id)
+        headers = self.get_admin_headers()
+        for name in ('组1', '组2', '组3'):
+            client.post(f'/api/rooms/{room_id}/register', json={'group_name': name})
+        client.post(f'/api/rooms/{room_id}/game/start',
+                    json={'undercover_word': '苹果', 'civilian_word': '香蕉'}, headers=headers)
+        client.post(f'/api/rooms/{room_id}/game/round/start', headers=headers)
+        ws = socketio.test_client(app, query_string=f'room_id={room_id}')
+        ws.emit('register_socket', {'group_name': '组1'})
+        time.sleep(BROADCAST_TICK * 4)  # 等开局产生的广播推送完
+        registered = [r for r in ws.get_received() if r['name'] == 'socket_registered'][-1]['args'][0]
+        return rooms.get(room_id), ws, registered
+
+    def test_resume_replays_missed_events(self, client):
+        """测试宽限期内凭重连令牌重连：组不被淘汰，只补发断线期间错过的事件"""
+        room, ws, registered = self.start_resume_room(client, 'resume-1')
+        assert registered['resume_token']
+        ws.disconnect()
+        assert '组1' in room.disconnect_pending
+        assert '组1' not in room.game.eliminated_groups
+
+        broadcast_groups(room)  # 断线期间的广播
+        ws = socketio.test_client(app, query_string='room_id=resume-1',
+                                  auth={'resume_token': registered['resume_token'], 'last_seq': registered['seq']})
+        received = ws.get_received()
+        names = [r['name'] for r in received]
+        resumed = received[names.index('session_resumed')]['args'][0]
+        replayed = received[:names.index('session_resumed')]
+        assert resumed['group_name'] == '组1' and resumed['resync'] is False
+        assert resumed['replayed'] == len(replayed)
+        assert 'groups_update' in [r['name'] for r in replayed]
+        seqs = [r['args'][0]['seq'] for r in replayed]
+        assert seqs == sorted(seqs) and seqs[0] > registered['seq']
+        # 私有状态不补发历史，恢复后下发当前值
+        assert 'private_update' not in [r['name'] for r in replayed]
+        assert received[-1]['name'] == 'private_update'
+        assert received[-1]['args'][0]['word'] == room.game.groups['组1']['word']
+        assert '组1' not in room.disconnect_pending
+        assert room.connections.is_online('组1')
+        ws.disconnect()
+
+    def test_resume_invalid_token(self, client):
+        """测试重连令牌无效时按普通连接处理并提示重新注册"""
+        self.create_room(client, 'resume-1')
+        ws = socketio.test_client(app, query_string='room_id=resume-1&resume_token=bogus&last_seq=0')
+        names = [r['name'] for r in ws.get_received()]
+        assert names == ['status_update', 'session_resume_failed']
+        ws.disconnect()
+
+    def test_disconnect_after_grace_eliminates(self, client, monkeypatch):
+        """测试宽限期内没有重连的组按退出游戏处理"""
+        from backend.websocket import handlers
+        monkeypatch.setattr(handlers, 'RECONNECT_GRACE', 0.1)
+        room, ws, _ = self.start_resume_room(client, 'resume-1')
+        ws.disconnect()
+        assert '组1' not in room.game.eliminated_groups
+        end = time.time() + 2
+        while time.time() < end and '组1' not in room.game.eliminated_groups:
+            time.sleep(0.01)
+        assert '组1' in room.game.eliminated_groups
+        assert not room.disconnect_pending
+
+    def test_private_push(self, client):
+        """测试各组的词语和投票明细只推送到本组的私有频道"""
+        self.create_room(client, 'private-1')
+        headers = self.get_admin_headers()
+        for name in ('组1', '组2', '组3'):
+            client.post('/api/rooms/private-1/register', json={'group_name': name})
+        sockets = {}
+        for name in ('组1', '组2'):
+            sockets[name] = socketio.test_client(app, query_string='room_id=private-1')
+            sockets[name].emit('register_socket', {'group_name': name})
+        received = sockets['组1'].get_received()
+        private = [r['args'][0] for r in received if r['name'] == 'private_update']
+        assert private == [{'group_name': '组1', 'word': None, 'is_eliminated': False, 'last_vote': None}]
+        sockets['组2'].get_received()
+
+        client.post('/api/rooms/private-1/game/start',
+                    json={'undercover_word': '苹果', 'civilian_word': '香蕉'}, headers=headers)
+        time.sleep(BROADCAST_TICK * 4)
+        room = rooms.get('private-1')
+        for name, ws in sockets.items():
+            private = [r['args'][0] for r in ws.get_received() if r['name'] == 'private_update']
+            assert [p['group_name'] for p in private] == [name]
+            # 私有状态不登记到房间的事件缓冲
+            assert 'seq' not in private[0]
+            assert private[0]['word'] == room.game.groups[name]['word']
+
+        order = client.post('/api/rooms/private-1/game/round/start', headers=headers).get_json()['data']['order']
+        for name in order:
+            client.post('/api/rooms/private-1/describe', json={'group_name': name, 'description': '描述'})
+        for name in order:
+            target = order[1] if name == order[0] else order[0]
+            client.post('/api/rooms/private-1/vote', json={'voter_group': name, 'target_group': target})
+        time.sleep(BROADCAST_TICK * 4)
+        private = [r['args'][0] for r in sockets['组1'].get_received() if r['name'] == 'private_update']
+        assert private[-1]['last_vote']['my_vote'] == (order[1] if order[0] == '组1' else order[0])
+        assert private[-1]['last_vote']['voted_by'] == room.game.get_vote_details_for_group('组1')['voted_by']
+        for ws in sockets.values():
+            ws.disconnect()
@@ -5,6 +5,9 @@
 import pytest
 from datetime import datetime, timedelta
 from game_logic import GameLogic, GameStatus, MAX_GROUPS
+from report_store import ReportStore
+from group_model import GroupRecord, GroupSet
+from vote_tally import VoteTally
 
 
 class TestGameLogic:
@@ -158,6 +161,27 @@ class TestGameLogic:
         assert "组2" not in order
         assert len(order) == 2
 
+    def test_eliminated_groups_mutation_keeps_index(self, game_with_groups):
+        """测试直接修改 eliminated_groups 时活跃组索引同步更新"""
+        game = game_with_groups
+        game.start_game("卧底词", "平民词", {"组1": True, "组2": True, "组3": True})
+        game.start_round()
+        assert game.round_active_count == 3
+
+        game.eliminated_groups.append("组2")
+        assert "组2" not in game.active_index
+        assert game.round_active_count == 2
+
+        game.eliminated_groups.remove("组2")
+        assert "组2" in game.active_index
+        assert game.round_active_count == 3
+
+        game.eliminated_groups.extend(["组1", "组3"])
+        assert list(game.active_index) == ["组2"]
+        game.eliminated_groups.clear()
+        assert list(game.active_index) == ["组1", "组2", "组3"]
+        assert game.round_active_count == 3
+
     # ========== 提交描述相关测试 ==========
 
     def test_submit_description_success(self, game_with_groups):
@@ -187,6 +211,38 @@ class TestGameLogic:
         assert success == False
         assert "请等待" in msg
 
+    def test_queued_descriptions_revealed_in_one_transition(self):
+        """测试提前排队的描述在轮到时立即公开，连续排队的发言者在一次状态变更中一并公开"""
+        game = GameLogic()
+        for i in range(5):
+            game.register_group(f"组{i}")
+        game.start_game("卧底词", "平民词", {f"组{i}": True for i in range(5)})
+        game.start_round()
+        order = list(game.describe_order)
+        for name in order[1:]:
+            success, msg = game.submit_description(name, "描述", queue=True)
+            assert success and "已排队" in msg
+        assert game.descriptions[game.current_round] == []
+        version = game.version
+        game.submit_description(order[0], "描述")
+        assert game.version == version + 1
+        assert [d["group"] for d in game.descriptions[game.current_round]] == order
+        assert game.game_status == GameStatus.VOTING
+
+    def test_queued_description_after_skip(self):
+        """测试当前发言者超时被跳过后，排在后面的已排队描述立即公开，再下一个组重新计时"""
+        game = GameLogic()
+        for i in range(4):
+            game.register_group(f"组{i}")
+        game.start_game("卧底词", "平民词", {f"组{i}": True for i in range(4)})
+        game.start_round()
+        order = list(game.describe_order)
+        game.submit_description(order[1], "描述", queue=True)
+        game.skip_current_speaker()
+        assert [d["group"] for d in game.descriptions[game.current_round]] == order[:2]
+        assert game.get_current_speaker() == order[2]
+        assert game.speaker_deadline is not None
+
     def test_submit_description_eliminated_group(self, game_with_groups):
         """测试淘汰组提交描述"""
         game = game_with_groups
@@ -746,6 +802,19 @@ class TestGameLogic:
         assert "describe_order" in status
         assert "undercover_group" not in status  # 公开状态不包含卧底信息
 
+    def test_public_status_deadlines(self, game_with_groups):
+        """测试公开状态包含绝对截止时间，且与剩余秒数一致"""
+        game = game_with_groups
+        game.start_game("卧底词", "平民词", {"组1": True, "组2": True, "组3": True})
+        game.start_round()
+
+        status = game.get_public_status()
+
+        assert status["phase_deadline_ms"] == int(game.phase_deadline.timestamp() * 1000)
+        assert status["speaker_deadline_ms"] == int(game.speaker_deadline.timestamp() * 1000)
+        remaining = (status["speaker_deadline_ms"] - status["server_time_ms"]) // 1000
+        assert abs(remaining - status["speaker_remaining_seconds"]) <= 1
+
     def test_add_report(self, game_with_groups):
         """测试添加异常报告"""
         game = game_with_groups
@@ -776,3 +845,306 @@ class TestGameLogic:
         assert details["my_vote"] == "组2"
         assert "组2" in details["voted_by"] or "组3" in details["voted_by"]
 
+
+    def test_get_private_state(self, game_with_groups):
+        """测试组的私有状态：开局前没有词语，开局后是自己的词语，结算后是自己的投票明细"""
+        game = game_with_groups
+        state = game.get_private_state("组1")
+        assert state == {"group_name": "组1", "word": None, "is_eliminated": False, "last_vote": None}
+
+        game.start_game("卧底词", "平民词", {"组1": True, "组2": True, "组3": True})
+        assert game.get_private_state("组1")["word"] == game.groups["组1"]["word"]
+        game.start_round()
+        for group in game.describe_order:
+            game.submit_description(group, f"{group}的描述")
+        game.submit_vote("组1", "组2")
+        game.submit_vote("组2", "组1")
+        game.submit_vote("组3", "组1")
+        game.process_voting_result()
+
+        state = game.get_private_state("组1")
+        assert state["is_eliminated"] is True
+        assert state["last_vote"]["my_vote"] == "组2"
+        assert state["last_vote"]["voted_by"] == ["组2", "组3"]
+        assert state["last_vote"]["eliminated"] == ["组1"]
+        # 不含其他组的投票明细
+        assert "vote_details" not in state["last_vote"]
+
+    def test_active_index_follows_eliminations(self):
+        """测试活跃组索引随离线、断开连接、投票淘汰增量更新，与重新计算的结果一致"""
+        game = GameLogic()
+        names = [f"组{i}" for i in range(6)]
+        for name in names:
+            game.register_group(name)
+        game.start_game("卧底词", "平民词", {name: name != "组5" for name in names})
+        assert list(game.active_index) == names[:5]
+
+        def check():
+            active = [g for g in game.groups if g not in game.eliminated_groups]
+            assert list(game.active_index) == active
+            assert game.round_active_count == len([g for g in game.describe_order if g in active])
+            assert game.remaining_civilian_count() == len([g for g in active if g != game.undercover_group])
+
+        game.start_round()
+        check()
+        civilians = [g for g in game.describe_order if g != game.undercover_group]
+        game.handle_disconnect(civilians[0])
+        check()
+        for name in list(game.describe_order):
+            game.submit_description(name, "描述")
+        assert game.game_status == GameStatus.VOTING
+        voters = game.round_active_groups()
+        for voter in voters:
+            game.submit_vote(voter, civilians[1] if voter != civilians[1] else civilians[2])
+        assert game.all_voted()
+        game.process_voting_result()
+        check()
+        assert civilians[1] not in game.active_index
+
+
+class TestReportStore:
+    """异常报告存储测试"""
+
+    def test_ring_evicts_oldest(self):
+        """测试超出保留条数时挤出最旧的报告，工单号仍然递增"""
+        store = ReportStore(retention=3)
+        now = datetime.now()
+        evicted = [store.add(f"组{i}", "timeout", "超时", 1, now)[1] for i in range(5)]
+        assert evicted[:3] == [None, None, None]
+        assert [e["group"] for e in evicted[3:]] == ["组0", "组1"]
+        assert [r["group"] for r in store] == ["组2", "组3", "组4"]
+        assert store.total == 5
+        assert list(store)[-1]["ticket"].endswith("-005")
+        # 被挤出的报告不再参与同回合去重
+        assert not store.has_recent("组0", "timeout", 1, now)
+        assert store.has_recent("组4", "timeout", 1, now)
+        assert not store.has_recent("组4", "timeout", 2, now)
+
+    def test_disconnect_dedupe_window(self):
+        """测试断开连接报告5分钟内不重复记录"""
+        store = ReportStore()
+        now = datetime.now()
+        store.add("组1", "disconnect", "断开", 1, now)
+        assert store.has_recent("组1", "disconnect", 3, now + timedelta(seconds=299))
+        assert not store.has_recent("组1", "disconnect", 3, now + timedelta(seconds=301))
+        assert not store.has_recent("组2", "disconnect", 1, now)
+
+    def test_query_filters_and_pages(self):
+        """测试按组、类型、回合过滤并分页（最新的在前）"""
+        store = ReportStore()
+        now = datetime.now()
+        for i in range(6):
+            store.add(f"组{i % 2}", "timeout" if i < 4 else "disconnect", f"报告{i}", i // 2 + 1, now)
+        total, page = store.query(group="组0", offset=0, limit=2)
+        assert total == 3
+        assert [r["detail"] for r in page] == ["报告4", "报告2"]
+        total, page = store.query(report_type="timeout", round_num=2)
+        assert total == 2 and {r["detail"] for r in page} == {"报告2", "报告3"}
+        assert [r["detail"] for r in store.recent(2)] == ["报告5", "报告4"]
+
+    def test_game_state_ships_recent_reports_only(self):
+        """测试完整游戏状态只附带最近的报告"""
+        game = GameLogic(report_retention=50)
+        game.register_group("组1")
+        for i in range(20):
+            game.add_report("组1", "timeout", f"报告{i}")
+        state = game.get_game_state()
+        assert "reports" not in state
+        assert state["reports_total"] == 20
+        assert state["recent_reports"][0]["detail"] == "报告19"
+        assert len(state["recent_reports"]) < 20
+
+
+class TestLobbyMode:
+    """大厅模式测试"""
+
+    def make_lobby(self, count):
+        game = GameLogic()
+        assert game.set_lobby_mode(True)[0]
+        names = [f"组{i}" for i in range(count)]
+        for name in names:
+            assert game.register_group(name)
+        game.start_game("卧底词", "平民词", {name: True for name in names})
+        game.start_round()
+        return game
+
+    def test_hundreds_of_groups_parallel_describe(self):
+        """测试数百个组同时提交描述，描述按发言顺序公开，全部提交后进入投票"""
+        import random
+        game = self.make_lobby(400)
+        assert game.speaker_deadline is None
+        order = list(game.describe_order)
+        submit_order = order.copy()
+        random.Random(3).shuffle(submit_order)
+        for name in submit_order[:-1]:
+            success, _ = game.submit_description(name, "描述")
+            assert success
+        # 公开的描述始终是发言顺序的前缀
+        revealed = [d["group"] for d in game.descriptions[game.current_round]]
+        assert revealed == order[:len(revealed)]
+        assert game.game_status == GameStatus.DESCRIBING
+        assert game.submit_description(submit_order[0], "再来一次")[0] is False
+        game.submit_description(submit_order[-1], "描述")
+        assert game.game_status == GameStatus.VOTING
+        assert [d["group"] for d in game.descriptions[game.current_round]] == order
+        assert game.pending_descriptions == {}
+
+    def test_close_window_skips_missing(self):
+        """测试描述窗口到时，未提交的组记为超时，已提交的描述全部公开"""
+        game = self.make_lobby(20)
+        order = list(game.describe_order)
+        for name in order[1::2]:
+            game.submit_description(name, "描述")
+        assert game.descriptions[game.current_round] == []
+        assert game.close_describe_window()
+        assert game.game_status == GameStatus.VOTING
+        descriptions = game.descriptions[game.current_round]
+        assert [d["group"] for d in descriptions] == order
+        assert all(d["timeout"] == (i % 2 == 0) for i, d in enumerate(descriptions))
+
+    def test_disconnect_unblocks_reveal(self):
+        """测试挡在公开顺序中的组断开连接后，后面已提交的描述随之公开"""
+        game = self.make_lobby(6)
+        order = list(game.describe_order)
+        # 卧底断开会直接结束游戏，挡住公开顺序的选第一个平民
+        blocker = next(g for g in order if g != game.undercover_group)
+        for name in order:
+            if name != blocker:
+                game.submit_description(name, "描述")
+        assert game.game_status == GameStatus.DESCRIBING
+        game.handle_disconnect(blocker)
+        assert [d["group"] for d in game.descriptions[game.current_round]] == [g for g in order if g != blocker]
+        assert game.game_status == GameStatus.VOTING
+
+    def test_mode_limits(self):
+        """测试组数上限随模式变化，游戏进行中不能切换"""
+        game = GameLogic()
+        for i in range(MAX_GROUPS):
+            game.register_group(f"组{i}")
+        assert not game.register_group("多出来的组")
+        game.set_lobby_mode(True)
+        assert game.register_group("多出来的组")
+        assert not game.set_lobby_mode(False)[0]
+        game.start_game("卧底词", "平民词", {name: True for name in game.groups})
+        assert not game.set_lobby_mode(True)[0]
+
+
+class TestGroupModel:
+    """组数据模型测试"""
+
+    def test_group_set_membership_follows_mutations(self):
+        """测试 GroupSet 修改后成员判断与列表内容一致"""
+        import pickle
+        groups = GroupSet(["组1", "组2"])
+        groups.append("组3")
+        groups.remove("组1")
+        assert groups == ["组2", "组3"]
+        assert "组1" not in groups and "组3" in groups
+        restored = pickle.loads(pickle.dumps(groups))
+        assert isinstance(restored, GroupSet) and "组2" in restored
+        copied = groups.copy()
+        groups.clear()
+        assert "组2" not in groups and "组2" in copied
+
+    def test_group_record_dict_access(self):
+        """测试 GroupRecord 保留字典式访问"""
+        record = GroupRecord("组1", "2026-01-01T00:00:00")
+        record["role"] = "civilian"
+        assert record["role"] == "civilian"
+        assert record.get("word") == "" and record.get("missing", 1) == 1
+        assert record == {"name": "组1", "role": "civilian", "word": "",
+                          "registered_time": "2026-01-01T00:00:00", "eliminated": False}
+        with pytest.raises(KeyError):
+            record["missing"]
+
+
+class TestVoteTally:
+    """增量计票测试"""
+
+    def test_matches_full_recount(self):
+        """测试增量维护的票数、最高票和得票最多的组与重新统计一致"""
+        import random
+        rng = random.Random(7)
+        votes = {f"组{i}": f"组{rng.randrange(6)}" for i in range(40)}
+        tally = VoteTally.from_votes(votes)
+        counts = {}
+        for target in votes.values():
+            counts[target] = counts.get(target, 0) + 1
+        max_votes = max(counts.values())
+        assert tally.counts == counts and list(tally.counts) == list(counts)
+        assert tally.max_votes == max_votes
+        assert tally.leaders() == [g for g, v in counts.items() if v == max_votes]
+        assert tally.voted_by("组0") == [v for v, t in votes.items() if t == "组0"]
+        assert tally.summary()["total_votes"] == 40
+        second = max([v for v in counts.values() if v < max_votes], default=0)
+        expected_margin = max_votes - second if len(tally.leaders()) == 1 else 0
+        assert tally.summary()["lead_margin"] == expected_margin
+
+    def test_tie_leaders_in_first_vote_order(self):
+        """测试平票时得票最多的组按第一次得票的先后排列"""
+        tally = VoteTally()
+        tally.add("组1", "组2")
+        tally.add("组2", "组3")
+        tally.add("组3", "组3")
+        tally.add("组4", "组2")
+        assert tally.leaders() == ["组2", "组3"]
+        assert tally.voted_by("组9") == []
+
+    def test_lead_margin(self):
+        """测试唯一领先者领先第二名的票数"""
+        tally = VoteTally()
+        assert tally.lead_margin() == 0
+        for voter, target in (("组1", "组9"), ("组2", "组9"), ("组3", "组8"), ("组4", "组9")):
+            tally.add(voter, target)
+        assert tally.lead_margin() == 2
+        tally.add("组5", "组8")
+        tally.add("组6", "组8")
+        assert tally.lead_margin() == 0
+
+    def make_voting_game(self, count, early_vote_close=True):
+        game = GameLogic(early_vote_close=early_vote_close)
+        names = [f"组{i}" for i in range(count)]
+        for name in names:
+            game.register_group(name)
+        game.start_game("卧底词", "平民词", {name: True for name in names})
+        game.start_round()
+        for name in list(game.describe_order):
+            game.submit_description(name, "描述")
+        return game, list(game.describe_order)
+
+    def test_early_close_when_outcome_decided(self):
+        """测试领先优势超过剩余票数时提前结束投票，剩余组按弃权处理，结果与等到全部投票一致"""
+        game, order = self.make_voting_game(7)
+        target = order[0]
+        results = [game.submit_vote(voter, target)[2] for voter in order[1:4]]
+        # 3 票对 0 票，剩余 3 票还能追平
+        assert results == [False, False, False]
+        success, msg, all_voted = game.submit_vote(order[4], target)
+        assert success and all_voted and "提前结束" in msg
+        assert game.votes[game.current_round][order[5]] == order[5]
+        assert order[5] not in game.vote_start_times
+        result = game.process_voting_result()
+        assert result["eliminated"] == [target]
+
+    def test_no_early_close_when_disabled(self):
+        """测试未开启时仍等待所有组投票"""
+        game, order = self.make_voting_game(7, early_vote_close=False)
+        for voter in order[1:5]:
+            assert game.submit_vote(voter, order[0])[2] is False
+        assert not game.all_voted()
+
+    def test_disconnect_during_voting_recounts(self):
+        """测试投票阶段断开连接撤销其投票后，计票随之更新"""
+        game = GameLogic()
+        names = [f"组{i}" for i in range(5)]
+        for name in names:
+            game.register_group(name)
+        game.start_game("卧底词", "平民词", {name: True for name in names})
+        game.start_round()
+        for name in list(game.describe_order):
+            game.submit_description(name, "描述")
+        civilians = [g for g in game.describe_order if g != game.undercover_group]
+        game.submit_vote(civilians[0], civilians[1])
+        game.handle_disconnect(civilians[0])
+        assert game.vote_tally.counts == {}
+        assert game.vote_tally.voted_by(civilians[1]) == []
@@ -0,0 +1,696 @@
+"""
+后端服务模块的单元测试
+测试锁、广播等不依赖HTTP的服务组件
+"""
+import copy
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from backend.services.rwlock import RWLock
+from backend.services.state_diff import normalize, make_patch, apply_patch
+from backend.services.scheduler import DeadlineScheduler
+from backend.services.rooms import Room, RoomRegistry
+from backend.services.journal import EventJournal, read_journal, replay_journal
+from backend.services.snapshot import write_snapshot, load_snapshot, snapshot_all
+from backend.services.archive import GameArchive
+from backend.services.fanout import FanoutManager
+from backend.services.connections import ConnectionRegistry
+from backend.services.event_ring import EventRing
+from game_logic import GameLogic, GameStatus
+import socketio as python_socketio
+from backend import socketio  # noqa: F401  确保服务模块已注入 socketio
+from backend.services import start_timer_broadcast, stop_timer_broadcast, emit_after_commit, room_transaction
+from backend.services import broadcast
+
+
+class TestRWLock:
+    """读写锁单元测试"""
+
+    def test_readers_share_lock(self):
+        """测试多个读者可以同时持有读锁"""
+        lock = RWLock()
+        inside = []
+        barrier = threading.Barrier(3, timeout=2)
+
+        def reader():
+            with lock.read():
+                inside.append(1)
+                barrier.wait()  # 三个读者必须同时在锁内才能通过
+
+        threads = [threading.Thread(target=reader) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=3)
+        assert len(inside) == 3
+
+    def test_writer_excludes_readers(self):
+        """测试写锁独占"""
+        lock = RWLock()
+        events = []
+
+        lock.acquire_write()
+        t = threading.Thread(target=lambda: (lock.acquire_read(), events.append('read'), lock.release_read()))
+        t.start()
+        time.sleep(0.05)
+        assert events == []
+        events.append('write_done')
+        lock.release_write()
+        t.join(timeout=2)
+        assert events == ['write_done', 'read']
+
+    def test_waiting_writer_blocks_new_readers(self):
+        """测试写优先：有写者等待时新读者需要排在写者之后"""
+        lock = RWLock()
+        order = []
+
+        lock.acquire_read()
+        writer = threading.Thread(target=lambda: (lock.acquire_write(), order.append('writer'), lock.release_write()))
+        writer.start()
+        time.sleep(0.05)
+        reader = threading.Thread(target=lambda: (lock.acquire_read(), order.append('reader'), lock.release_read()))
+        reader.start()
+        time.sleep(0.05)
+        assert order == []
+        lock.release_read()
+        writer.join(timeout=2)
+        reader.join(timeout=2)
+        assert order == ['writer', 'reader']
+
+    def test_plain_with_is_write_lock(self):
+        """测试直接 with lock 等价于写锁"""
+        lock = RWLock()
+        with lock:
+            assert lock._writer
+        assert not lock._writer
+
+
+class TestStateDiff:
+    """状态增量补丁测试"""
+
+    def test_round_trip(self):
+        """测试补丁应用后与新状态一致"""
+        old = normalize({'version': 1, 'round': 1, 'scores': {'组1': 0}, 'voted_groups': [], 'online_status': {'组1': True, '组2': True}})
+        new = normalize({'version': 3, 'round': 2, 'scores': {'组1': 2, '组3': 0}, 'voted_groups': ['组1'], 'online_status': {'组1': True}})
+        patch = make_patch(old, new, 1, 3)
+        assert patch['base_version'] == 1
+        assert patch['version'] == 3
+        assert ['online_status', '组2'] in patch['unset']
+        assert apply_patch(copy.deepcopy(old), patch) == new
+
+    def test_unchanged_fields_not_sent(self):
+        """测试未变化的字段不出现在补丁中"""
+        old = {'version': 1, 'round': 1, 'eliminated_groups': ['组1']}
+        new = {'version': 2, 'round': 1, 'eliminated_groups': ['组1', '组2']}
+        patch = make_patch(old, new, 1, 2)
+        paths = [op[0] for op in patch['set']]
+        assert ['round'] not in paths
+        assert [['eliminated_groups'], ['组1', '组2']] in patch['set']
+
+    def test_no_change_returns_none(self):
+        """测试状态没有变化时不生成补丁"""
+        state = {'version': 1, 'round': 1}
+        assert make_patch(state, dict(state), 1, 1) is None
+
+    def test_normalize_stringifies_keys(self):
+        """测试规范化后字典键与JSON一致"""
+        assert normalize({'descriptions': {1: ['a']}}) == {'descriptions': {'1': ['a']}}
+
+
+class TestDeadlineScheduler:
+    """截止时间调度器测试"""
+
+    def test_fires_in_deadline_order(self):
+        """测试按截止时间先后执行，与加入顺序无关"""
+        scheduler = DeadlineScheduler()
+        fired = []
+        done = threading.Event()
+        now = time.time()
+        scheduler.schedule(now + 0.15, lambda: (fired.append('late'), done.set()))
+        scheduler.schedule(now + 0.05, fired.append, 'early')
+        assert done.wait(2)
+        assert fired == ['early', 'late']
+
+    def test_earlier_task_wakes_sleeping_thread(self):
+        """测试线程在等待较晚任务时，新加入的较早任务仍按时执行"""
+        scheduler = DeadlineScheduler()
+        done = threading.Event()
+        scheduler.schedule(time.time() + 10, lambda: None)
+        time.sleep(0.05)
+        start = time.time()
+        scheduler.schedule(start + 0.05, done.set)
+        assert done.wait(2)
+        assert time.time() - start < 1
+
+    def test_callback_error_does_not_stop_thread(self):
+        """测试回调抛出异常后调度线程继续运行"""
+        scheduler = DeadlineScheduler()
+        done = threading.Event()
+        now = time.time()
+        scheduler.schedule(now, lambda: 1 / 0)
+        scheduler.schedule(now + 0.01, done.set)
+        assert done.wait(2)
+
+
+class TestTimerDeadlines:
+    """房间倒计时超时处理测试"""
+
+    def make_describing_room(self, speaker_seconds):
+        """创建处于描述阶段、当前发言者即将超时的房间"""
+        room = Room('timer-test')
+        game = room.game
+        for name in ['组1', '组2', '组3']:
+            game.register_group(name)
+        game.start_game('苹果', '香蕉')
+        game.start_round()
+        game.speaker_deadline = datetime.now() + timedelta(seconds=speaker_seconds)
+        return room
+
+    def wait_for(self, predicate, timeout=2.0):
+        """等待条件成立"""
+        end = time.time() + timeout
+        while time.time() < end:
+            if predicate():
+                return True
+            time.sleep(0.01)
+        return False
+
+    def test_speaker_skipped_at_deadline(self):
+        """测试发言者在截止时间到达时被自动跳过"""
+        room = self.make_describing_room(0.1)
+        first_speaker = room.game.get_current_speaker()
+        with room.lock:
+            start_timer_broadcast(room)
+        assert self.wait_for(lambda: room.game.get_current_speaker() != first_speaker)
+        with room.lock:
+            stop_timer_broadcast(room)
+
+    def test_stopped_timer_does_not_fire(self):
+        """测试停止倒计时后，已登记的截止时间不再处理"""
+        room = self.make_describing_room(0.1)
+        first_speaker = room.game.get_current_speaker()
+        with room.lock:
+            start_timer_broadcast(room)
+            stop_timer_broadcast(room)
+        time.sleep(0.3)
+        assert room.game.get_current_speaker() == first_speaker
+
+    def test_tick_only_with_subscribers(self, monkeypatch):
+        """测试没有订阅者时不登记每秒倒计时，第一个订阅者加入时开始，最后一个离开后停止"""
+        from backend.services import timer
+        room = self.make_describing_room(60)
+        ticks = []
+        real_schedule = timer.scheduler.schedule
+
+        def record(when, callback, *args):
+            if callback is timer._on_tick:
+                ticks.append(args)
+            else:
+                real_schedule(when, callback, *args)
+
+        monkeypatch.setattr(timer.scheduler, 'schedule', record)
+        with room.lock:
+            start_timer_broadcast(room)
+        assert ticks == []
+
+        with room.lock:
+            room.timer_sockets.add('sid-1')
+            timer.start_timer_tick(room)
+            room.timer_sockets.add('sid-2')
+            timer.start_timer_tick(room)
+        assert len(ticks) == 1
+
+        room.timer_sockets.clear()
+        timer._on_tick(*ticks.pop())
+        assert ticks == [] and room.tick_generation is None
+        with room.lock:
+            stop_timer_broadcast(room)
+
+    def test_leave_after_others_voted_settles_promptly(self):
+        """测试投票阶段其余组都已投票时，最后一个没投票的组断线退出后立即结算，不等投票超时"""
+        from backend.websocket.handlers import _group_left
+        room = Room('timer-test')
+        game = room.game
+        for name in ['组1', '组2', '组3', '组4']:
+            game.register_group(name)
+        game.start_game('苹果', '香蕉')
+        order = game.start_round()
+        while game.get_current_speaker():
+            game.submit_description(game.get_current_speaker(), '描述')
+        leaving = next(name for name in order if name != game.undercover_group)
+        voters = [name for name in order if name != leaving]
+        for voter in voters:
+            game.submit_vote(voter, voters[1] if voter == voters[0] else voters[0])
+        assert game.game_status == GameStatus.VOTING
+        with room.lock:
+            start_timer_broadcast(room)
+        with room_transaction(room):
+            _group_left(room, leaving)
+        assert self.wait_for(lambda: game.game_status != GameStatus.VOTING, timeout=1.5)
+        with room.lock:
+            stop_timer_broadcast(room)
+
+class TestOutbox:
+    """发件箱测试：持有写锁时登记的消息在释放锁之后才发出"""
+
+    def record_emits(self, monkeypatch, room):
+        """记录发出的消息，以及发出时房间写锁是否仍被持有"""
+        sent = []
+
+        def fake_emit(event, data, to=None):
+            sent.append((event, to, room.lock._writer))
+
+        monkeypatch.setattr(broadcast.socketio, 'emit', fake_emit)
+        return sent
+
+    def test_emitted_after_lock_released(self, monkeypatch):
+        """测试消息按登记顺序在释放写锁之后发出"""
+        room = Room('outbox-test')
+        sent = self.record_emits(monkeypatch, room)
+        with room_transaction(room):
+            emit_after_commit(room, 'vote_result', {'round': 1})
+            emit_after_commit(room, 'notice', {}, to=room.sub_channel('host', 'full'))
+            assert sent == []
+        assert sent == [('vote_result', room.channel, False), ('notice', room.sub_channel('host', 'full'), False)]
+        assert not room.outbox
+
+    def test_emitted_when_transaction_raises(self, monkeypatch):
+        """测试 with 块抛出异常时已登记的消息照样发出"""
+        room = Room('outbox-test')
+        sent = self.record_emits(monkeypatch, room)
+        try:
+            with room_transaction(room):
+                emit_after_commit(room, 'vote_result', {})
+                raise ValueError
+        except ValueError:
+            pass
+        assert sent == [('vote_result', room.channel, False)]
+
+    def test_vote_result_at_deadline_sent_outside_lock(self, monkeypatch):
+        """测试投票截止时由调度线程结算的 vote_result 在释放写锁之后发出"""
+        room = Room('outbox-test')
+        game = room.game
+        for name in ['组1', '组2', '组3']:
+            game.register_group(name)
+        game.start_game('苹果', '香蕉')
+        game.start_round()
+        while game.get_current_speaker():
+            game.submit_description(game.get_current_speaker(), '描述')
+        sent = self.record_emits(monkeypatch, room)
+        with room.lock:
+            game.phase_deadline = datetime.now() + timedelta(seconds=0.1)
+            start_timer_broadcast(room)
+        end = time.time() + 2
+        while time.time() < end and not any(event == 'vote_result' for event, _, _ in sent):
+            time.sleep(0.01)
+        with room.lock:
+            stop_timer_broadcast(room)
+        assert ('vote_result', room.channel, False) in sent
+
+
+class TestConnectionRegistry:
+    """连接追踪测试"""
+
+    def test_attach_and_detach(self):
+        """测试组的第一个连接使其上线，最后一个连接断开使其下线"""
+        connections = ConnectionRegistry()
+        assert connections.attach('s1', '组1')
+        assert not connections.attach('s2', '组1')
+        assert connections.attach('s3', '组2')
+        assert connections.online_count == 2
+        assert len(connections) == 3
+
+        assert connections.detach('s1') == []
+        assert connections.is_online('组1')
+        assert connections.detach('s2') == ['组1']
+        assert not connections.is_online('组1')
+        assert connections.sids('组1') == set()
+        assert connections.online_count == 1
+        # 未登记的连接断开不影响任何组
+        assert connections.detach('unknown') == []
+
+    def test_socket_registered_for_two_groups(self):
+        """测试同一连接先后注册两个组，断开时两个组都下线"""
+        connections = ConnectionRegistry()
+        connections.attach('s1', '组1')
+        connections.attach('s1', '组2')
+        assert sorted(connections.detach('s1')) == ['组1', '组2']
+        assert connections.online_count == 0
+
+    def test_presence_view(self):
+        """测试在线状态视图：有连接的组在线，没有连接（包括从未连接）的组离线，且随连接实时变化"""
+        connections = ConnectionRegistry()
+        presence = connections.presence
+        connections.attach('s1', '组1')
+        game = GameLogic()
+        for name in ['组1', '组2']:
+            game.register_group(name)
+        assert game.get_online_status(presence) == {'组1': True, '组2': False}
+        connections.detach('s1')
+        assert presence.get('组1') is False
+
+
+class TestEventRing:
+    """事件环形缓冲测试"""
+
+    def test_since_filters_by_channel(self):
+        """测试只补发序号之后、发往指定频道的事件，字典数据附带序号"""
+        ring = EventRing(8)
+        assert ring.record('a', {'n': 1}, 'room:t') == {'n': 1, 'seq': 1}
+        ring.record('b', {'n': 2}, 'room:t:host:full')
+        ring.record('c', [3], 'room:t')
+        assert ring.since(1, {'room:t'}) == [('c', [3])]
+        assert ring.since(0, {'room:t', 'room:t:host:full'}) == [
+            ('a', {'n': 1, 'seq': 1}), ('b', {'n': 2, 'seq': 2}), ('c', [3])]
+        assert ring.since(3, {'room:t'}) == []
+
+    def test_since_requires_resync(self):
+        """测试错过的事件已被挤出缓冲区或序号不属于该房间时需要重新同步"""
+        ring = EventRing(2)
+        for i in range(4):
+            ring.record('e', {'i': i}, 'room:t')
+        assert ring.since(1, {'room:t'}) is None
+        assert [payload['i'] for _, payload in ring.since(2, {'room:t'})] == [2, 3]
+        assert ring.since(10, {'room:t'}) is None
+
+
+class FakeTransport:
+    """只提供传输层积压数的假 engine.io 连接"""
+
+    def __init__(self):
+        self.backlog = 0
+        self.queue = self
+
+    def qsize(self):
+        return self.backlog
+
+
+class TestFanout:
+    """每连接有界队列的扇出测试"""
+
+    def make_server(self, **kwargs):
+        """创建使用 FanoutManager 的 Socket.IO 服务器，记录发出的事件和被断开的连接"""
+        manager = FanoutManager(workers=1, **kwargs)
+        server = python_socketio.Server(client_manager=manager, async_mode='threading')
+        sent = []
+        disconnected = []
+        server._send_eio_packet = lambda eio_sid, pkt: sent.append((eio_sid, json.loads(pkt.data[1:])))
+        server.eio.disconnect = disconnected.append
+        return manager, server, sent, disconnected
+
+    def connect(self, manager, server, eio_sid):
+        """接入一个连接并加入房间频道"""
+        transport = server.eio.sockets[eio_sid] = FakeTransport()
+        sid = manager.connect(eio_sid, '/')
+        manager.enter_room(sid, '/', 'room:t')
+        return transport
+
+    def wait_for(self, predicate, timeout=2.0):
+        end = time.time() + timeout
+        while time.time() < end:
+            if predicate():
+                return True
+            time.sleep(0.01)
+        return False
+
+    def test_slow_client_queued_and_superseded(self):
+        """测试积压过多的连接改为排队，完整状态只补发最新的一条，补丁按顺序全部补发"""
+        manager, server, sent, _ = self.make_server(transport_backlog=4)
+        self.connect(manager, server, 'fast')
+        slow = self.connect(manager, server, 'slow')
+        slow.backlog = 10
+
+        server.emit('status_update', {'v': 1}, to='room:t')
+        server.emit('status_patch', {'v': 2}, to='room:t')
+        server.emit('status_update', {'v': 3}, to='room:t')
+        assert [data for eio_sid, data in sent if eio_sid == 'fast'] == [
+            ['status_update', {'v': 1}], ['status_patch', {'v': 2}], ['status_update', {'v': 3}]]
+        assert not [data for eio_sid, data in sent if eio_sid == 'slow']
+        assert manager.pending() == 2
+        assert manager.superseded == 1
+
+        slow.backlog = 0
+        assert self.wait_for(lambda: manager.pending() == 0 and len(sent) == 5)
+        assert [data for eio_sid, data in sent if eio_sid == 'slow'] == [
+            ['status_patch', {'v': 2}], ['status_update', {'v': 3}]]
+
+        # 队列清空后恢复直接发送
+        server.emit('status_update', {'v': 4}, to='room:t')
+        assert sent[-1] == ('slow', ['status_update', {'v': 4}])
+
+    def test_overflowing_client_disconnected(self):
+        """测试排队超过上限的连接被断开，不再占用内存"""
+        manager, server, sent, disconnected = self.make_server(transport_backlog=4, queue_size=2)
+        slow = self.connect(manager, server, 'slow')
+        slow.backlog = 10
+        for i in range(3):
+            server.emit('vote_result', {'i': i}, to='room:t')
+        assert self.wait_for(lambda: disconnected == ['slow'])
+        assert manager.pending() == 0
+        assert manager.dropped_clients == 1
+        assert sent == []
+
+    def test_stalled_client_disconnected(self):
+        """测试积压一直不消退的连接在超时后被断开"""
+        manager, server, _, disconnected = self.make_server(transport_backlog=4, stall_timeout=0.1)
+        slow = self.connect(manager, server, 'slow')
+        slow.backlog = 10
+        server.emit('status_update', {}, to='room:t')
+        time.sleep(0.05)
+        assert disconnected == []
+        assert self.wait_for(lambda: disconnected == ['slow'])
+
+
+class TestEventJournal:
+    """事件日志测试"""
+
+    def play_some_rounds(self, game):
+        """注册、开始游戏并进行一轮描述和投票"""
+        for name in ['组1', '组2', '组3', '组4']:
+            game.register_group(name)
+        game.start_game('苹果', '香蕉', {name: True for name in ['组1', '组2', '组3', '组4']})
+        for name in game.groups:
+            game.submit_ready(name)
+        game.start_round()
+        for name in list(game.describe_order):
+            game.submit_description(name, f'{name}的描述')
+        for name in game.groups:
+            game.submit_vote(name, game.describe_order[0])
+        game.add_report('组2', 'timeout', '测试')
+
+    def test_replay_restores_identical_state(self, tmp_path):
+        """测试重放日志得到与原游戏完全相同的状态"""
+        path = str(tmp_path / 'room.log')
+        original = GameLogic()
+        original.journal = EventJournal(path)
+        self.play_some_rounds(original)
+        original.journal.close()
+
+        restored = GameLogic()
+        count = replay_journal(restored, path)
+        assert count > 0
+        assert restored.get_game_state() == original.get_game_state()
+        assert restored.version == original.version
+
+    def test_only_state_changes_recorded(self, tmp_path):
+        """测试失败的调用和嵌套调用不写入日志"""
+        path = str(tmp_path / 'room.log')
+        game = GameLogic()
+        game.journal = EventJournal(path)
+        game.register_group('组1')
+        game.register_group('组1')  # 重复注册失败，状态不变
+        game.submit_vote('组1', '组2')  # 不在投票阶段
+        game.journal.close()
+        assert [entry[3] for entry in read_journal(path)] == ['register_group']
+
+    def test_truncated_tail_is_discarded(self, tmp_path):
+        """测试崩溃留下的半行记录被丢弃并从文件中截掉"""
+        path = str(tmp_path / 'room.log')
+        game = GameLogic()
+        game.journal = EventJournal(path)
+        game.register_group('组1')
+        game.register_group('组2')
+        game.journal.close()
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('[1700000000000000,1,"register_gr')
+
+        restored = GameLogic()
+        assert replay_journal(restored, path) == 2
+        assert list(restored.groups) == ['组1', '组2']
+        with open(path, encoding='utf-8') as f:
+            assert f.read().endswith('\n')
+
+    def test_writer_thread_flushes_in_batches(self, tmp_path):
+        """测试刷盘线程在一个周期后把缓冲的事件写入文件"""
+        path = str(tmp_path / 'room.log')
+        game = GameLogic()
+        game.journal = EventJournal(path)
+        for i in range(10):
+            game.register_group(f'组{i}')
+        end = time.time() + 2
+        while time.time() < end and len(read_journal(path)) < 10:
+            time.sleep(0.02)
+        assert len(read_journal(path)) == 10
+
+    def test_registry_restores_rooms(self, tmp_path):
+        """测试注册表启动时从日志目录恢复房间，删除房间时删除日志"""
+        directory = str(tmp_path)
+        registry = RoomRegistry(journal_dir=directory)
+        room = registry.create('journal-1')
+        room.game.register_group('组1')
+        registry.default.game.register_group('组A')
+        room.game.journal.flush()
+        registry.default.game.journal.flush()
+
+        reopened = RoomRegistry(journal_dir=directory)
+        assert list(reopened.get('journal-1').game.groups) == ['组1']
+        assert list(reopened.default.game.groups) == ['组A']
+
+        reopened.remove('journal-1')
+        assert not (tmp_path / 'journal-1.log').exists()
+
+
+class TestSnapshot:
+    """房间快照测试"""
+
+    def make_registry(self, tmp_path):
+        return RoomRegistry(journal_dir=str(tmp_path / 'journal'), snapshot_dir=str(tmp_path / 'snap'))
+
+    def test_snapshot_round_trip(self, tmp_path):
+        """测试快照恢复出与原游戏相同的状态，且不残留临时文件"""
+        room = Room('snap-1')
+        TestEventJournal().play_some_rounds(room.game)
+        path = str(tmp_path / 'snap-1.snap')
+        assert write_snapshot(room, path)
+        assert not write_snapshot(room, path)  # 状态没有变化时跳过
+        assert not (tmp_path / 'snap-1.snap.tmp').exists()
+
+        version, state = load_snapshot(path)
+        restored = GameLogic()
+        restored.restore_state(state)
+        assert version == room.game.version
+        assert restored.get_game_state() == room.game.get_game_state()
+
+    def test_snapshot_copy_is_isolated(self):
+        """测试快照复制出的状态不受之后游戏变化的影响"""
+        game = GameLogic()
+        game.register_group('组1')
+        state = game.snapshot_state()
+        game.register_group('组2')
+        game.groups['组1']['eliminated'] = True
+        assert list(state['groups']) == ['组1']
+        assert state['groups']['组1']['eliminated'] is False
+
+    def test_restore_snapshot_then_journal_tail(self, tmp_path):
+        """测试启动时先读快照，再只重放快照之后的事件；写快照后日志被压缩"""
+        registry = self.make_registry(tmp_path)
+        game = registry.default.game
+        game.register_group('组1')
+        game.register_group('组2')
+        assert snapshot_all(registry) == 1
+        game.register_group('组3')
+        game.journal.flush()
+        # 快照之前的事件已从日志中删除
+        assert [entry[4] for entry in read_journal(game.journal.path)] == [['组3']]
+
+        reopened = self.make_registry(tmp_path)
+        assert list(reopened.default.game.groups) == ['组1', '组2', '组3']
+        assert reopened.default.game.version == game.version
+
+    def test_removed_room_snapshot_deleted(self, tmp_path):
+        """测试删除房间时同时删除快照"""
+        registry = self.make_registry(tmp_path)
+        room = registry.create('snap-2')
+        room.game.register_group('组1')
+        snapshot_all(registry)
+        assert (tmp_path / 'snap' / 'snap-2.snap').exists()
+        registry.remove('snap-2')
+        assert not (tmp_path / 'snap' / 'snap-2.snap').exists()
+
+
+class TestGameArchive:
+    """对局归档测试"""
+
+    def play_game(self, game):
+        """进行一局游戏直到结束，返回这局的ID"""
+        names = list(game.groups)
+        game.start_game('苹果', '香蕉', {name: True for name in names})
+        while game.game_status != GameStatus.GAME_END:
+            game.start_round()
+            order = list(game.describe_order)
+            for name in order:
+                game.submit_description(name, f'{name}的描述')
+            for name in order:
+                game.submit_vote(name, order[1] if name == order[0] else order[0])
+            game.process_voting_result()
+        return game.game_id
+
+    def make_game(self, tmp_path):
+        store = GameArchive(str(tmp_path / 'archive.db'))
+        game = GameLogic()
+        game.archive = store.room('arc-1')
+        for name in ['组1', '组2', '组3', '组4']:
+            game.register_group(name)
+        return store, game
+
+    def test_finished_game_archived(self, tmp_path):
+        """测试结束的回合和游戏写入归档，可按局、回合和组查询"""
+        store, game = self.make_game(tmp_path)
+        game_id = self.play_game(game)
+        rounds_played = game.current_round
+        store.flush()
+
+        games = game.archive.list_games()
+        assert [g['game_id'] for g in games] == [game_id]
+        assert games[0]['undercover_group'] == game.undercover_group
+        assert games[0]['rounds'] == rounds_played
+
+        rounds = game.archive.get_rounds(game_id)
+        assert [r['round'] for r in rounds] == list(range(1, rounds_played + 1))
+        assert len(rounds[0]['descriptions']) == 4
+        assert rounds[0]['result']['round'] == 1
+
+        only_group = game.archive.get_rounds(game_id, round_num=1, group='组1')
+        assert [d['group_name'] for d in only_group[0]['descriptions']] == ['组1']
+        assert all('组1' in (v['voter'], v['target']) for v in only_group[0]['votes'])
+
+    def test_memory_holds_only_live_game(self, tmp_path):
+        """测试开始新一局时上一局的描述和投票从内存中移除"""
+        store, game = self.make_game(tmp_path)
+        first_id = self.play_game(game)
+        game.start_game('苹果', '香蕉', {name: True for name in game.groups})
+        assert game.descriptions == {} and game.votes == {}
+        assert game.game_id != first_id
+        store.flush()
+        assert game.archive.get_rounds(first_id)
+
+    def test_replay_does_not_duplicate_rows(self, tmp_path):
+        """测试从事件日志重放时重复归档不会产生重复行"""
+        store = GameArchive(str(tmp_path / 'archive.db'))
+        game = GameLogic()
+        game.archive = store.room('arc-1')
+        game.journal = EventJournal(str(tmp_path / 'arc.log'))
+        for name in ['组1', '组2', '组3', '组4']:
+            game.register_group(name)
+        game_id = self.play_game(game)
+        game.journal.close()
+        store.flush()
+        before = game.archive.get_rounds(game_id)
+
+        replayed = GameLogic()
+        replayed.archive = store.room('arc-1')
+        replay_journal(replayed, str(tmp_path / 'arc.log'))
+        store.flush()
+        assert replayed.game_id == game_id
+        assert game.archive.get_rounds(game_id) == before
+        assert len(game.archive.list_games()) == 1
+
+    def test_writer_thread_batches_inserts(self, tmp_path):
+        """测试写入线程在一个周期后把排队的行写入数据库"""
+        store, game = self.make_game(tmp_path)
+        game_id = self.play_game(game)
+        end = time.time() + 3
+        while time.time() < end and not game.archive.list_games():
+            time.sleep(0.05)
+        assert [g['game_id'] for g in game.archive.list_games()] == [game_id]
@@ -0,0 +1,82 @@
+"""
+投票计数模块
+随每张投票增量维护本回合的计票结果：
+- 目标组 -> 票数（按第一次得票的先后排列，与按投票记录重新统计的顺序一致）
+- 目标组 -> 投票者列表（倒排索引，查询"谁投了我"为 O(k)）
+- 当前最高票数和得票最多的组（结算时不再重新统计和求最大值）
+- 票数分布（票数 -> 组数），用于求领先者领先第二名的票数（判断结果是否已无法改变）
+"""
+from typing import Dict, List
+
+
+class VoteTally:
+    """一个回合的增量计票"""
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+        self.voters: Dict[str, List[str]] = {}
+        self.total = 0
+        self.max_votes = 0
+        self._leaders: Dict[str, None] = {}
+        # 票数 -> 得到这么多票的组数
+        self._freq: Dict[int, int] = {}
+        # 目标组第一次得票的先后位置，用于按统计顺序输出得票最多的组
+        self._pos: Dict[str, int] = {}
+
+    @classmethod
+    def from_votes(cls, votes: Dict[str, str]) -> 'VoteTally':
+        """按投票记录 {投票组: 目标组} 重建计票（撤销投票、恢复快照时使用）"""
+        tally = cls()
+        for voter, target in votes.items():
+            tally.add(voter, target)
+        return tally
+
+    def add(self, voter: str, target: str):
+        """记入一张投票"""
+        count = self.counts.get(target, 0) + 1
+        if count == 1:
+            self._pos[target] = len(self._pos)
+            self.voters[target] = []
+        self.counts[target] = count
+        self.total += 1
+        if count > 1:
+            self._freq[count - 1] -= 1
+        self._freq[count] = self._freq.get(count, 0) + 1
+        self.voters[target].append(voter)
+        if count > self.max_votes:
+            self.max_votes = count
+            self._leaders = {target: None}
+        elif count == self.max_votes:
+            self._leaders[target] = None
+
+    def leaders(self) -> List[str]:
+        """得票最多的组（按第一次得票的先后排列）"""
+        if len(self._leaders) == 1:
+            return list(self._leaders)
+        return sorted(self._leaders, key=self._pos.__getitem__)
+
+    def lead_margin(self) -> int:
+        """唯一领先者比第二名多的票数（并列领先或还没有投票时为0）"""
+        if len(self._leaders) != 1:
+            return 0
+        second = self.max_votes - 1
+        while second > 0 and not self._freq.get(second):
+            second -= 1
+        return self.max_votes - second
+
+    def voted_by(self, target: str) -> List[str]:
+        """投给 target 的组（按投票先后排列）"""
+        return list(self.voters.get(target, ()))
+
+    def summary(self) -> Dict:
+        """实时计票摘要（主持方看板使用）"""
+        return {
+            'vote_count': dict(self.counts),
+            'leaders': self.leaders(),
+            'max_votes': self.max_votes,
+            'lead_margin': self.lead_margin(),
+            'total_votes': self.total
+        }
+
+    def __len__(self) -> int:
+        return len(self.counts)